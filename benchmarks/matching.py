@@ -0,0 +1,45 @@
+"""
+Micro-benchmark of sentence answer checking: ``python -m benchmarks.matching``.
+Prints checks per second for exact answers, answers with typos and wrong answers.
+"""
+import random
+import timeit
+
+from src.quizzes.matching import edit_distance, match_tokens
+
+SENTENCES = [
+    ["Я", "люблю", "читать", "книги", "по", "вечерам"],
+    ["Вчера", "мы", "ходили", "в", "кино", "с", "друзьями"],
+    ["Где", "находится", "ближайшая", "станция", "метро"],
+    ["Она", "работает", "учителем", "в", "большой", "школе", "города"],
+]
+
+
+def add_typo(token: str) -> str:
+    if len(token) < 5:
+        return token
+    index = random.randrange(len(token) - 1)
+    return token[:index] + token[index + 1] + token[index] + token[index + 2:]
+
+
+def run(name: str, cases: list, number: int = 20000) -> None:
+    seconds = timeit.timeit(lambda: [match_tokens(expected, given, "A2") for expected, given in cases],
+                            number=number // len(cases))
+    print(f"{name:>10}: {number / seconds:>10,.0f} checks/s")
+
+
+def main():
+    random.seed(1)
+    exact = [(sentence, [token.lower() for token in sentence]) for sentence in SENTENCES]
+    typos = [(sentence, [add_typo(token.lower()) for token in sentence]) for sentence in SENTENCES]
+    wrong = [(sentence, list(reversed(sentence))) for sentence in SENTENCES]
+    run("exact", exact)
+    run("typos", typos)
+    run("wrong", wrong)
+    words = [("достопримечательность", "достопримечательнсоть"), ("library", "libary")]
+    seconds = timeit.timeit(lambda: [edit_distance(source, target, 2) for source, target in words], number=50000)
+    print(f"{'words':>10}: {100000 / seconds:>10,.0f} distances/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark of bulk word question generation against the configured database: ``python -m benchmarks.questions``.
+Generates the same number of questions per question through ``WordService.get_random_words`` and at once
+through the vectorized generator, and prints questions per second of both.
+"""
+import asyncio
+import time
+
+from src.database import async_session_maker, redis_pool
+from src.quizzes.pools import question_candidates
+from src.quizzes.service import QuizResponseService, WordService
+
+COUNT = 10000
+LANGUAGE_FROM_ID = 1
+LANGUAGE_TO_ID = 2
+
+
+async def generate_one_by_one(count: int) -> list:
+    questions = []
+    async with async_session_maker() as session:
+        word_service = WordService(session)
+        for _ in range(count):
+            words = await word_service.get_random_words(LANGUAGE_FROM_ID, LANGUAGE_TO_ID)
+            questions.append(QuizResponseService.create_random_word_response(
+                words["word_for_translate"], words["other_words"], translation_id=words["translation_id"]
+            ))
+    return questions
+
+
+async def generate_batch(count: int) -> list:
+    async with async_session_maker() as session:
+        return await WordService.generate_random_words(session, LANGUAGE_FROM_ID, count)
+
+
+async def run(name: str, generate, count: int) -> None:
+    started_at = time.perf_counter()
+    questions = await generate(count)
+    seconds = time.perf_counter() - started_at
+    print(f"{name:>12}: {len(questions):>6} questions in {seconds:>7.2f} s, {len(questions) / seconds:>10,.0f}/s")
+
+
+async def main():
+    try:
+        await run("one by one", generate_one_by_one, COUNT)
+        started_at = time.perf_counter()
+        async with async_session_maker() as session:
+            await question_candidates.get_language(session, LANGUAGE_FROM_ID)
+        print(f"{'load':>12}: candidates in {time.perf_counter() - started_at:.2f} s")
+        await run("batch", generate_batch, COUNT)
+    finally:
+        await redis_pool.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
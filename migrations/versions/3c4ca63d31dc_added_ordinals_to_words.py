@@ -0,0 +1,44 @@
+"""Added ordinals to words
+
+Revision ID: 3c4ca63d31dc
+Revises: aaedd3ccd168
+Create Date: 2026-10-17 23:13:53.678554
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3c4ca63d31dc'
+down_revision: Union[str, None] = 'aaedd3ccd168'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('translation_words', sa.Column('ordinal', sa.Integer(), nullable=True))
+    op.add_column('words', sa.Column('ordinal', sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE words SET ordinal = numbered.ordinal
+        FROM (SELECT id, row_number() OVER (PARTITION BY language_id ORDER BY id) - 1 AS ordinal FROM words) AS numbered
+        WHERE words.id = numbered.id
+    """)
+    op.execute("""
+        UPDATE translation_words SET ordinal = numbered.ordinal
+        FROM (SELECT id, row_number() OVER (PARTITION BY to_language_id ORDER BY id) - 1 AS ordinal
+              FROM translation_words) AS numbered
+        WHERE translation_words.id = numbered.id
+    """)
+    op.alter_column('translation_words', 'ordinal', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('words', 'ordinal', existing_type=sa.Integer(), nullable=False)
+    op.create_index('ix_translation_words_to_language_id_ordinal', 'translation_words', ['to_language_id', 'ordinal'], unique=True)
+    op.create_index('ix_words_language_id_ordinal', 'words', ['language_id', 'ordinal'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_words_language_id_ordinal', table_name='words')
+    op.drop_column('words', 'ordinal')
+    op.drop_index('ix_translation_words_to_language_id_ordinal', table_name='translation_words')
+    op.drop_column('translation_words', 'ordinal')
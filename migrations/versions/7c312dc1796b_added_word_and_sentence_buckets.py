@@ -0,0 +1,46 @@
+"""Added word and sentence buckets
+
+Revision ID: 7c312dc1796b
+Revises: ace1cb54e41f
+Create Date: 2026-10-17 23:26:18.036326
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7c312dc1796b'
+down_revision: Union[str, None] = 'ace1cb54e41f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sentences', sa.Column('bucket_ordinal', sa.Integer(), nullable=True))
+    op.add_column('words', sa.Column('bucket_ordinal', sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE words SET bucket_ordinal = numbered.bucket_ordinal
+        FROM (SELECT id, row_number() OVER (PARTITION BY language_id, level, part_of_speech ORDER BY ordinal) - 1
+                         AS bucket_ordinal
+              FROM words) AS numbered
+        WHERE words.id = numbered.id
+    """)
+    op.execute("""
+        UPDATE sentences SET bucket_ordinal = numbered.bucket_ordinal
+        FROM (SELECT id, row_number() OVER (PARTITION BY language_id, level ORDER BY ordinal) - 1 AS bucket_ordinal
+              FROM sentences) AS numbered
+        WHERE sentences.id = numbered.id
+    """)
+    op.alter_column('sentences', 'bucket_ordinal', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('words', 'bucket_ordinal', existing_type=sa.Integer(), nullable=False)
+    op.create_index('ix_sentences_bucket', 'sentences', ['language_id', 'level', 'bucket_ordinal'], unique=True)
+    op.create_index('ix_words_bucket', 'words', ['language_id', 'level', 'part_of_speech', 'bucket_ordinal'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_words_bucket', table_name='words')
+    op.drop_column('words', 'bucket_ordinal')
+    op.drop_index('ix_sentences_bucket', table_name='sentences')
+    op.drop_column('sentences', 'bucket_ordinal')
@@ -0,0 +1,318 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import (CACHE_L1_SIZE, CACHE_L1_TTL, CACHE_LISTENER_RETRY_INTERVAL, CACHE_LOCK_TIMEOUT,
+                        CACHE_NEGATIVE_TTL, CACHE_TTL)
+from src.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+LOCK_POLL_INTERVAL = 0.05
+INVALIDATION_CHANNEL = "cache:invalidations"
+COUNTERS = ("requests", "l1_hits", "l2_hits", "coalesced", "misses", "errors")
+
+
+class CacheStats(BaseModel):
+    requests: int
+    l1_hits: int
+    l2_hits: int
+    coalesced: int
+    misses: int
+    errors: int
+    hit_ratio: float
+
+
+class LocalCache:
+    """In-process LRU of values with an expiry time each, holding at most ``max_size`` entries."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            del self.entries[key]
+
+
+def is_negative(value: Any) -> bool:
+    return value is None or (isinstance(value, (list, dict)) and not value)
+
+
+def make_key(args: tuple, kwargs: dict) -> str:
+    """Key of a call from its arguments, leaving out the session the query runs in."""
+    parts = [str(arg) for arg in args if not isinstance(arg, AsyncSession)]
+    parts += [f"{name}={value}" for name, value in sorted(kwargs.items()) if not isinstance(value, AsyncSession)]
+    return ":".join(parts)
+
+
+class ReadThroughCache:
+    """
+    Two-tier read-through cache of query results: a small in-process LRU in front of Redis, which workers share.
+    A miss is loaded once per key: concurrent callers in the process wait for the same load, and other workers
+    wait for the holder of a short Redis lock to store the value. Empty results are kept for ``negative_ttl``
+    only. Values are stored as JSON, so cached functions return JSON types, which callers must not modify.
+    If Redis fails, values are loaded from the database and kept in process.
+
+    Keys carry the version of their namespace, a Redis counter that writes increment through ``invalidate``,
+    so values cached before a write are never read again, whatever their TTL. New versions are published
+    to every worker, whose invalidation listener drops the namespace from its in-process cache; without
+    a listener, versions are read from Redis on every call. Other in-process data shares the channel through
+    ``publish`` and ``subscribe``.
+    """
+
+    def __init__(self, redis_client: redis.Redis, l1_size: int = CACHE_L1_SIZE, l1_ttl: float = CACHE_L1_TTL,
+                 lock_timeout: float = CACHE_LOCK_TIMEOUT):
+        self.redis = redis_client
+        self.local = LocalCache(l1_size)
+        self.l1_ttl = l1_ttl
+        self.lock_timeout = lock_timeout
+        self.loading: Dict[str, asyncio.Future] = {}
+        self.versions: Dict[str, int] = {}
+        self.listening = False
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self.sender_id = uuid.uuid4().hex
+        self.handlers: Dict[str, Callable[[Any], None]] = {}
+        self.reset_callbacks: List[Callable[[], None]] = []
+
+    @staticmethod
+    def get_key(namespace: str, version: int, key: str) -> str:
+        return f"cache:{namespace}:{version}:{key}"
+
+    @staticmethod
+    def get_version_key(namespace: str) -> str:
+        return f"cache-version:{namespace}"
+
+    def count(self, namespace: str, counter: str) -> None:
+        self.counters.setdefault(namespace, dict.fromkeys(COUNTERS, 0))[counter] += 1
+
+    async def call(self, namespace: str, command: Awaitable, default: Any = None) -> Any:
+        try:
+            return await command
+        except redis.RedisError:
+            logger.warning("Cache of %s is unavailable", namespace, exc_info=True)
+            self.count(namespace, "errors")
+            return default
+
+    async def read(self, namespace: str, cache_key: str) -> Any:
+        data = await self.call(namespace, self.redis.get(cache_key))
+        return MISSING if data is None else json.loads(data)
+
+    async def get_version(self, namespace: str) -> int:
+        """Version of ``namespace``, read from Redis each time unless the invalidation listener keeps it current."""
+        version = self.versions.get(namespace)
+        if version is not None and self.listening:
+            return version
+        data = await self.call(namespace, self.redis.get(self.get_version_key(namespace)), default=MISSING)
+        if data is MISSING:
+            return 0
+        version = max(int(data or 0), self.versions.get(namespace, 0))
+        self.versions[namespace] = version
+        return version
+
+    async def get(self, namespace: str, key: str, loader: Callable[[], Awaitable], ttl: int = CACHE_TTL,
+                  negative_ttl: int = CACHE_NEGATIVE_TTL) -> Any:
+        self.count(namespace, "requests")
+        cache_key = self.get_key(namespace, await self.get_version(namespace), key)
+        value = self.local.get(cache_key)
+        if value is not MISSING:
+            self.count(namespace, "l1_hits")
+            return value
+        while cache_key in self.loading:
+            self.count(namespace, "coalesced")
+            future = self.loading[cache_key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The loader may use the session of the request that started it, so it is not carried on past
+                # that request's cancellation; the waiters retry instead, and the first of them loads again.
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self.loading[cache_key] = future
+        try:
+            value = await self.read_through(namespace, cache_key, loader, ttl, negative_ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self.loading[cache_key]
+
+    async def read_through(self, namespace: str, cache_key: str, loader: Callable[[], Awaitable], ttl: int,
+                           negative_ttl: int) -> Any:
+        value = await self.read(namespace, cache_key)
+        if value is not MISSING:
+            self.count(namespace, "l2_hits")
+        else:
+            value = await self.load(namespace, cache_key, loader, ttl, negative_ttl)
+        self.local.set(cache_key, value, min(negative_ttl if is_negative(value) else ttl, self.l1_ttl))
+        return value
+
+    async def load(self, namespace: str, cache_key: str, loader: Callable[[], Awaitable], ttl: int,
+                   negative_ttl: int) -> Any:
+        lock_key = f"{cache_key}:lock"
+        locked = await self.call(namespace, self.redis.set(lock_key, 1, nx=True, px=int(self.lock_timeout * 1000)),
+                                 default=True)
+        if not locked:
+            value = await self.wait(namespace, cache_key)
+            if value is not MISSING:
+                self.count(namespace, "coalesced")
+                return value
+
+        self.count(namespace, "misses")
+        try:
+            value = await loader()
+            await self.call(namespace, self.redis.set(cache_key, json.dumps(value),
+                                                      ex=negative_ttl if is_negative(value) else ttl))
+        finally:
+            if locked:
+                await self.call(namespace, self.redis.delete(lock_key))
+        return value
+
+    async def wait(self, namespace: str, cache_key: str) -> Any:
+        """Value stored by the worker loading ``cache_key``, or ``MISSING`` if its lock expires first."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            value = await self.read(namespace, cache_key)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+    def apply_version(self, namespace: str, version: int) -> None:
+        if version > self.versions.get(namespace, -1):
+            self.versions[namespace] = version
+            self.local.delete_prefix(f"cache:{namespace}:")
+
+    def reset(self) -> None:
+        self.versions.clear()
+        self.local.entries.clear()
+        for callback in self.reset_callbacks:
+            callback()
+
+    def subscribe(self, event: str, handler: Callable[[Any], None], reset: Optional[Callable[[], None]] = None):
+        """
+        Calls ``handler`` with the data of ``event`` published by other workers, and ``reset`` whenever the
+        listener subscribes again, since events published while it was disconnected are lost.
+        """
+        self.handlers[event] = handler
+        if reset is not None:
+            self.reset_callbacks.append(reset)
+
+    async def publish(self, event: str, data: Any) -> None:
+        """Sends ``event`` to the other workers; the caller applies it in its own process."""
+        message = {"event": event, "data": data, "sender": self.sender_id}
+        try:
+            await self.redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except redis.RedisError:
+            logger.warning("Event %s was not published", event, exc_info=True)
+
+    def apply_message(self, message: dict) -> None:
+        if "versions" in message:
+            for namespace, version in message["versions"].items():
+                self.apply_version(namespace, version)
+        elif message["sender"] != self.sender_id and message["event"] in self.handlers:
+            self.handlers[message["event"]](message["data"])
+
+    async def invalidate(self, *namespaces: str) -> None:
+        """Moves ``namespaces`` to new versions, here and, through their publication, in every worker."""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for namespace in namespaces:
+                    pipe.incr(self.get_version_key(namespace))
+                versions = dict(zip(namespaces, await pipe.execute()))
+            await self.redis.publish(INVALIDATION_CHANNEL, json.dumps({"versions": versions}))
+        except redis.RedisError:
+            logger.exception("Invalidation of %s was not published", ", ".join(namespaces))
+            for namespace in namespaces:
+                self.count(namespace, "errors")
+                self.versions.pop(namespace, None)
+                self.local.delete_prefix(f"cache:{namespace}:")
+            return
+        for namespace, version in versions.items():
+            self.apply_version(namespace, version)
+
+    async def run_invalidation_listener(self) -> None:
+        """
+        Applies the versions and events published by other workers. Every subscription starts from an empty
+        in-process cache, so nothing published while the listener was disconnected is missed.
+        """
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "subscribe":
+                            self.reset()
+                            self.listening = True
+                        elif message["type"] == "message":
+                            try:
+                                self.apply_message(json.loads(message["data"]))
+                            except Exception:
+                                logger.exception("Cache invalidation message was not applied")
+            except redis.RedisError:
+                logger.exception("Cache invalidation listener failed")
+            finally:
+                self.listening = False
+            await asyncio.sleep(CACHE_LISTENER_RETRY_INTERVAL)
+
+    def cached(self, namespace: str, ttl: int = CACHE_TTL, negative_ttl: int = CACHE_NEGATIVE_TTL,
+               key: Optional[Callable[..., str]] = None):
+        """
+        Caches the results of an async query function under ``namespace``, keyed by its arguments other
+        than the session, or by ``key`` called with the arguments.
+        """
+        def decorator(function):
+            @wraps(function)
+            async def wrapper(*args, **kwargs):
+                call_key = key(*args, **kwargs) if key else make_key(args, kwargs)
+                return await self.get(namespace, call_key, lambda: function(*args, **kwargs), ttl, negative_ttl)
+            return wrapper
+        return decorator
+
+    def get_stats(self) -> Dict[str, CacheStats]:
+        stats = {}
+        for namespace, counters in self.counters.items():
+            hits = counters["l1_hits"] + counters["l2_hits"] + counters["coalesced"]
+            requests = counters["requests"]
+            stats[namespace] = CacheStats(**counters, hit_ratio=hits / requests if requests else 0)
+        return stats
+
+
+cache = ReadThroughCache(get_redis())
+cached = cache.cached
@@ -12,7 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import User
 from ..quizzes.query import get_translation_words
 from ..quizzes.schemas import RandomWordResponse
-from ..quizzes.service import QuizResponseService, WordService
+from ..quizzes.events import COMPETITION_MODE
+from ..quizzes.service import QuestionPoolService, QuizAnswerService, WordService
 from ..users.query import get_user_by_telegram_id
 from ..utils import commit_changes_or_rollback
 from .models import CompetitionRoom, CompetitionRoomData
@@ -225,12 +226,11 @@ class CompetitionService:
             room_data: CompetitionRoom, session: AsyncSession, redis_client: redis.Redis
                                         ) -> RandomWordResponse:
         async with session:
-            word_service = WordService(session)
-            random_words = await word_service.get_random_words(room_data.language_from_id, room_data.language_to_id)
-
-            response = QuizResponseService.create_random_word_response(
-                random_words["word_for_translate"], random_words["other_words"]
-            )
+            response = await QuestionPoolService.pop(room_data.language_from_id, room_data.language_to_id)
+            if response is None:
+                response, = await WordService.generate_random_words(
+                    session, room_data.language_from_id, room_data.language_to_id, 1
+                )
             await CompetitionService.save_current_question(room_data.id, response, redis_client)
             return response
 
@@ -247,6 +247,8 @@ class CompetitionService:
         CompetitionService.button_block = True
         try:
             result = await self.__check_answer(answer_data)
+            await QuizAnswerService.record_answer(answer_data.word_for_translate_id, COMPETITION_MODE, result,
+                                                  answer_data.telegram_id)
             await self.__update_user_statistics(answer_data, result)
             await self.send_competition_answer(result, answer_data, room_manager, websocket_manager, redis_client)
         finally:
@@ -16,3 +16,48 @@ TEST_DB_PORT = os.environ.get("TEST_POSTGRES_PORT")
 TEST_DB_NAME = os.environ.get("TEST_POSTGRES_DB")
 TEST_DB_USER = os.environ.get("TEST_POSTGRES_USER")
 TEST_DB_PASS = os.environ.get("TEST_POSTGRES_PASSWORD")
+
+DISTRACTOR_POOL_RELOAD_INTERVAL = int(os.environ.get("DISTRACTOR_POOL_RELOAD_INTERVAL", 600))
+
+QUESTION_POOL_SIZE = int(os.environ.get("QUESTION_POOL_SIZE", 50))
+QUESTION_POOL_LOW_WATER = int(os.environ.get("QUESTION_POOL_LOW_WATER", 20))
+QUESTION_POOL_REFILL_INTERVAL = int(os.environ.get("QUESTION_POOL_REFILL_INTERVAL", 5))
+QUESTION_POOL_PAIR_TTL = int(os.environ.get("QUESTION_POOL_PAIR_TTL", 3600))
+
+ANSWER_TOKEN_SECRET = os.environ.get("ANSWER_TOKEN_SECRET")
+ANSWER_TOKEN_TTL = int(os.environ.get("ANSWER_TOKEN_TTL", 3600))
+
+DECK_TTL = int(os.environ.get("DECK_TTL", 30 * 24 * 60 * 60))
+SEEN_WORDS_OVERDEAL = int(os.environ.get("SEEN_WORDS_OVERDEAL", 3))
+
+ANSWER_EVENTS_BUFFER_SIZE = int(os.environ.get("ANSWER_EVENTS_BUFFER_SIZE", 10000))
+ANSWER_EVENTS_BATCH_SIZE = int(os.environ.get("ANSWER_EVENTS_BATCH_SIZE", 500))
+ANSWER_EVENTS_FLUSH_INTERVAL = float(os.environ.get("ANSWER_EVENTS_FLUSH_INTERVAL", 2))
+ANSWER_EVENTS_MAX_ATTEMPTS = int(os.environ.get("ANSWER_EVENTS_MAX_ATTEMPTS", 5))
+
+WORD_STATS_ROLLUP_INTERVAL = int(os.environ.get("WORD_STATS_ROLLUP_INTERVAL", 60))
+WORD_STATS_ROLLUP_BATCH_SIZE = int(os.environ.get("WORD_STATS_ROLLUP_BATCH_SIZE", 1000))
+
+DAILY_CHALLENGE_WORDS = int(os.environ.get("DAILY_CHALLENGE_WORDS", 10))
+DAILY_CHALLENGE_SENTENCES = int(os.environ.get("DAILY_CHALLENGE_SENTENCES", 5))
+DAILY_CHALLENGE_MATCHES = int(os.environ.get("DAILY_CHALLENGE_MATCHES", 2))
+DAILY_CHALLENGE_TTL = int(os.environ.get("DAILY_CHALLENGE_TTL", 2 * 24 * 60 * 60))
+DAILY_CHALLENGE_INTERVAL = int(os.environ.get("DAILY_CHALLENGE_INTERVAL", 600))
+
+NEIGHBORS_COUNT = int(os.environ.get("NEIGHBORS_COUNT", 8))
+NEIGHBORS_REFRESH_INTERVAL = int(os.environ.get("NEIGHBORS_REFRESH_INTERVAL", 60))
+
+VOCABULARY_SNAPSHOT_PATH = os.environ.get("VOCABULARY_SNAPSHOT_PATH", "vocabulary.snapshot")
+VOCABULARY_SNAPSHOT_CHECK_INTERVAL = float(os.environ.get("VOCABULARY_SNAPSHOT_CHECK_INTERVAL", 30))
+VOCABULARY_SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get("VOCABULARY_SNAPSHOT_REFRESH_INTERVAL", 60))
+
+WORD_IMPORT_CHUNK_SIZE = int(os.environ.get("WORD_IMPORT_CHUNK_SIZE", 5000))
+SENTENCE_IMPORT_CHUNK_SIZE = int(os.environ.get("SENTENCE_IMPORT_CHUNK_SIZE", 10000))
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 100))
+
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 24 * 60 * 60))
+CACHE_NEGATIVE_TTL = int(os.environ.get("CACHE_NEGATIVE_TTL", 30))
+CACHE_L1_TTL = float(os.environ.get("CACHE_L1_TTL", 60 * 60))
+CACHE_L1_SIZE = int(os.environ.get("CACHE_L1_SIZE", 1024))
+CACHE_LOCK_TIMEOUT = float(os.environ.get("CACHE_LOCK_TIMEOUT", 5))
+CACHE_LISTENER_RETRY_INTERVAL = float(os.environ.get("CACHE_LISTENER_RETRY_INTERVAL", 1))
@@ -4,12 +4,6 @@ from aiogram.utils.web_app import check_webapp_signature
 from fastapi import HTTPException, Header
 
 from src.config import BOT_TOKEN
-from src.database import get_redis
-from src.words.service import CacheRedisService
-
-
-def get_redis_connect():
-    return CacheRedisService(get_redis())
 
 
 def check_hash(init_data: Annotated[str | None, Header()]) -> None:
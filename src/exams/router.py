@@ -1,5 +1,5 @@
 import uuid
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Query
 
@@ -26,9 +26,10 @@ async def check_exam_sentence_answer(
         sentence_id: uuid.UUID,
         telegram_id: int,
         user_words: List[str] = Query(...),
+        answer_token: Optional[str] = None,
         exam_service: ExamService = Depends(get_exam_service)
 ):
-    return await exam_service.check_exam_sentence_answer(sentence_id, telegram_id, user_words)
+    return await exam_service.check_exam_sentence_answer(sentence_id, telegram_id, user_words, answer_token)
 
 
 @router.get("/check-exam-answer", response_model=ExamAnswerResponseSchema)
@@ -36,6 +37,7 @@ async def check_exam_answer(
         word_for_translate_id: uuid.UUID,
         user_word_id: uuid.UUID,
         telegram_id: int,
+        answer_token: Optional[str] = None,
         exam_service: ExamService = Depends(get_exam_service)
 ):
-    return await exam_service.check_exam_answer(word_for_translate_id, user_word_id, telegram_id)
+    return await exam_service.check_exam_answer(word_for_translate_id, user_word_id, telegram_id, answer_token)
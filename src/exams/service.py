@@ -1,6 +1,6 @@
 import random
 import uuid
-from typing import List
+from typing import List, Optional
 
 from fastapi import Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,9 +9,9 @@ from starlette import status
 from src.exams.query import get_user_exam
 from src.exams.schemas import ExamAnswerResponseSchema, ExamSchema
 from src.models import TranslationWord, Exam, User
-from src.quizzes.query import get_sentence_translation
-from src.quizzes.service import SentenceService, WordService
-from src.quizzes.utils import delete_punctuation
+from src.quizzes.events import EXAM_SENTENCE_MODE, EXAM_WORD_MODE
+from src.quizzes.service import DeckService, QuizAnswerService, SentenceService, WordService
+from src.quizzes.tokens import answer_tokens
 from src.users.query import get_user_by_telegram_id
 from src.users.service import UserService
 from src.utils import commit_changes_or_rollback
@@ -57,13 +57,15 @@ class ExamService:
         return exercise
 
     async def check_exam_sentence_answer(self, sentence_id: uuid.UUID, telegram_id: int,
-                                         user_words: List[str] = Query(...)) -> ExamAnswerResponseSchema:
+                                         user_words: List[str] = Query(...),
+                                         answer_token: Optional[str] = None) -> ExamAnswerResponseSchema:
         async with self.session as session:
             user = await get_user_by_telegram_id(session, telegram_id)
             user_exam = await get_user_exam(session, user.id)
-            sentence = await get_sentence_translation(session, sentence_id)
-            result = delete_punctuation(sentence.name).lower() == " ".join(user_words).lower()
-            response = await self.update_user_progress(result, user_exam, user)
+            result = await QuizAnswerService.match_sentence_answer(session, sentence_id, user_words, answer_token)
+            await QuizAnswerService.record_answer(sentence_id, EXAM_SENTENCE_MODE, result.correct, telegram_id,
+                                                  answer_token)
+            response = await self.update_user_progress(result.correct, user_exam, user)
             return response
 
     async def check_exam_answer(
@@ -71,12 +73,19 @@ class ExamService:
             word_for_translate_id: uuid.UUID,
             user_word_id: uuid.UUID,
             telegram_id: int,
+            answer_token: Optional[str] = None,
     ) -> ExamAnswerResponseSchema:
         async with self.session as session:
             user = await get_user_by_telegram_id(session, telegram_id)
             user_exam = await get_user_exam(session, user.id)
-            word = await session.get(TranslationWord, user_word_id)
-            result = word_for_translate_id == word.word_id
+            result = None
+            if answer_token:
+                result = answer_tokens.verify_word_answer(answer_token, word_for_translate_id, user_word_id)
+            if result is None:
+                word = await session.get(TranslationWord, user_word_id)
+                result = word_for_translate_id == word.word_id
+            await QuizAnswerService.record_answer(word_for_translate_id, EXAM_WORD_MODE, result, telegram_id,
+                                                  answer_token)
             response = await self.update_user_progress(result, user_exam, user)
             return response
 
@@ -102,6 +111,7 @@ class ExamService:
             new_user_rating = await UserService.update_user_rating(user.rating)
             user.rating = new_user_rating
             await commit_changes_or_rollback(session, "Ошибка при обновлении данных")
+            await DeckService.invalidate(user.telegram_id)
             response = ExamAnswerResponseSchema(success=True, message="exam is completed")
         return response
 
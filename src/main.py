@@ -1,14 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 
+from src.cache import cache
 from src.competitions.router import router as competitions_router
 from src.exams.router import router as exams_router
+from src.quizzes.events import answer_event_buffer
 from src.quizzes.router import router as quizzes_router
+from src.quizzes.service import (DailyChallengeService, NeighborService, QuestionPoolService, VocabularySnapshotService,
+                                 WordStatsService)
 from src.users.router import router as users_router
 from src.words.router import router as words_router
 
-app = FastAPI(docs_url=None, title='Learn API')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [
+        asyncio.create_task(QuestionPoolService.run_refill_loop()),
+        asyncio.create_task(answer_event_buffer.run()),
+        asyncio.create_task(WordStatsService.run_rollup_loop()),
+        asyncio.create_task(DailyChallengeService.run_generation_loop()),
+        asyncio.create_task(NeighborService.run_refresh_loop()),
+        asyncio.create_task(VocabularySnapshotService.run_refresh_loop()),
+        asyncio.create_task(cache.run_invalidation_listener()),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await answer_event_buffer.flush()
+
+
+app = FastAPI(docs_url=None, title='Learn API', lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,9 +1,10 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
+from typing import List
 
-from sqlalchemy import DateTime, ForeignKey, String, func, text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import DDL, BigInteger, DateTime, FetchedValue, ForeignKey, Index, String, event, func, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -30,6 +31,10 @@ class User(Base):
 
 class Sentence(Base):
     __tablename__ = 'sentences'
+    __table_args__ = (
+        Index("ix_sentences_language_id_ordinal", "language_id", "ordinal", unique=True),
+        Index("ix_sentences_bucket", "language_id", "level", "bucket_ordinal", unique=True),
+    )
 
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -39,6 +44,8 @@ class Sentence(Base):
     name: Mapped[str]
     level: Mapped[str] = mapped_column(nullable=True)
     language_id: Mapped[int] = mapped_column(ForeignKey("languages.id"))
+    ordinal: Mapped[int]
+    bucket_ordinal: Mapped[int]
 
     translation: Mapped["TranslationSentence"] = relationship(back_populates="sentence")
 
@@ -55,12 +62,19 @@ class TranslationSentence(Base):
     sentence_id: Mapped[UUID] = mapped_column(ForeignKey("sentences.id"))
     from_language_id: Mapped[int] = mapped_column(ForeignKey("languages.id"))
     to_language_id: Mapped[int] = mapped_column(ForeignKey("languages.id"))
+    tokens: Mapped[List[str]] = mapped_column(ARRAY(String))
 
     sentence: Mapped["Sentence"] = relationship(back_populates="translation")
 
 
 class Word(Base):
     __tablename__ = 'words'
+    __table_args__ = (
+        Index("ix_words_language_id_ordinal", "language_id", "ordinal", unique=True),
+        Index("ix_words_bucket", "language_id", "level", "part_of_speech", "bucket_ordinal", unique=True),
+        Index("ix_words_language_id_name", "language_id", "name"),
+        Index("ix_words_language_id_seen_index", "language_id", "seen_index", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -71,6 +85,9 @@ class Word(Base):
     language_id: Mapped[int] = mapped_column(ForeignKey("languages.id"))
     part_of_speech: Mapped[str]
     level: Mapped[str]
+    ordinal: Mapped[int]
+    bucket_ordinal: Mapped[int]
+    seen_index: Mapped[int] = mapped_column(server_default=FetchedValue())
 
     translation: Mapped["TranslationWord"] = relationship(back_populates="word")
     favorite_word: Mapped["FavoriteWord"] = relationship(back_populates="word")
@@ -79,6 +96,10 @@ class Word(Base):
 
 class TranslationWord(Base):
     __tablename__ = 'translation_words'
+    __table_args__ = (
+        Index("ix_translation_words_to_language_id_ordinal", "to_language_id", "ordinal", unique=True),
+        Index("ix_translation_words_word_id", "word_id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -89,19 +110,147 @@ class TranslationWord(Base):
     from_language_id: Mapped[int] = mapped_column(ForeignKey("languages.id"))
     to_language_id: Mapped[int] = mapped_column(ForeignKey("languages.id"))
     name: Mapped[str]
+    ordinal: Mapped[int]
 
     word: Mapped["Word"] = relationship(back_populates="translation")
 
 
+class TranslationWordNeighbors(Base):
+    __tablename__ = 'translation_word_neighbors'
+
+    translation_word_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("translation_words.id", ondelete="CASCADE"), primary_key=True
+    )
+    neighbor_ids: Mapped[List[uuid.UUID]] = mapped_column(ARRAY(UUID(as_uuid=True)))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+
+
+QUIZ_ITEM_PAYLOAD = ["word_id", "word_name", "translation_id", "translation_name"]
+
+
+class QuizItem(Base):
+    """
+    One row per translation word with everything a word question needs, kept in sync with ``words`` and
+    ``translation_words`` by triggers, so the quiz endpoints read a single table with index-only scans.
+    """
+    __tablename__ = 'quiz_items'
+    __table_args__ = (
+        Index("ix_quiz_items_bucket", "language_from_id", "level", "part_of_speech", "bucket_ordinal",
+              postgresql_include=QUIZ_ITEM_PAYLOAD),
+        Index("ix_quiz_items_ordinal", "language_from_id", "ordinal", postgresql_include=QUIZ_ITEM_PAYLOAD),
+        Index("ix_quiz_items_word_id", "word_id",
+              postgresql_include=["language_to_id", "word_name", "translation_id", "translation_name"]),
+    )
+
+    translation_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("translation_words.id", ondelete="CASCADE"), primary_key=True
+    )
+    word_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("words.id", ondelete="CASCADE"))
+    word_name: Mapped[str]
+    translation_name: Mapped[str]
+    language_from_id: Mapped[int]
+    language_to_id: Mapped[int]
+    level: Mapped[str]
+    part_of_speech: Mapped[str]
+    ordinal: Mapped[int]
+    bucket_ordinal: Mapped[int]
+
+
+QUIZ_ITEM_TRIGGERS = (
+    """
+    CREATE OR REPLACE FUNCTION sync_quiz_item_translation() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO quiz_items (translation_id, word_id, word_name, translation_name, language_from_id,
+                                language_to_id, level, part_of_speech, ordinal, bucket_ordinal)
+        SELECT NEW.id, words.id, words.name, NEW.name, words.language_id, NEW.to_language_id, words.level,
+               words.part_of_speech, words.ordinal, words.bucket_ordinal
+        FROM words WHERE words.id = NEW.word_id
+        ON CONFLICT (translation_id) DO UPDATE SET
+            word_id = EXCLUDED.word_id, word_name = EXCLUDED.word_name,
+            translation_name = EXCLUDED.translation_name, language_from_id = EXCLUDED.language_from_id,
+            language_to_id = EXCLUDED.language_to_id, level = EXCLUDED.level,
+            part_of_speech = EXCLUDED.part_of_speech, ordinal = EXCLUDED.ordinal,
+            bucket_ordinal = EXCLUDED.bucket_ordinal;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_quiz_item_word() RETURNS trigger AS $$
+    BEGIN
+        UPDATE quiz_items SET word_name = NEW.name, language_from_id = NEW.language_id, level = NEW.level,
+                              part_of_speech = NEW.part_of_speech, ordinal = NEW.ordinal,
+                              bucket_ordinal = NEW.bucket_ordinal
+        WHERE word_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER sync_quiz_item AFTER INSERT OR UPDATE ON translation_words
+    FOR EACH ROW EXECUTE FUNCTION sync_quiz_item_translation()
+    """,
+    """
+    CREATE TRIGGER sync_quiz_item AFTER UPDATE ON words
+    FOR EACH ROW EXECUTE FUNCTION sync_quiz_item_word()
+    """,
+)
+
+for statement in QUIZ_ITEM_TRIGGERS:
+    event.listen(QuizItem.__table__, "after_create", DDL(statement))
+
+
 class Language(Base):
     __tablename__ = 'languages'
 
     id: Mapped[int] = mapped_column(primary_key=True)
     language: Mapped[str]
+    next_word_seen_index: Mapped[int] = mapped_column(server_default="0")
+
+
+WORD_SEEN_INDEX_TRIGGERS = (
+    """
+    CREATE OR REPLACE FUNCTION assign_word_seen_index() RETURNS trigger AS $$
+    BEGIN
+        UPDATE languages SET next_word_seen_index = next_word_seen_index + 1 WHERE id = NEW.language_id
+        RETURNING next_word_seen_index - 1 INTO NEW.seen_index;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER assign_seen_index BEFORE INSERT ON words
+    FOR EACH ROW EXECUTE FUNCTION assign_word_seen_index()
+    """,
+)
+
+for statement in WORD_SEEN_INDEX_TRIGGERS:
+    event.listen(Word.__table__, "after_create", DDL(statement))
+
+
+class WordStat(Base):
+    __tablename__ = 'word_stats'
+
+    word_id: Mapped[UUID] = mapped_column(ForeignKey("words.id", ondelete="CASCADE"), primary_key=True)
+    attempts: Mapped[int] = mapped_column(BigInteger, default=0)
+    correct: Mapped[int] = mapped_column(BigInteger, default=0)
+    latency_ms_total: Mapped[int] = mapped_column(BigInteger, default=0)
+    latency_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class DailyChallengeScore(Base):
+    __tablename__ = 'daily_challenge_scores'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(primary_key=True)
+    score: Mapped[int]
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
 
 
 class FavoriteWord(Base):
     __tablename__ = 'favorite_words'
+    __table_args__ = (Index("ix_favorite_words_user_id_word_id", "user_id", "word_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
@@ -122,3 +271,28 @@ class Exam(Base):
     status: Mapped[str] = mapped_column(default="started")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
+
+
+class AnswerEvent(Base):
+    __tablename__ = 'answer_events'
+    __table_args__ = (
+        Index("ix_answer_events_telegram_id_created_at", "telegram_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    telegram_id: Mapped[int] = mapped_column(nullable=True)
+    item_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True))
+    mode: Mapped[str]
+    correct: Mapped[bool]
+    latency_ms: Mapped[int] = mapped_column(nullable=True)
+
+
+class ImportCheckpoint(Base):
+    """Last committed line of a named bulk import, saved in the transaction of every chunk."""
+    __tablename__ = 'import_checkpoints'
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    line: Mapped[int]
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
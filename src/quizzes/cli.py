@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+from datetime import date
+
+from src.config import VOCABULARY_SNAPSHOT_PATH
+from src.database import async_session_maker, redis_pool
+from src.quizzes.service import (DailyChallengeService, NeighborService, QuizItemService,
+                                 VocabularySnapshotService)
+from src.quizzes.utils import get_today
+
+
+async def generate_daily_challenges(day: date, language_pair: tuple = None, regenerate: bool = False) -> int:
+    try:
+        async with async_session_maker() as session:
+            daily_challenge_service = DailyChallengeService(session)
+            if language_pair is None:
+                return await daily_challenge_service.generate_for_all_pairs(day, regenerate)
+            return int(await daily_challenge_service.generate(*language_pair, day, regenerate))
+    finally:
+        await redis_pool.disconnect()
+
+
+async def build_neighbors(language_to_id: int = None, rebuild: bool = False) -> int:
+    async with async_session_maker() as session:
+        if language_to_id is None:
+            return await NeighborService.build_all(session, rebuild)
+        return await NeighborService.build(session, language_to_id, rebuild)
+
+
+async def rebuild_quiz_items() -> int:
+    async with async_session_maker() as session:
+        return await QuizItemService.rebuild(session)
+
+
+async def build_vocabulary_snapshot(path: str) -> int:
+    async with async_session_maker() as session:
+        return await VocabularySnapshotService.build(session, path)
+
+
+def parse_language_pair(value: str) -> tuple:
+    language_from_id, language_to_id = value.split(":")
+    return int(language_from_id), int(language_to_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    daily = commands.add_parser("daily", help="Generate the daily challenge of every language pair")
+    daily.add_argument("--day", type=date.fromisoformat, default=get_today(), help="YYYY-MM-DD, today by default")
+    daily.add_argument("--pair", type=parse_language_pair, help="LANGUAGE_FROM_ID:LANGUAGE_TO_ID, all by default")
+    daily.add_argument("--regenerate", action="store_true", help="Replace an already generated challenge")
+    neighbors = commands.add_parser("neighbors", help="Compute confusable distractors of translation words")
+    neighbors.add_argument("--language", type=int, help="Target language id, all by default")
+    neighbors.add_argument("--rebuild", action="store_true", help="Recompute words that already have neighbors")
+    commands.add_parser("quiz-items", help="Rebuild the quiz_items table from words and translations")
+    snapshot = commands.add_parser("snapshot", help="Write the vocabulary snapshot shared by the workers")
+    snapshot.add_argument("--path", default=VOCABULARY_SNAPSHOT_PATH, help="Snapshot file, replaced atomically")
+    args = parser.parse_args()
+
+    if args.command == "daily":
+        generated = asyncio.run(generate_daily_challenges(args.day, args.pair, args.regenerate))
+        print(f"Generated {generated} daily challenge(s) for {args.day}")
+    elif args.command == "neighbors":
+        built = asyncio.run(build_neighbors(args.language, args.rebuild))
+        print(f"Computed neighbors of {built} translation word(s)")
+    elif args.command == "quiz-items":
+        rebuilt = asyncio.run(rebuild_quiz_items())
+        print(f"Rebuilt {rebuilt} quiz item(s)")
+    elif args.command == "snapshot":
+        written = asyncio.run(build_vocabulary_snapshot(args.path))
+        print(f"Wrote {written} word(s) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from datetime import date
+from typing import Optional
+
+import redis.asyncio as redis
+
+from src.config import DAILY_CHALLENGE_TTL
+from src.database import get_redis
+
+
+class DailyChallengeStore:
+    """
+    One daily challenge per language pair and day, stored as ready JSON so serving it is a single GET.
+    Saving never replaces an existing set unless asked to, which keeps the generation job idempotent.
+    """
+
+    def __init__(self, redis_client: redis.Redis, ttl: int = DAILY_CHALLENGE_TTL):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(language_from_id: int, language_to_id: int, day: date) -> str:
+        return f"daily:{language_from_id}:{language_to_id}:{day.isoformat()}"
+
+    async def get(self, language_from_id: int, language_to_id: int, day: date) -> Optional[bytes]:
+        return await self.redis.get(self.get_key(language_from_id, language_to_id, day))
+
+    async def exists(self, language_from_id: int, language_to_id: int, day: date) -> bool:
+        return bool(await self.redis.exists(self.get_key(language_from_id, language_to_id, day)))
+
+    async def save(self, language_from_id: int, language_to_id: int, day: date, challenge: str,
+                   replace: bool = False) -> bool:
+        key = self.get_key(language_from_id, language_to_id, day)
+        return bool(await self.redis.set(key, challenge, ex=self.ttl, nx=not replace))
+
+
+daily_challenge_store = DailyChallengeStore(get_redis())
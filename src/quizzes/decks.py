@@ -0,0 +1,116 @@
+import random
+from typing import List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from src.config import DECK_TTL
+from src.database import get_redis
+
+WORD_DECK = "word"
+MATCH_DECK = "match"
+
+FEISTEL_ROUNDS = 4
+
+
+def shuffle_ordinal(position: int, size: int, seed: int) -> int:
+    """
+    Maps ``position`` to its card in the deck: a seeded Feistel permutation of the smallest even-bit range
+    covering ``size``, cycle-walked until the result falls inside ``range(size)``.
+    """
+    bits = max(2, (size - 1).bit_length())
+    bits += bits % 2
+    half = bits // 2
+    mask = (1 << half) - 1
+    value = position
+    while True:
+        left, right = value >> half, value & mask
+        for round_number in range(FEISTEL_ROUNDS):
+            round_key = (seed >> (16 * round_number)) & 0xFFFF
+            mixed = ((right + round_key) * 0x9E3779B1) & 0xFFFFFFFF
+            mixed ^= mixed >> 15
+            mixed = (mixed * 0x85EBCA6B) & 0xFFFFFFFF
+            mixed ^= mixed >> 13
+            left, right = right, left ^ (mixed & mask)
+        value = (left << half) | right
+        if value < size:
+            return value
+
+
+class DeckStore:
+    """
+    Per-user shuffled decks of word positions, so a user sees every word of a selection before any repeats.
+    A deck is a Redis hash of its size, seed, deck id and cursor; the order itself is computed from the seed.
+    The deck id names the selection (language and filters) and a different one starts a new deck.
+    A deck also keeps the filters it was requested with and the caller's metadata of the selection (its
+    language and bucket sizes), so the next cards can be dealt before the selection is looked up again.
+    """
+
+    def __init__(self, redis_client: redis.Redis, ttl: int = DECK_TTL):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(user_id: int, mode: str) -> str:
+        return f"deck:{mode}:{user_id}"
+
+    async def deal(self, user_id: int, mode: str, deck_id: str, size: int, k: int, filters: str = "",
+                   metadata: str = "") -> List[int]:
+        if size == 0:
+            return []
+        k = min(k, size)
+        key = self.get_key(user_id, mode)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(key, "cursor", k)
+            pipe.hmget(key, "size", "seed", "deck_id")
+            pipe.expire(key, self.ttl)
+            cursor, (deck_size, seed, current_deck_id), _ = await pipe.execute()
+
+        if deck_size is None or current_deck_id != deck_id.encode() or int(deck_size) > size:
+            return await self.shuffle(key, deck_id, size, k, filters, metadata)
+        deck_size, seed = int(deck_size), int(seed)
+        cards = [shuffle_ordinal(position, deck_size, seed) for position in range(cursor - k, min(cursor, deck_size))]
+        if cursor >= deck_size:
+            cards.extend(await self.shuffle(key, deck_id, size, k - len(cards), filters, metadata, set(cards)))
+        return cards
+
+    async def deal_known(self, user_id: int, mode: str, filters: str, k: int) -> Optional[Tuple[str, List[int]]]:
+        """
+        Metadata and next ``k`` cards of the deck requested with ``filters``, or None, leaving the deck as it was,
+        if there is no such deck or it runs out: a new deck needs the current size of the selection.
+        """
+        key = self.get_key(user_id, mode)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(key, "cursor", k)
+            pipe.hmget(key, "size", "seed", "filters", "metadata")
+            pipe.expire(key, self.ttl)
+            cursor, (deck_size, seed, deck_filters, metadata), _ = await pipe.execute()
+
+        if deck_size is None or deck_filters != filters.encode() or cursor > int(deck_size):
+            if deck_size is not None:
+                await self.redis.hincrby(key, "cursor", -k)
+            return None
+        deck_size, seed = int(deck_size), int(seed)
+        return metadata.decode(), [shuffle_ordinal(position, deck_size, seed) for position in range(cursor - k, cursor)]
+
+    async def shuffle(self, key: str, deck_id: str, size: int, k: int, filters: str = "", metadata: str = "",
+                      exclude: set = frozenset()) -> List[int]:
+        seed = random.getrandbits(64)
+        cards = []
+        position = 0
+        while len(cards) < k and position < size:
+            card = shuffle_ordinal(position, size, seed)
+            if card not in exclude:
+                cards.append(card)
+            position += 1
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={"size": size, "seed": seed, "deck_id": deck_id, "cursor": position,
+                                    "filters": filters, "metadata": metadata})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        return cards
+
+    async def invalidate(self, user_id: int) -> None:
+        await self.redis.delete(self.get_key(user_id, WORD_DECK), self.get_key(user_id, MATCH_DECK))
+
+
+deck_store = DeckStore(get_redis())
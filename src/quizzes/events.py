@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import (ANSWER_EVENTS_BATCH_SIZE, ANSWER_EVENTS_BUFFER_SIZE, ANSWER_EVENTS_FLUSH_INTERVAL,
+                        ANSWER_EVENTS_MAX_ATTEMPTS)
+from src.database import async_session_maker
+from src.models import AnswerEvent
+from src.quizzes.schemas import AnswerEventStats
+
+logger = logging.getLogger(__name__)
+
+WORD_MODE = "word"
+SENTENCE_MODE = "sentence"
+EXAM_WORD_MODE = "exam_word"
+EXAM_SENTENCE_MODE = "exam_sentence"
+COMPETITION_MODE = "competition"
+MATCH_MODE = "match"
+WORD_MODES = (WORD_MODE, EXAM_WORD_MODE, COMPETITION_MODE, MATCH_MODE)
+
+
+def get_month_start(moment: datetime, months_ahead: int = 0) -> datetime:
+    month = moment.month - 1 + months_ahead
+    return datetime(moment.year + month // 12, month % 12 + 1, 1)
+
+
+async def create_answer_event_partitions(session: AsyncSession, moment: datetime, months: int = 2) -> None:
+    """
+    Creates the partitions of the month of ``moment`` and of the following ones. Workers take turns,
+    because concurrent ``CREATE TABLE IF NOT EXISTS`` of the same partition can still fail.
+    """
+    await session.execute(select(func.pg_advisory_xact_lock(func.hashtext("answer_events_partitions"))))
+    for months_ahead in range(months):
+        start = get_month_start(moment, months_ahead)
+        end = get_month_start(moment, months_ahead + 1)
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS answer_events_{start:%Y_%m} PARTITION OF answer_events "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+    await session.commit()
+
+
+class AnswerEventBuffer:
+    """
+    Bounded in-process queue of answer events written to ``answer_events`` in batches by a background task,
+    so the check endpoints never wait on the insert. When the queue is full new events are dropped and counted.
+    A batch that cannot be written is kept and retried first on the next flushes, up to ``max_attempts`` writes,
+    after which it is counted as failed.
+    """
+
+    def __init__(self, max_size: int = ANSWER_EVENTS_BUFFER_SIZE, batch_size: int = ANSWER_EVENTS_BATCH_SIZE,
+                 flush_interval: float = ANSWER_EVENTS_FLUSH_INTERVAL, max_attempts: int = ANSWER_EVENTS_MAX_ATTEMPTS,
+                 session_maker=async_session_maker):
+        self.session_maker = session_maker
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.pending: List[dict] = []
+        self.attempts = 0
+        self.flush_requested = asyncio.Event()
+        self.partitions_month: Optional[datetime] = None
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, item_id: uuid.UUID, mode: str, correct: bool, telegram_id: Optional[int] = None,
+               issued_at: Optional[float] = None) -> None:
+        now = time.time()
+        event = {
+            "created_at": datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None),
+            "telegram_id": telegram_id,
+            "item_id": item_id,
+            "mode": mode,
+            "correct": correct,
+            "latency_ms": int((now - issued_at) * 1000) if issued_at is not None else None,
+        }
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        if self.queue.qsize() >= self.batch_size:
+            self.flush_requested.set()
+
+    def take_batch(self) -> List[dict]:
+        batch, self.pending = self.pending, []
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def flush(self) -> int:
+        flushed = 0
+        while batch := self.take_batch():
+            try:
+                async with self.session_maker() as session:
+                    await self.ensure_partitions(session, batch[0]["created_at"])
+                    await session.execute(insert(AnswerEvent), batch)
+                    await session.commit()
+            except Exception:
+                logger.exception("Could not write %s answer events", len(batch))
+                self.partitions_month = None
+                self.attempts += 1
+                if self.attempts < self.max_attempts:
+                    self.pending = batch
+                    break
+                self.failed += len(batch)
+                self.attempts = 0
+                continue
+            self.attempts = 0
+            self.flushed += len(batch)
+            flushed += len(batch)
+        return flushed
+
+    async def ensure_partitions(self, session: AsyncSession, moment: datetime) -> None:
+        month = get_month_start(moment)
+        if self.partitions_month != month:
+            await create_answer_event_partitions(session, moment)
+            self.partitions_month = month
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            await self.flush()
+
+    def get_stats(self) -> AnswerEventStats:
+        return AnswerEventStats(queued=self.queue.qsize() + len(self.pending), flushed=self.flushed,
+                                dropped=self.dropped, failed=self.failed)
+
+
+answer_event_buffer = AnswerEventBuffer()
@@ -0,0 +1,57 @@
+import uuid
+from typing import Iterable, List, Optional
+
+import redis.asyncio as redis
+
+from src.database import get_redis
+
+ADD_IF_LOADED = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('sadd', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class FavoriteIndex:
+    """
+    Write-through copy of each user's favorite word ids in a Redis set. A loaded set always holds ``loaded_marker``,
+    so a missing key means "not loaded yet" and an empty favorite list still avoids the database.
+    """
+
+    loaded_marker = b"\x00"
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.add_if_loaded = self.redis.register_script(ADD_IF_LOADED)
+
+    @staticmethod
+    def get_key(telegram_id: int) -> str:
+        return f"favorites:{telegram_id}"
+
+    async def load(self, telegram_id: int, word_ids: Iterable[uuid.UUID]) -> None:
+        key = self.get_key(telegram_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.sadd(key, self.loaded_marker, *[word_id.bytes for word_id in word_ids])
+            await pipe.execute()
+
+    async def sample(self, telegram_id: int) -> Optional[List[uuid.UUID]]:
+        members = await self.redis.srandmember(self.get_key(telegram_id), 2)
+        if not members:
+            return None
+        return [uuid.UUID(bytes=member) for member in members if member != self.loaded_marker][:1]
+
+    async def contains(self, telegram_id: int, word_id: uuid.UUID) -> Optional[bool]:
+        key = self.get_key(telegram_id)
+        loaded, contains = await self.redis.smismember(key, [self.loaded_marker, word_id.bytes])
+        return bool(contains) if loaded else None
+
+    async def add(self, telegram_id: int, word_id: uuid.UUID) -> None:
+        await self.add_if_loaded(keys=[self.get_key(telegram_id)], args=[word_id.bytes])
+
+    async def remove(self, telegram_id: int, word_id: uuid.UUID) -> None:
+        await self.redis.srem(self.get_key(telegram_id), word_id.bytes)
+
+
+favorite_index = FavoriteIndex(get_redis())
@@ -0,0 +1,120 @@
+import time
+import uuid
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAX_DRAW_ATTEMPTS = 8
+
+
+class QuestionBatch(NamedTuple):
+    """Candidate indices of every question: its target, and its options with the answer at ``answer_positions``."""
+    targets: np.ndarray
+    options: np.ndarray
+    answer_positions: np.ndarray
+
+
+class QuestionCandidates:
+    """
+    Quiz items of one language pair as arrays: 16-byte word and translation ids, ids of distinct translation
+    names, and the indices of the precomputed confusable neighbors of every translation, ``-1`` padded.
+    Rows carry ids as 16 raw bytes and their neighbors as the concatenated raw bytes of their ids.
+    """
+
+    def __init__(self, rows: Sequence, neighbors_count: int = 8):
+        self.loaded_at = time.monotonic()
+        self.word_ids = np.frombuffer(b"".join(row.word_id for row in rows), dtype=np.uint8).reshape(-1, 16)
+        self.translation_ids = np.frombuffer(b"".join(row.translation_id for row in rows),
+                                             dtype=np.uint8).reshape(-1, 16)
+        self.word_names = [row.word_name for row in rows]
+        self.translation_names = [row.translation_name for row in rows]
+        _, self.name_ids = np.unique(np.array([name.lower() for name in self.translation_names], dtype=str),
+                                     return_inverse=True)
+        self.neighbors = self.get_neighbor_indices([row.neighbor_ids or b"" for row in rows], neighbors_count)
+
+    def get_neighbor_indices(self, packed_neighbor_ids: List[bytes], neighbors_count: int) -> np.ndarray:
+        neighbors = np.full((len(packed_neighbor_ids), neighbors_count), -1, dtype=np.int32)
+        counts = np.array([len(ids) // 16 for ids in packed_neighbor_ids], dtype=np.int64)
+        neighbor_ids = np.frombuffer(b"".join(packed_neighbor_ids), dtype="S16")
+        if not len(neighbor_ids):
+            return neighbors
+        translation_ids = self.translation_ids.view("S16").ravel()
+        order = np.argsort(translation_ids)
+        positions = np.minimum(np.searchsorted(translation_ids, neighbor_ids, sorter=order), len(order) - 1)
+        indices = order[positions]
+        indices[translation_ids[indices] != neighbor_ids] = -1
+        rows = np.repeat(np.arange(len(counts)), counts)
+        columns = np.arange(len(neighbor_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        kept = columns < neighbors_count
+        neighbors[rows[kept], columns[kept]] = indices[kept]
+        return neighbors
+
+    def __len__(self) -> int:
+        return len(self.word_names)
+
+    def get_word(self, index: int) -> Tuple[uuid.UUID, str]:
+        return uuid.UUID(bytes=self.word_ids[index].tobytes()), self.word_names[index]
+
+    def get_translation(self, index: int) -> Tuple[uuid.UUID, str]:
+        return uuid.UUID(bytes=self.translation_ids[index].tobytes()), self.translation_names[index]
+
+
+def find_invalid_distractors(candidates: QuestionCandidates, targets: np.ndarray, distractors: np.ndarray):
+    """Missing distractors, and distractors named like the answer or like a previous distractor of the question."""
+    names = np.where(distractors >= 0, candidates.name_ids[np.maximum(distractors, 0)], -1)
+    invalid = (distractors < 0) | (names == candidates.name_ids[targets][:, None])
+    for column in range(1, distractors.shape[1]):
+        invalid[:, column] |= (names[:, column, None] == names[:, :column]).any(axis=1)
+    return invalid
+
+
+def choose_distractors(candidates: QuestionCandidates, targets: np.ndarray, k: int,
+                       rng: np.random.Generator) -> np.ndarray:
+    """
+    ``k`` distractors per target: random confusable neighbors where the target has them, uniform draws
+    over the other candidates for the rest, redrawn while they repeat a name of the question.
+    """
+    neighbors = candidates.neighbors[targets]
+    keys = rng.random(neighbors.shape)
+    keys[neighbors < 0] = np.inf
+    order = np.argsort(keys, axis=1)[:, :k]
+    distractors = np.take_along_axis(neighbors, order, axis=1).astype(np.int64)
+    if distractors.shape[1] < k:
+        distractors = np.pad(distractors, ((0, 0), (0, k - distractors.shape[1])), constant_values=-1)
+    invalid = find_invalid_distractors(candidates, targets, distractors)
+    for _ in range(MAX_DRAW_ATTEMPTS):
+        rows, columns = np.nonzero(invalid)
+        if not len(rows):
+            break
+        drawn = rng.integers(0, len(candidates) - 1, len(rows))
+        distractors[rows, columns] = drawn + (drawn >= targets[rows])
+        invalid = find_invalid_distractors(candidates, targets, distractors)
+    return distractors
+
+
+def generate_questions(candidates: QuestionCandidates, count: int, k: int = 2,
+                       rng: Optional[np.random.Generator] = None, distinct: bool = False) -> QuestionBatch:
+    """
+    ``count`` multiple-choice questions with ``k`` distractors each, sampled and shuffled at once. With
+    ``distinct`` no word is asked twice, so there are at most as many questions as candidates.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if len(candidates) < 2:
+        return QuestionBatch(np.empty(0, np.int64), np.empty((0, 1), np.int64), np.empty(0, np.int64))
+    k = min(k, len(candidates) - 1)
+    if distinct:
+        targets = rng.choice(len(candidates), min(count, len(candidates)), replace=False)
+    else:
+        targets = rng.integers(0, len(candidates), count)
+    options = np.column_stack([targets, choose_distractors(candidates, targets, k, rng)])
+    permutations = np.argsort(rng.random(options.shape), axis=1)
+    options = np.take_along_axis(options, permutations, axis=1)
+    return QuestionBatch(targets, options, np.argmax(permutations == 0, axis=1))
+
+
+def iter_questions(candidates: QuestionCandidates, batch: QuestionBatch) -> Iterator[tuple]:
+    """Word for translate, shuffled options and the translation id of every question of ``batch``."""
+    for target, options in zip(batch.targets.tolist(), batch.options.tolist()):
+        translation_id, _ = candidates.get_translation(target)
+        options = [candidates.get_translation(option) for option in options if option >= 0]
+        yield candidates.get_word(target), options, translation_id
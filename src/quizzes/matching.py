@@ -0,0 +1,133 @@
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+from src.quizzes.utils import delete_punctuation
+
+TYPO_TOLERANCE = {"A1": 3, "A2": 3, "B1": 2, "B2": 2, "C1": 1, "C2": 1}
+DEFAULT_TYPO_TOLERANCE = 1
+
+
+class TokenMatch(NamedTuple):
+    correct: bool
+    distance: int
+    token_distance: int
+    wrong_tokens: List[int]
+    extra_tokens: List[int]
+
+
+def get_pattern_masks(pattern: Sequence[Hashable]) -> Dict[Hashable, int]:
+    masks = {}
+    for index, symbol in enumerate(pattern):
+        masks[symbol] = masks.get(symbol, 0) | 1 << index
+    return masks
+
+
+def edit_distance(source: Sequence[Hashable], target: Sequence[Hashable], max_distance: Optional[int] = None) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions) between two sequences of
+    characters or tokens, computed with Hyyrö's bit-parallel variant of Myers' algorithm: one pass over
+    ``target`` with a few integer operations per symbol. With ``max_distance`` it stops as soon as the
+    distance is known to exceed it and returns ``max_distance + 1``.
+    """
+    if len(source) < len(target):
+        source, target = target, source
+    length = len(source)
+    if max_distance is not None and length - len(target) > max_distance:
+        return max_distance + 1
+    if not target:
+        return length
+    masks = get_pattern_masks(source)
+    mask = (1 << length) - 1
+    last_bit = 1 << (length - 1)
+    vertical_positive, vertical_negative = mask, 0
+    diagonal_zero = previous_match = 0
+    distance = length
+    remaining = len(target)
+    for symbol in target:
+        match = masks.get(symbol, 0)
+        transposition = (((~diagonal_zero) & match) << 1) & previous_match
+        diagonal_zero = ((((match & vertical_positive) + vertical_positive) ^ vertical_positive)
+                         | match | vertical_negative | transposition)
+        horizontal_positive = vertical_negative | ~(diagonal_zero | vertical_positive)
+        horizontal_negative = diagonal_zero & vertical_positive
+        if horizontal_positive & last_bit:
+            distance += 1
+        elif horizontal_negative & last_bit:
+            distance -= 1
+        remaining -= 1
+        if max_distance is not None and distance - remaining > max_distance:
+            return max_distance + 1
+        horizontal_positive = ((horizontal_positive << 1) | 1) & mask
+        horizontal_negative = (horizontal_negative << 1) & mask
+        vertical_positive = (horizontal_negative | ~(diagonal_zero | horizontal_positive)) & mask
+        vertical_negative = diagonal_zero & horizontal_positive
+        previous_match = match
+    return distance
+
+
+def get_token_tolerance(token: str) -> int:
+    """Typos allowed inside one word: none in short words, where one letter often makes another word."""
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 6 else 2
+
+
+def normalize_tokens(tokens: Sequence[str]) -> List[str]:
+    return delete_punctuation(" ".join(tokens)).lower().split()
+
+
+def align_tokens(expected: List[str], given: List[str]) -> List[tuple]:
+    """Pairs of (expected index, given index) of a minimal token alignment, ``None`` marking a gap."""
+    rows, columns = len(expected) + 1, len(given) + 1
+    costs = [[0] * columns for _ in range(rows)]
+    for row in range(rows):
+        costs[row][0] = row
+    for column in range(columns):
+        costs[0][column] = column
+    for row in range(1, rows):
+        for column in range(1, columns):
+            costs[row][column] = min(costs[row - 1][column] + 1, costs[row][column - 1] + 1,
+                                     costs[row - 1][column - 1] + (expected[row - 1] != given[column - 1]))
+    pairs = []
+    row, column = rows - 1, columns - 1
+    while row or column:
+        if row and column and costs[row][column] == costs[row - 1][column - 1] + (
+                expected[row - 1] != given[column - 1]):
+            row, column = row - 1, column - 1
+            pairs.append((row, column))
+        elif row and costs[row][column] == costs[row - 1][column] + 1:
+            row -= 1
+            pairs.append((row, None))
+        else:
+            column -= 1
+            pairs.append((None, column))
+    pairs.reverse()
+    return pairs
+
+
+def match_tokens(expected_tokens: Sequence[str], given_tokens: Sequence[str],
+                 level: Optional[str] = None) -> TokenMatch:
+    """
+    Compares an answer with the expected sentence word by word. Words with a few typos still count, as long
+    as every word stays within its own tolerance and all typos together within the tolerance of the level.
+    """
+    expected, given = normalize_tokens(expected_tokens), normalize_tokens(given_tokens)
+    if expected == given:
+        return TokenMatch(True, 0, 0, [], [])
+    tolerance = TYPO_TOLERANCE.get(level, DEFAULT_TYPO_TOLERANCE)
+    token_distance = edit_distance(expected, given)
+    distance = 0
+    wrong_tokens, extra_tokens = [], []
+    for expected_index, given_index in align_tokens(expected, given):
+        if expected_index is None:
+            extra_tokens.append(given_index)
+        elif given_index is None:
+            wrong_tokens.append(expected_index)
+        elif expected[expected_index] != given[given_index]:
+            token_tolerance = get_token_tolerance(expected[expected_index])
+            typos = edit_distance(expected[expected_index], given[given_index], token_tolerance)
+            if typos > token_tolerance:
+                wrong_tokens.append(expected_index)
+            else:
+                distance += typos
+    correct = not wrong_tokens and not extra_tokens and distance <= tolerance
+    return TokenMatch(correct, distance, token_distance, wrong_tokens, extra_tokens)
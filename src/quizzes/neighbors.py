@@ -0,0 +1,116 @@
+import zlib
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+NGRAM_SIZE = 3
+VECTOR_SIZE = 512
+BLOCK_SIZE = 256
+LENGTH_WEIGHT = 0.05
+
+
+def get_ngrams(name: str) -> List[str]:
+    padded = f" {name.lower()} "
+    return [padded[index:index + NGRAM_SIZE] for index in range(max(1, len(padded) - NGRAM_SIZE + 1))]
+
+
+def vectorize_names(names: Sequence[str]) -> np.ndarray:
+    """Hashed character n-gram counts of every name, one L2-normalized row per name."""
+    rows, columns = [], []
+    for row, name in enumerate(names):
+        for ngram in get_ngrams(name):
+            rows.append(row)
+            columns.append(zlib.crc32(ngram.encode()) % VECTOR_SIZE)
+    vectors = np.zeros((len(names), VECTOR_SIZE), dtype=np.float32)
+    np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def get_name_features(names: Sequence[str]):
+    vectors = vectorize_names(names)
+    lengths = np.array([len(name) for name in names], dtype=np.float32)
+    _, name_ids = np.unique(np.array([name.lower() for name in names]), return_inverse=True)
+    return vectors, lengths, name_ids
+
+
+def score_names(features, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """
+    How confusable the names at ``rows`` are with those at ``columns``: n-gram cosine similarity minus a penalty
+    for the difference in length, ``-inf`` for equal names, since they would be a second correct answer.
+    """
+    vectors, lengths, name_ids = features
+    scores = vectors[rows] @ vectors[columns].T
+    scores -= LENGTH_WEIGHT * np.abs(lengths[rows, None] - lengths[None, columns])
+    scores[name_ids[rows, None] == name_ids[None, columns]] = -np.inf
+    return scores
+
+
+def select_neighbors(indices, scores, name_ids: np.ndarray, k: int) -> List[int]:
+    """The first ``k`` of the candidates in ``indices``, best ``scores`` first, skipping repeated names."""
+    neighbors, neighbor_names = [], set()
+    for index, score in zip(indices, scores):
+        if score != -np.inf and name_ids[index] not in neighbor_names and len(neighbors) < k:
+            neighbor_names.add(name_ids[index])
+            neighbors.append(int(index))
+    return neighbors
+
+
+def find_neighbors(names: Sequence[str], targets: Sequence[int], k: int) -> List[List[int]]:
+    """
+    For every index in ``targets`` returns the indices of the ``k`` most confusable other names: highest n-gram
+    cosine similarity, minus a penalty for the difference in length. Names equal to the target are skipped,
+    since they would be a second correct answer, and so are repeated names.
+    """
+    if not len(targets) or len(names) < 2:
+        return [[] for _ in targets]
+    features = get_name_features(names)
+    columns = np.arange(len(names))
+    targets = np.asarray(targets, dtype=np.intp)
+    candidates_count = min(2 * k, len(names) - 1)
+    neighbors = []
+    for start in range(0, len(targets), BLOCK_SIZE):
+        block = targets[start:start + BLOCK_SIZE]
+        scores = score_names(features, block, columns)
+        top = np.argpartition(-scores, candidates_count - 1, axis=1)[:, :candidates_count]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        for indices, row_scores in zip(np.take_along_axis(top, order, axis=1),
+                                       np.take_along_axis(top_scores, order, axis=1)):
+            neighbors.append(select_neighbors(indices, row_scores, features[2], k))
+    return neighbors
+
+
+def add_neighbors(names: Sequence[str], neighbors: Sequence[List[int]], added: Sequence[int],
+                  k: int) -> Dict[int, List[int]]:
+    """
+    Lets the names at ``added`` into the existing ``neighbors`` lists of the other names, scoring each of them
+    only against the added names and its current neighbors. A list changes where an added name beats its worst
+    neighbor, or where it has fewer than ``k``; only the changed lists are returned, by index.
+    """
+    if not len(added) or len(names) < 2:
+        return {}
+    features = get_name_features(names)
+    vectors, lengths, name_ids = features
+    added = np.asarray(added, dtype=np.intp)
+    is_added = np.zeros(len(names), dtype=bool)
+    is_added[added] = True
+    rows = np.flatnonzero(~is_added)
+    current = np.full((len(names), k), -1, dtype=np.intp)
+    for row in rows:
+        current[row, :len(neighbors[row])] = neighbors[row][:k]
+    changed = {}
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = rows[start:start + BLOCK_SIZE]
+        block_current = current[block]
+        current_scores = np.einsum("ij,ikj->ik", vectors[block], vectors[block_current])
+        current_scores -= LENGTH_WEIGHT * np.abs(lengths[block, None] - lengths[block_current])
+        worst = np.where((block_current >= 0).all(axis=1), current_scores.min(axis=1), -np.inf)
+        added_scores = score_names(features, block, added)
+        for offset in np.flatnonzero((added_scores > worst[:, None]).any(axis=1)):
+            row, filled = block[offset], block_current[offset] >= 0
+            indices = np.concatenate([block_current[offset][filled], added])
+            scores = np.concatenate([current_scores[offset][filled], added_scores[offset]])
+            order = np.argsort(-scores, kind="stable")
+            changed[int(row)] = select_neighbors(indices[order], scores[order], name_ids, k)
+    return changed
@@ -0,0 +1,201 @@
+import asyncio
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import cache
+from src.config import DISTRACTOR_POOL_RELOAD_INTERVAL, NEIGHBORS_COUNT
+from src.models import TranslationWord
+from src.quizzes.generator import QuestionCandidates
+from src.quizzes.query import get_question_candidates, get_translation_words_by_ordinal, get_vocabulary_tokens
+from src.words.schemas import WordInfo
+
+
+class LanguageDistractors:
+    """Translation words of one target language, packed by ordinal: 16-byte ids plus a list of names."""
+
+    def __init__(self, rows):
+        self.translation_ids = bytearray()
+        self.word_ids = bytearray()
+        self.names: List[str] = []
+        self.loaded_at = time.monotonic()
+        for translation_id, word_id, name in rows:
+            self.append(translation_id, word_id, name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, translation_id: uuid.UUID, word_id: uuid.UUID, name: str) -> None:
+        self.translation_ids += translation_id.bytes
+        self.word_ids += word_id.bytes
+        self.names.append(name)
+
+    def sample(self, exclude_word_id: uuid.UUID, k: int) -> List[WordInfo]:
+        excluded = exclude_word_id.bytes
+        distractors = []
+        for index in random.sample(range(len(self)), min(k + 1, len(self))):
+            offset = index * 16
+            if self.word_ids[offset:offset + 16] == excluded:
+                continue
+            translation_id = uuid.UUID(bytes=bytes(self.translation_ids[offset:offset + 16]))
+            distractors.append(WordInfo(id=translation_id, name=self.names[index]))
+        return distractors[:k]
+
+
+class LanguageTokens:
+    """Distinct sentence tokens and translation word names of one target language."""
+
+    def __init__(self, tokens: Iterable[str]):
+        self.tokens: List[str] = []
+        self.known = set()
+        self.loaded_at = time.monotonic()
+        self.extend(tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def extend(self, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            if token not in self.known:
+                self.known.add(token)
+                self.tokens.append(token)
+
+    def sample(self, exclude_tokens: set, k: int) -> List[str]:
+        tokens = []
+        for index in random.sample(range(len(self)), min(k + len(exclude_tokens), len(self))):
+            if self.tokens[index] not in exclude_tokens:
+                tokens.append(self.tokens[index])
+        return tokens[:k]
+
+
+class LanguagePool(ABC):
+    """
+    In-process per-language data loaded on first use and reloaded every ``reload_interval`` seconds.
+    Invalidations and added rows are published under the pool ``name``, so once ``subscribe`` is called
+    every worker applies them without waiting for the reload.
+    """
+
+    name: str
+
+    def __init__(self, reload_interval: int = DISTRACTOR_POOL_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self.languages: Dict[int, object] = {}
+        self.lock = asyncio.Lock()
+
+    @abstractmethod
+    async def load(self, session: AsyncSession, language_id: int):
+        ...
+
+    def is_fresh(self, language_id: int) -> bool:
+        language = self.languages.get(language_id)
+        return language is not None and time.monotonic() - language.loaded_at <= self.reload_interval
+
+    async def get_language(self, session: AsyncSession, language_id: int):
+        if not self.is_fresh(language_id):
+            async with self.lock:
+                if not self.is_fresh(language_id):
+                    self.languages[language_id] = await self.load(session, language_id)
+        return self.languages[language_id]
+
+    def subscribe(self) -> None:
+        cache.subscribe(f"{self.name}:invalidate", lambda key: self.drop(self.parse_key(key)), self.languages.clear)
+        cache.subscribe(f"{self.name}:add", self.apply_add)
+
+    def parse_key(self, key: Any):
+        """Language key from its JSON form."""
+        return key
+
+    def drop(self, language_id) -> None:
+        self.languages.pop(language_id, None)
+
+    async def invalidate(self, language_id) -> None:
+        self.drop(language_id)
+        await cache.publish(f"{self.name}:invalidate", language_id)
+
+    def apply_add(self, data: dict) -> None:
+        """Applies a published row; pools that cannot append it drop its language instead."""
+        self.drop(self.parse_key(data["language_id"]))
+
+
+class DistractorPool(LanguagePool):
+    """Wrong answers per target language, so multiple-choice questions get their distractors without a query."""
+
+    name = "distractors"
+
+    async def load(self, session: AsyncSession, language_id: int) -> LanguageDistractors:
+        rows = await get_translation_words_by_ordinal(session, language_id)
+        return LanguageDistractors(rows)
+
+    async def get_distractors(
+            self, session: AsyncSession, language_to_id: int, word_id: uuid.UUID, k: int = 2
+    ) -> List[WordInfo]:
+        distractors = await self.get_language(session, language_to_id)
+        return distractors.sample(word_id, k)
+
+    async def add(self, translation_word: TranslationWord) -> None:
+        data = {"language_id": translation_word.to_language_id, "ordinal": translation_word.ordinal,
+                "id": str(translation_word.id), "word_id": str(translation_word.word_id), "name": translation_word.name}
+        self.apply_add(data)
+        await cache.publish(f"{self.name}:add", data)
+
+    def apply_add(self, data: dict) -> None:
+        distractors = self.languages.get(data["language_id"])
+        if distractors is None:
+            return
+        if data["ordinal"] != len(distractors):
+            self.drop(data["language_id"])
+            return
+        distractors.append(uuid.UUID(data["id"]), uuid.UUID(data["word_id"]), data["name"])
+
+
+class TokenVocabulary(LanguagePool):
+    """Filler tokens per target language for sentence questions."""
+
+    name = "tokens"
+
+    async def load(self, session: AsyncSession, language_id: int) -> LanguageTokens:
+        tokens = await get_vocabulary_tokens(session, language_id)
+        return LanguageTokens(tokens)
+
+    async def get_tokens(
+            self, session: AsyncSession, language_to_id: int, exclude_tokens: Iterable[str], k: int
+    ) -> List[str]:
+        tokens = await self.get_language(session, language_to_id)
+        return tokens.sample(set(exclude_tokens), k)
+
+    async def add(self, language_to_id: int, tokens: Iterable[str]) -> None:
+        data = {"language_id": language_to_id, "tokens": list(tokens)}
+        self.apply_add(data)
+        await cache.publish(f"{self.name}:add", data)
+
+    def apply_add(self, data: dict) -> None:
+        language_tokens = self.languages.get(data["language_id"])
+        if language_tokens is not None:
+            language_tokens.extend(data["tokens"])
+
+
+class QuestionCandidatePool(LanguagePool):
+    """
+    Quiz items per language pair as arrays for generating many word questions at once, keyed by
+    ``(language_from_id, language_to_id)``.
+    """
+
+    name = "question_candidates"
+
+    async def load(self, session: AsyncSession, language_pair: Tuple[int, int]) -> QuestionCandidates:
+        rows = await get_question_candidates(session, *language_pair)
+        return QuestionCandidates(rows, NEIGHBORS_COUNT)
+
+    def parse_key(self, key: Any) -> Tuple[int, int]:
+        return tuple(key)
+
+
+distractor_pool = DistractorPool()
+token_vocabulary = TokenVocabulary()
+question_candidates = QuestionCandidatePool()
+for pool in (distractor_pool, token_vocabulary, question_candidates):
+    pool.subscribe()
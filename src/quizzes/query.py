@@ -1,15 +1,23 @@
 import random
 import uuid
-from typing import Optional
+from datetime import date
+from typing import Dict, List, Optional
 
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import (BigInteger, LargeBinary, String, and_, any_, column, delete, exists, false, func, insert,
+                        literal, or_, select, true, union, values)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, aggregate_order_by, insert as upsert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload
 
+from src.cache import cached
 from src.constants import AvailableLanguages
-from src.models import (FavoriteWord, Language, Sentence, TranslationSentence,
-                        TranslationWord, User, Word)
+from src.models import (DailyChallengeScore, FavoriteWord, Language, QuizItem, Sentence, TranslationSentence,
+                        TranslationWord, TranslationWordNeighbors, User, Word, WordStat)
+from src.quizzes.constants import AvailablePartOfSpeech
+from src.quizzes.sampler import quiz_item_sampler, sentence_bucket_sampler, sentence_sampler
+
+SENTENCE_ANSWERS_CACHE = "sentence_answers"
 
 
 async def get_translation_words(session: AsyncSession, word_id: uuid.UUID) -> Optional[TranslationWord]:
@@ -18,38 +26,149 @@ async def get_translation_words(session: AsyncSession, word_id: uuid.UUID) -> Op
     return word
 
 
-async def get_random_word_for_translate(session: AsyncSession, language_from_id: int):
-    query = (select(Word)
-             .options(joinedload(Word.translation))
-             .where(Word.language_id == language_from_id).order_by(func.random()).limit(1))
-    word_for_translate = await session.scalar(query)
-    return word_for_translate
+async def get_translation_ids_by_word_ids(session: AsyncSession,
+                                          word_ids: List[uuid.UUID]) -> Dict[uuid.UUID, uuid.UUID]:
+    word_ids = literal(list(set(word_ids)), ARRAY(UUID(as_uuid=True)))
+    query = select(TranslationWord.word_id, TranslationWord.id).where(TranslationWord.word_id == any_(word_ids))
+    result = await session.execute(query)
+    return {word_id: translation_id for word_id, translation_id in result.all()}
+
+
+async def get_translation_words_by_ordinal(session: AsyncSession, language_to_id: int):
+    query = (select(TranslationWord.id, TranslationWord.word_id, TranslationWord.name)
+             .where(TranslationWord.to_language_id == language_to_id)
+             .order_by(TranslationWord.ordinal))
+    result = await session.execute(query)
+    return result.all()
+
 
+def get_user_languages_cte(telegram_id: int):
+    return (select(User.id.label("user_id"), User.learning_language_from_id, User.learning_language_to_id,
+                   User.rating)
+            .where(User.telegram_id == telegram_id)
+            .cte("user_languages"))
 
-async def get_random_words(session: AsyncSession, language_to_id: int, word_for_translate_id):
-    query = (select(TranslationWord)
-             .where(and_(TranslationWord.to_language_id == language_to_id,
-                         TranslationWord.word_id != word_for_translate_id))
-             .order_by(func.random()).limit(2))
+
+async def get_user_word_buckets(session: AsyncSession, telegram_id: int, level: Optional[str] = None,
+                                part_of_speech: Optional[str] = None):
+    user = get_user_languages_cte(telegram_id)
+    parts = [part_of_speech] if part_of_speech else [part.value for part in AvailablePartOfSpeech]
+    parts = values(column("part_of_speech", String), name="parts").data([(part,) for part in parts])
+    bucket_level = literal(level, String) if level else user.c.rating
+    max_ordinal = (select(func.max(Word.bucket_ordinal))
+                   .where(and_(Word.language_id == user.c.learning_language_from_id,
+                               Word.level == bucket_level,
+                               Word.part_of_speech == parts.c.part_of_speech))
+                   .scalar_subquery())
+    query = (select(user.c.user_id, user.c.learning_language_from_id, user.c.learning_language_to_id,
+                    bucket_level.label("level"), parts.c.part_of_speech,
+                    (func.coalesce(max_ordinal, -1) + 1).label("size"))
+             .select_from(user)
+             .join(parts, true()))
     result = await session.execute(query)
-    other_words = [w for w in result.scalars().all()]
-    return other_words
+    return list(result.all())
+
 
+def get_word_buckets_filter(language_from_id: int, level: str, buckets: Dict[str, List[int]]):
+    return and_(QuizItem.language_from_id == language_from_id,
+                QuizItem.level == level,
+                or_(*[and_(QuizItem.part_of_speech == part_of_speech, QuizItem.bucket_ordinal.in_(ordinals))
+                      for part_of_speech, ordinals in buckets.items()]))
 
-async def get_random_user_favorite_word(session: AsyncSession, user_id: int):
-    query = ((select(FavoriteWord).join(FavoriteWord.word).join(Word.translation)
-              .options(joinedload(FavoriteWord.word).options(joinedload(Word.translation)))
-              .where(FavoriteWord.user_id == user_id))
-             .order_by(func.random())
-             .limit(1))
-    random_user_favorite_word = await session.scalar(query)
-    return random_user_favorite_word.word
 
+def get_quiz_item_columns():
+    return QuizItem.word_id, QuizItem.word_name, QuizItem.translation_id, QuizItem.translation_name
 
-async def get_user_favorite_words(session: AsyncSession, word_id: uuid.UUID, user_id: int):
-    query = select(FavoriteWord).where(and_(FavoriteWord.word_id == word_id, FavoriteWord.user_id == user_id))
-    result = await session.scalar(query)
-    return result
+
+def get_neighbors_lateral():
+    """Names and ids of the confusable words of the joined quiz item, as arrays, NULL when it has none."""
+    neighbor = aliased(TranslationWord)
+    return (select(func.array_agg(neighbor.id).label("neighbor_ids"),
+                   func.array_agg(neighbor.name).label("neighbor_names"))
+            .select_from(TranslationWordNeighbors)
+            .join(neighbor, neighbor.id == any_(TranslationWordNeighbors.neighbor_ids))
+            .where(TranslationWordNeighbors.translation_word_id == QuizItem.translation_id)
+            .lateral("neighbors"))
+
+
+async def get_word_questions_by_buckets(session: AsyncSession, telegram_id: int, language_from_id: int, level: str,
+                                        buckets: Dict[str, List[int]]):
+    """
+    The user with the questions of the dealt buckets, their seen indexes, in_favorite flags and confusable words,
+    one row per question, or a single row without a question if none of the buckets is left. No rows if there is
+    no user.
+    """
+    user = get_user_languages_cte(telegram_id)
+    neighbors = get_neighbors_lateral()
+    in_favorite = exists().where(and_(FavoriteWord.user_id == user.c.user_id, FavoriteWord.word_id == QuizItem.word_id))
+    query = (select(user.c.user_id, user.c.learning_language_from_id, user.c.learning_language_to_id, user.c.rating,
+                    *get_quiz_item_columns(), Word.seen_index, in_favorite.label("in_favorite"),
+                    neighbors.c.neighbor_ids, neighbors.c.neighbor_names)
+             .select_from(user)
+             .outerjoin(QuizItem, get_word_buckets_filter(language_from_id, level, buckets) if buckets else false())
+             .outerjoin(Word, Word.id == QuizItem.word_id)
+             .outerjoin(neighbors, true()))
+    result = await session.execute(query)
+    return list(result.all())
+
+
+async def get_random_favorite_word_question(session: AsyncSession, telegram_id: int):
+    user = get_user_languages_cte(telegram_id)
+    favorite = (select(FavoriteWord.word_id)
+                .where(FavoriteWord.user_id == user.c.user_id)
+                .order_by(func.random())
+                .limit(1)
+                .lateral("favorite"))
+    neighbors = get_neighbors_lateral()
+    query = (select(user.c.user_id, user.c.learning_language_from_id, user.c.learning_language_to_id,
+                    *get_quiz_item_columns(), true().label("in_favorite"),
+                    neighbors.c.neighbor_ids, neighbors.c.neighbor_names)
+             .select_from(user)
+             .outerjoin(favorite, true())
+             .outerjoin(QuizItem, QuizItem.word_id == favorite.c.word_id)
+             .outerjoin(neighbors, true()))
+    result = await session.execute(query)
+    return result.one_or_none()
+
+
+async def get_word_question(session: AsyncSession, telegram_id: int, word_id: uuid.UUID):
+    user = get_user_languages_cte(telegram_id)
+    in_favorite = exists().where(and_(FavoriteWord.user_id == user.c.user_id, FavoriteWord.word_id == word_id))
+    neighbors = get_neighbors_lateral()
+    query = (select(user.c.user_id, QuizItem.language_to_id.label("learning_language_to_id"),
+                    *get_quiz_item_columns(), in_favorite.label("in_favorite"),
+                    neighbors.c.neighbor_ids, neighbors.c.neighbor_names)
+             .select_from(user)
+             .join(QuizItem, QuizItem.word_id == word_id)
+             .outerjoin(neighbors, true()))
+    result = await session.execute(query)
+    return result.one_or_none()
+
+
+async def get_user_favorite_word_ids(session: AsyncSession, telegram_id: int) -> List[uuid.UUID]:
+    query = (select(FavoriteWord.word_id)
+             .join(FavoriteWord.user)
+             .where(User.telegram_id == telegram_id))
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def get_favorite_word_telegram_ids(session: AsyncSession, word_id: uuid.UUID) -> List[int]:
+    query = (select(User.telegram_id)
+             .join(FavoriteWord.user)
+             .where(FavoriteWord.word_id == word_id))
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def add_user_favorite_word(session: AsyncSession, telegram_id: int, word_id: uuid.UUID) -> Optional[int]:
+    favorite = (select(User.id, Word.id)
+                .join(Word, Word.id == word_id)
+                .where(User.telegram_id == telegram_id))
+    query = (insert(FavoriteWord)
+             .from_select([FavoriteWord.user_id, FavoriteWord.word_id], favorite)
+             .returning(FavoriteWord.id))
+    return await session.scalar(query)
 
 
 async def get_user_favorite_word(session: AsyncSession, telegram_id: int, word_id: uuid.UUID):
@@ -65,43 +184,54 @@ async def get_sentence(session: AsyncSession, sentence_id):
     return sentence
 
 
-async def get_sentence_translation(session: AsyncSession, sentence_id: uuid.UUID):
-    query = select(TranslationSentence).where(TranslationSentence.sentence_id == sentence_id)
-    translation = await session.scalar(query)
-    return translation
+@cached(SENTENCE_ANSWERS_CACHE)
+async def get_sentence_answer(session: AsyncSession, sentence_id: uuid.UUID):
+    query = (select(TranslationSentence.tokens, Sentence.level)
+             .join(Sentence, Sentence.id == TranslationSentence.sentence_id)
+             .where(TranslationSentence.sentence_id == sentence_id))
+    result = await session.execute(query)
+    answer = result.first()
+    return None if answer is None else {"tokens": answer.tokens, "level": answer.level}
 
 
-async def get_random_sentence_for_translate(session: AsyncSession, language_from_id):
-    query = (select(Sentence)
-             .join(Sentence.translation)
-             .options(joinedload(Sentence.translation))
-             .where(Sentence.language_id == language_from_id)
-             .order_by(func.random())
-             .limit(1))
-    random_sentence_for_translate = await session.scalar(query)
-    return random_sentence_for_translate
+async def get_user_sentence_bucket(session: AsyncSession, telegram_id: int, level: Optional[str] = None):
+    user = get_user_languages_cte(telegram_id)
+    bucket_level = literal(level, String) if level else user.c.rating
+    max_ordinal = (select(func.max(Sentence.bucket_ordinal))
+                   .where(and_(Sentence.language_id == user.c.learning_language_from_id,
+                               Sentence.level == bucket_level))
+                   .scalar_subquery())
+    query = select(user.c.user_id, user.c.learning_language_from_id, user.c.learning_language_to_id,
+                   bucket_level.label("level"), (func.coalesce(max_ordinal, -1) + 1).label("size"))
+    result = await session.execute(query)
+    return result.one_or_none()
 
 
-async def get_random_words_for_sentence(session: AsyncSession, language_to_id: int, words_for_sentence: Optional[list]):
-    query = (select(TranslationWord.name)
-             .where(and_(TranslationWord.to_language_id == language_to_id),
-                    TranslationWord.name.notin_(words_for_sentence))
-             .order_by(func.random())
-             .limit(random.randint(2, 4))
-             )
-    result = await session.execute(query)
-    random_words_for_sentence = result.scalars().all()
-    return random_words_for_sentence
+async def get_sentences_by_bucket_ordinals(session: AsyncSession, language_from_id: int, level: str,
+                                           ordinals: List[int]):
+    sentences = await sentence_bucket_sampler.get_by_ordinals(session, (language_from_id, level), ordinals,
+                                                              joinedload(Sentence.translation, innerjoin=True))
+    return sentences
 
 
-async def get_random_words_for_match(session: AsyncSession, language_from_id):
-    query = ((select(Word)
-              .options(joinedload(Word.translation))
-              .where(Word.language_id == language_from_id))
-             .order_by(func.random())
-             .limit(8))
+async def get_vocabulary_tokens(session: AsyncSession, language_to_id: int):
+    sentence_tokens = (select(func.unnest(TranslationSentence.tokens))
+                       .where(TranslationSentence.to_language_id == language_to_id))
+    word_names = select(TranslationWord.name).where(TranslationWord.to_language_id == language_to_id)
+    result = await session.execute(union(sentence_tokens, word_names))
+    return result.scalars().all()
+
+
+async def get_words_for_match_by_buckets(session: AsyncSession, language_from_id: int, level: str,
+                                         buckets: Dict[str, List[int]]):
+    if not buckets:
+        return []
+    query = (select(*get_quiz_item_columns(), Word.seen_index)
+             .join(Word, Word.id == QuizItem.word_id)
+             .where(get_word_buckets_filter(language_from_id, level, buckets)))
     result = await session.execute(query)
-    words = result.scalars().all()
+    words = list(result.all())
+    random.shuffle(words)
     return words
 
 
@@ -113,3 +243,128 @@ async def get_language_to(session: AsyncSession, language_to: AvailableLanguages
 async def get_language_from(session: AsyncSession, language_from: AvailableLanguages):
     language_from = await session.scalar(select(Language).where(Language.language == language_from.value))
     return language_from
+
+
+async def upsert_word_stats(session: AsyncSession, counters: Dict[uuid.UUID, Dict[str, int]]) -> None:
+    rows = values(column("word_id", UUID(as_uuid=True)), column("attempts", BigInteger),
+                  column("correct", BigInteger), column("latency_ms_total", BigInteger),
+                  column("latency_count", BigInteger), name="counters")
+    rows = rows.data([(word_id, values["attempts"], values["correct"], values["latency_ms_total"],
+                       values["latency_count"]) for word_id, values in counters.items()])
+    existing_rows = select(rows).join(Word, Word.id == rows.c.word_id)
+    query = upsert(WordStat).from_select(
+        ["word_id", "attempts", "correct", "latency_ms_total", "latency_count"], existing_rows
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[WordStat.word_id],
+        set_={
+            "attempts": WordStat.attempts + query.excluded.attempts,
+            "correct": WordStat.correct + query.excluded.correct,
+            "latency_ms_total": WordStat.latency_ms_total + query.excluded.latency_ms_total,
+            "latency_count": WordStat.latency_count + query.excluded.latency_count,
+            "updated_at": func.now(),
+        }
+    )
+    await session.execute(query)
+
+
+async def get_user_language_pairs(session: AsyncSession) -> List[tuple]:
+    query = (select(User.learning_language_from_id, User.learning_language_to_id)
+             .group_by(User.learning_language_from_id, User.learning_language_to_id))
+    result = await session.execute(query)
+    return [tuple(pair) for pair in result.all()]
+
+
+async def get_random_words_with_translation(session: AsyncSession, language_from_id: int, count: int):
+    return await quiz_item_sampler.sample(session, language_from_id, count)
+
+
+async def get_random_sentences_with_translation(session: AsyncSession, language_from_id: int, count: int):
+    return await sentence_sampler.sample(session, language_from_id, count,
+                                         joinedload(Sentence.translation, innerjoin=True))
+
+
+async def save_daily_challenge_score(session: AsyncSession, telegram_id: int, day: date, score: int) -> Optional[int]:
+    user_score = select(User.id, literal(day), literal(score)).where(User.telegram_id == telegram_id)
+    query = upsert(DailyChallengeScore).from_select(["user_id", "day", "score"], user_score)
+    query = query.on_conflict_do_update(
+        index_elements=[DailyChallengeScore.user_id, DailyChallengeScore.day],
+        set_={"score": func.greatest(DailyChallengeScore.score, query.excluded.score), "updated_at": func.now()},
+    ).returning(DailyChallengeScore.score)
+    return await session.scalar(query)
+
+
+async def get_translation_languages(session: AsyncSession) -> List[int]:
+    result = await session.execute(select(TranslationWord.to_language_id).distinct())
+    return list(result.scalars().all())
+
+
+async def rebuild_quiz_items(session: AsyncSession) -> int:
+    await session.execute(delete(QuizItem))
+    items = (select(TranslationWord.id, Word.id, Word.name, TranslationWord.name, Word.language_id,
+                    TranslationWord.to_language_id, Word.level, Word.part_of_speech, Word.ordinal,
+                    Word.bucket_ordinal)
+             .join(Word, Word.id == TranslationWord.word_id))
+    result = await session.execute(
+        insert(QuizItem).from_select(["translation_id", "word_id", "word_name", "translation_name",
+                                      "language_from_id", "language_to_id", "level", "part_of_speech", "ordinal",
+                                      "bucket_ordinal"], items)
+    )
+    return result.rowcount
+
+
+async def get_snapshot_quiz_items(session: AsyncSession):
+    query = (select(QuizItem.language_from_id, QuizItem.level, QuizItem.word_id, QuizItem.word_name,
+                    QuizItem.translation_id, QuizItem.translation_name, QuizItem.language_to_id)
+             .order_by(QuizItem.language_from_id, QuizItem.level, QuizItem.ordinal))
+    result = await session.execute(query)
+    return result.all()
+
+
+async def get_question_candidates(session: AsyncSession, language_from_id: int, language_to_id: int):
+    neighbor_ids = (func.unnest(TranslationWordNeighbors.neighbor_ids)
+                    .table_valued("id", with_ordinality="position")
+                    .render_derived(name="neighbor_ids"))
+    separator = aggregate_order_by(literal(b"", LargeBinary), neighbor_ids.c.position)
+    packed_neighbor_ids = select(func.string_agg(func.uuid_send(neighbor_ids.c.id), separator)).scalar_subquery()
+    query = (select(func.uuid_send(QuizItem.word_id).label("word_id"), QuizItem.word_name,
+                    func.uuid_send(QuizItem.translation_id).label("translation_id"), QuizItem.translation_name,
+                    packed_neighbor_ids.label("neighbor_ids"))
+             .outerjoin(TranslationWordNeighbors,
+                        TranslationWordNeighbors.translation_word_id == QuizItem.translation_id)
+             .where(QuizItem.language_from_id == language_from_id, QuizItem.language_to_id == language_to_id)
+             .order_by(QuizItem.ordinal))
+    result = await session.execute(query)
+    return result.all()
+
+
+async def get_neighbor_candidates(session: AsyncSession, language_to_id: int, level: Optional[str] = None,
+                                  part_of_speech: Optional[str] = None):
+    query = (select(TranslationWord.id, TranslationWord.name, Word.level, Word.part_of_speech,
+                    TranslationWordNeighbors.neighbor_ids)
+             .join(Word, Word.id == TranslationWord.word_id)
+             .outerjoin(TranslationWordNeighbors,
+                        TranslationWordNeighbors.translation_word_id == TranslationWord.id)
+             .where(TranslationWord.to_language_id == language_to_id))
+    if level is not None:
+        query = query.where(Word.level == level, Word.part_of_speech == part_of_speech)
+    result = await session.execute(query)
+    return result.all()
+
+
+async def save_translation_word_neighbors(session: AsyncSession, neighbors: Dict[uuid.UUID, List[uuid.UUID]]) -> None:
+    query = upsert(TranslationWordNeighbors)
+    query = query.on_conflict_do_update(
+        index_elements=[TranslationWordNeighbors.translation_word_id],
+        set_={"neighbor_ids": query.excluded.neighbor_ids, "updated_at": func.now()},
+    )
+    await session.execute(query, [{"translation_word_id": translation_word_id, "neighbor_ids": neighbor_ids}
+                                  for translation_word_id, neighbor_ids in neighbors.items()])
+
+
+async def get_confusable_words(session: AsyncSession, translation_id: uuid.UUID):
+    neighbor_ids = (select(func.unnest(TranslationWordNeighbors.neighbor_ids))
+                    .where(TranslationWordNeighbors.translation_word_id == translation_id))
+    query = select(TranslationWord.id, TranslationWord.name).where(TranslationWord.id.in_(neighbor_ids))
+    result = await session.execute(query)
+    return result.all()
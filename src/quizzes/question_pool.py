@@ -0,0 +1,101 @@
+import time
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from src.config import (QUESTION_POOL_LOW_WATER, QUESTION_POOL_PAIR_TTL, QUESTION_POOL_REFILL_INTERVAL,
+                        QUESTION_POOL_SIZE)
+from src.database import get_redis
+from src.quizzes.schemas import QuestionPoolStats, RandomWordResponse
+
+
+class QuestionPool:
+    """
+    Ready-made random word questions per language pair, kept in Redis lists. Only pairs popped within
+    ``pair_ttl`` seconds are refilled, and the questions of the others are dropped.
+    """
+
+    pairs_key = "question_pool:active_pairs"
+    stats_key = "question_pool:stats"
+    refill_lock_key = "question_pool:refill_lock"
+
+    def __init__(self, redis_client: redis.Redis, size: int = QUESTION_POOL_SIZE,
+                 low_water: int = QUESTION_POOL_LOW_WATER, pair_ttl: int = QUESTION_POOL_PAIR_TTL):
+        self.redis = redis_client
+        self.size = size
+        self.low_water = low_water
+        self.pair_ttl = pair_ttl
+
+    @staticmethod
+    def get_key(language_from_id: int, language_to_id: int) -> str:
+        return f"question_pool:{language_from_id}:{language_to_id}"
+
+    async def pop(self, language_from_id: int, language_to_id: int) -> Optional[RandomWordResponse]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lpop(self.get_key(language_from_id, language_to_id))
+            pipe.zadd(self.pairs_key, {f"{language_from_id}:{language_to_id}": time.time()})
+            pipe.hincrby(self.stats_key, "requests", 1)
+            question, _, _ = await pipe.execute()
+        if question is None:
+            await self.redis.hincrby(self.stats_key, "misses", 1)
+            return None
+        return RandomWordResponse.model_validate_json(question)
+
+    async def push(self, language_from_id: int, language_to_id: int, questions: List[RandomWordResponse]) -> None:
+        await self.redis.rpush(
+            self.get_key(language_from_id, language_to_id), *[question.model_dump_json() for question in questions]
+        )
+
+    async def get_missing_count(self, language_from_id: int, language_to_id: int) -> int:
+        depth = await self.redis.llen(self.get_key(language_from_id, language_to_id))
+        return self.size - depth if depth < self.low_water else 0
+
+    async def get_pairs(self) -> List[tuple]:
+        """Pairs popped within ``pair_ttl`` seconds, after dropping the pools of the others."""
+        cutoff = time.time() - self.pair_ttl
+        stale_pairs = await self.redis.zrangebyscore(self.pairs_key, "-inf", cutoff)
+        if stale_pairs:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zrem(self.pairs_key, *stale_pairs)
+                pipe.delete(*[self.get_key(*self.parse_pair(pair)) for pair in stale_pairs])
+                await pipe.execute()
+        pairs = await self.redis.zrangebyscore(self.pairs_key, cutoff, "+inf")
+        return [self.parse_pair(pair) for pair in pairs]
+
+    @staticmethod
+    def parse_pair(pair: bytes) -> tuple:
+        return tuple(int(language_id) for language_id in pair.split(b":"))
+
+    async def acquire_refill_lock(self) -> bool:
+        return bool(await self.redis.set(self.refill_lock_key, 1, nx=True, ex=QUESTION_POOL_REFILL_INTERVAL))
+
+    async def record_refill(self, questions_count: int, seconds: float) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self.stats_key, "refilled", questions_count)
+            pipe.hincrbyfloat(self.stats_key, "refill_seconds", seconds)
+            await pipe.execute()
+
+    async def get_stats(self) -> QuestionPoolStats:
+        stats = {key.decode(): float(value) for key, value in (await self.redis.hgetall(self.stats_key)).items()}
+        pairs = await self.get_pairs()
+        depth = {}
+        for language_from_id, language_to_id in pairs:
+            depth[f"{language_from_id}:{language_to_id}"] = await self.redis.llen(
+                self.get_key(language_from_id, language_to_id)
+            )
+        requests = int(stats.get("requests", 0))
+        misses = int(stats.get("misses", 0))
+        refilled = int(stats.get("refilled", 0))
+        refill_seconds = stats.get("refill_seconds", 0)
+        return QuestionPoolStats(
+            requests=requests,
+            hits=requests - misses,
+            misses=misses,
+            hit_ratio=(requests - misses) / requests if requests else 0,
+            refilled=refilled,
+            refill_rate=refilled / refill_seconds if refill_seconds else 0,
+            depth=depth,
+        )
+
+
+question_pool = QuestionPool(get_redis())
@@ -0,0 +1,106 @@
+import struct
+import time
+import uuid
+from typing import Optional
+
+import redis.asyncio as redis
+
+from src.database import get_redis
+
+DAY = 24 * 60 * 60
+RELEARN_INTERVAL = 10 * 60
+DEFAULT_EASE = 250
+MIN_EASE = 130
+
+
+class ReviewState:
+    """SM-2 scheduling state of one word: ease in percent, interval in seconds and the correct answers in a row."""
+
+    packed_format = ">HIH"
+
+    def __init__(self, ease: int = DEFAULT_EASE, interval: int = 0, repetitions: int = 0):
+        self.ease = ease
+        self.interval = interval
+        self.repetitions = repetitions
+
+    @classmethod
+    def unpack(cls, data: Optional[bytes]) -> "ReviewState":
+        if data is None:
+            return cls()
+        return cls(*struct.unpack(cls.packed_format, data))
+
+    def pack(self) -> bytes:
+        return struct.pack(self.packed_format, min(self.ease, 0xFFFF), min(self.interval, 0xFFFFFFFF),
+                           min(self.repetitions, 0xFFFF))
+
+    def answer(self, correct: bool) -> None:
+        if not correct:
+            self.ease = max(MIN_EASE, self.ease - 20)
+            self.interval = RELEARN_INTERVAL
+            self.repetitions = 0
+            return
+        self.repetitions += 1
+        if self.repetitions == 1:
+            self.interval = DAY
+        elif self.repetitions == 2:
+            self.interval = 6 * DAY
+        else:
+            self.interval = self.interval * self.ease // 100
+        self.ease += 5
+
+
+class ReviewScheduler:
+    """
+    Per-user review queue: a Redis sorted set of word ids scored by due time, so the next due word is
+    a single ``ZRANGE ... LIMIT 1``, plus a hash of packed ``ReviewState`` per word.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    @staticmethod
+    def get_due_key(telegram_id: int) -> str:
+        return f"review:due:{telegram_id}"
+
+    @staticmethod
+    def get_state_key(telegram_id: int) -> str:
+        return f"review:state:{telegram_id}"
+
+    async def get_next_due(self, telegram_id: int) -> Optional[uuid.UUID]:
+        word_ids = await self.redis.zrange(self.get_due_key(telegram_id), "-inf", time.time(),
+                                           byscore=True, offset=0, num=1)
+        return uuid.UUID(bytes=word_ids[0]) if word_ids else None
+
+    async def add(self, telegram_id: int, word_id: uuid.UUID) -> None:
+        await self.redis.zadd(self.get_due_key(telegram_id), {word_id.bytes: time.time()}, nx=True)
+
+    async def remove(self, telegram_id: int, word_id: uuid.UUID) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.get_due_key(telegram_id), word_id.bytes)
+            pipe.hdel(self.get_state_key(telegram_id), word_id.bytes)
+            await pipe.execute()
+
+    async def record_answer(self, telegram_id: int, word_id: uuid.UUID, correct: bool) -> Optional[ReviewState]:
+        """
+        Reschedules a word of the queue from the answer, retrying if another answer changes the queue first,
+        so no answer is lost. Words outside the queue, like removed favorites, are not added back.
+        """
+        due_key, state_key = self.get_due_key(telegram_id), self.get_state_key(telegram_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(due_key, state_key)
+                    if await pipe.zscore(due_key, word_id.bytes) is None:
+                        return None
+                    state = ReviewState.unpack(await pipe.hget(state_key, word_id.bytes))
+                    state.answer(correct)
+                    pipe.multi()
+                    pipe.hset(state_key, word_id.bytes, state.pack())
+                    pipe.zadd(due_key, {word_id.bytes: time.time() + state.interval})
+                    await pipe.execute()
+                    return state
+                except redis.WatchError:
+                    continue
+
+
+review_scheduler = ReviewScheduler(get_redis())
@@ -1,12 +1,22 @@
 import uuid
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_async_session
-from src.quizzes.schemas import RandomSentenceResponse, RandomWordResponse
-from src.quizzes.service import (FavoriteWordService, QuizAnswerService,
-                                 SentenceService, WordService)
+from src.quizzes.constants import AvailablePartOfSpeech, AvailableWordLevel
+from src.quizzes.events import answer_event_buffer
+from src.quizzes.question_pool import question_pool
+from src.quizzes.schemas import (AnswerEventStats, CheckMatchRequest, DailyChallenge,
+                                 DailyChallengeScoreSchema, MatchPairResult, MatchWordsResponse,
+                                 QuestionPoolStats, RandomSentenceResponse, RandomWordResponse,
+                                 SentenceAnswerResult, VocabularyCoverage)
+from src.quizzes.service import (DailyChallengeService, FavoriteWordService,
+                                 QuizAnswerService, ReviewService, SentenceService,
+                                 WordService)
+from src.quizzes.utils import get_value
 
 router = APIRouter(
     prefix="/quiz",
@@ -15,42 +25,149 @@ router = APIRouter(
 
 
 @router.get("/random-word", response_model=RandomWordResponse)
-async def get_random_word(telegram_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_random_word(
+        telegram_id: int,
+        level: Optional[AvailableWordLevel] = None,
+        part_of_speech: Optional[AvailablePartOfSpeech] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
     word_service = WordService(session)
-    response = await word_service.get_random_word(telegram_id)
+    response = await word_service.get_random_word(telegram_id, get_value(level), get_value(part_of_speech))
     return response
 
 
+@router.get("/random-words", response_model=List[RandomWordResponse])
+async def get_random_words(
+        telegram_id: int,
+        count: int = Query(default=20, ge=1, le=50),
+        level: Optional[AvailableWordLevel] = None,
+        part_of_speech: Optional[AvailablePartOfSpeech] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
+    word_service = WordService(session)
+    return await word_service.get_random_word_batch(telegram_id, count, get_value(level), get_value(part_of_speech))
+
+
 @router.get("/favorite-word", response_model=RandomWordResponse)
 async def get_random_favorite_word(telegram_id: int, session: AsyncSession = Depends(get_async_session)):
     favorite_word_service = FavoriteWordService(session)
     return await favorite_word_service.get_random_favorite_word(telegram_id)
 
 
+@router.get("/review", response_model=RandomWordResponse)
+async def get_review_word(telegram_id: int, session: AsyncSession = Depends(get_async_session)):
+    review_service = ReviewService(session)
+    return await review_service.get_next_review(telegram_id)
+
+
+@router.get("/daily", response_model=DailyChallenge)
+async def get_daily_challenge(language_from_id: int, language_to_id: int, day: Optional[date] = None):
+    challenge = await DailyChallengeService.get(language_from_id, language_to_id, day)
+    return Response(content=challenge, media_type="application/json")
+
+
+@router.post("/daily/score", response_model=int)
+async def save_daily_challenge_score(score: DailyChallengeScoreSchema,
+                                     session: AsyncSession = Depends(get_async_session)):
+    daily_challenge_service = DailyChallengeService(session)
+    return await daily_challenge_service.save_score(score)
+
+
+@router.get("/coverage", response_model=VocabularyCoverage)
+async def get_vocabulary_coverage(telegram_id: int, session: AsyncSession = Depends(get_async_session)):
+    word_service = WordService(session)
+    return await word_service.get_vocabulary_coverage(telegram_id)
+
+
 @router.get("/check-answer", response_model=bool)
 async def check_answer(word_for_translate_id: uuid.UUID, user_word_id: uuid.UUID,
+                       answer_token: Optional[str] = None,
+                       telegram_id: Optional[int] = None,
                        session: AsyncSession = Depends(get_async_session)):
     answer_service = QuizAnswerService(session)
-    return await answer_service.check_answer(word_for_translate_id, user_word_id)
+    return await answer_service.check_answer(word_for_translate_id, user_word_id, answer_token, telegram_id)
 
 
 @router.get("/get-random-sentence", response_model=RandomSentenceResponse)
-async def get_random_sentence(telegram_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_random_sentence(
+        telegram_id: int,
+        level: Optional[AvailableWordLevel] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
+    sentence_service = SentenceService(session)
+    return await sentence_service.get_random_sentence(telegram_id, get_value(level))
+
+
+@router.get("/get-random-sentences", response_model=List[RandomSentenceResponse])
+async def get_random_sentences(
+        telegram_id: int,
+        count: int = Query(default=20, ge=1, le=50),
+        level: Optional[AvailableWordLevel] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
     sentence_service = SentenceService(session)
-    return await sentence_service.get_random_sentence(telegram_id)
+    return await sentence_service.get_random_sentences(telegram_id, count, get_value(level))
 
 
 @router.get("/check-sentence-answer", response_model=bool)
 async def check_sentence_answer(
         sentence_id: uuid.UUID,
         user_words: list[str] = Query(...),
+        answer_token: Optional[str] = None,
+        telegram_id: Optional[int] = None,
         session: AsyncSession = Depends(get_async_session)
 ):
     answer_service = QuizAnswerService(session)
-    return await answer_service.check_sentence_answer(sentence_id, user_words)
+    result = await answer_service.check_sentence_answer(sentence_id, user_words, answer_token, telegram_id)
+    return result.correct
+
+
+@router.get("/check-sentence-answer-details", response_model=SentenceAnswerResult)
+async def check_sentence_answer_details(
+        sentence_id: uuid.UUID,
+        user_words: list[str] = Query(...),
+        answer_token: Optional[str] = None,
+        telegram_id: Optional[int] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
+    answer_service = QuizAnswerService(session)
+    return await answer_service.check_sentence_answer(sentence_id, user_words, answer_token, telegram_id)
+
+
+@router.post("/check-match", response_model=List[MatchPairResult])
+async def check_match(request: CheckMatchRequest, session: AsyncSession = Depends(get_async_session)):
+    answer_service = QuizAnswerService(session)
+    return await answer_service.check_match(request.pairs, request.telegram_id)
 
 
 @router.get("/match-words")
-async def get_match_words(telegram_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_match_words(
+        telegram_id: int,
+        level: Optional[AvailableWordLevel] = None,
+        part_of_speech: Optional[AvailablePartOfSpeech] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
     word_service = WordService(session)
-    return await word_service.get_match_words(telegram_id)
+    return await word_service.get_match_words(telegram_id, get_value(level), get_value(part_of_speech))
+
+
+@router.get("/match-words-batch", response_model=List[MatchWordsResponse])
+async def get_match_words_batch(
+        telegram_id: int,
+        count: int = Query(default=5, ge=1, le=20),
+        level: Optional[AvailableWordLevel] = None,
+        part_of_speech: Optional[AvailablePartOfSpeech] = None,
+        session: AsyncSession = Depends(get_async_session)
+):
+    word_service = WordService(session)
+    return await word_service.get_match_words_batch(telegram_id, count, get_value(level), get_value(part_of_speech))
+
+
+@router.get("/question-pool/stats", response_model=QuestionPoolStats)
+async def get_question_pool_stats():
+    return await question_pool.get_stats()
+
+
+@router.get("/answer-events/stats", response_model=AnswerEventStats)
+async def get_answer_event_stats():
+    return answer_event_buffer.get_stats()
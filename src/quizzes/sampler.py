@@ -0,0 +1,96 @@
+import random
+from typing import Sequence
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import QuizItem, Sentence, TranslationWord, Word
+
+
+class OrdinalSampler:
+    """
+    Every row of ``model`` keeps a dense ordinal in ``range(size)`` of its partition, so a uniform
+    random sample is a few index lookups instead of ``ORDER BY random()`` over the whole table.
+    A partition is a single value, or a tuple of values when the sampler has several partition columns.
+    """
+
+    def __init__(self, model, *partition_columns, ordinal_column=None):
+        self.model = model
+        self.partition_columns = partition_columns
+        self.ordinal_column = model.ordinal if ordinal_column is None else ordinal_column
+
+    def get_partition(self, row):
+        partition = tuple(getattr(row, column.key) for column in self.partition_columns)
+        return partition if len(partition) > 1 else partition[0]
+
+    def get_partition_filter(self, partition):
+        values = partition if isinstance(partition, tuple) else (partition,)
+        return and_(*[column.is_(None) if value is None else column == value
+                      for column, value in zip(self.partition_columns, values)])
+
+    async def get_size(self, session: AsyncSession, partition) -> int:
+        query = select(func.max(self.ordinal_column)).where(self.get_partition_filter(partition))
+        max_ordinal = await session.scalar(query)
+        return 0 if max_ordinal is None else max_ordinal + 1
+
+    async def get_by_ordinals(self, session: AsyncSession, partition, ordinals: Sequence[int], *options):
+        if not ordinals:
+            return []
+        query = (select(self.model)
+                 .options(*options)
+                 .where(and_(self.get_partition_filter(partition), self.ordinal_column.in_(ordinals))))
+        result = await session.execute(query)
+        rows = list(result.scalars().all())
+        random.shuffle(rows)
+        return rows
+
+    async def sample(self, session: AsyncSession, partition, k: int, *options) -> list:
+        size = await self.get_size(session, partition)
+        ordinals = random.sample(range(size), min(k, size))
+        return await self.get_by_ordinals(session, partition, ordinals, *options)
+
+    async def assign(self, session: AsyncSession, row) -> None:
+        partition = self.get_partition(row)
+        await self.lock_partition(session, partition)
+        setattr(row, self.ordinal_column.key, await self.get_size(session, partition))
+
+    async def delete(self, session: AsyncSession, row, *samplers: "OrdinalSampler") -> None:
+        """Deletes ``row`` and moves the last row of each of its partitions into the freed ordinal."""
+        samplers = (self, *samplers)
+        gaps = []
+        for sampler in samplers:
+            partition = sampler.get_partition(row)
+            await sampler.lock_partition(session, partition)
+            gaps.append((sampler, partition, getattr(row, sampler.ordinal_column.key)))
+        await session.delete(row)
+        await session.flush()
+        for sampler, partition, freed_ordinal in gaps:
+            await sampler.fill_gap(session, partition, freed_ordinal)
+
+    async def fill_gap(self, session: AsyncSession, partition, freed_ordinal: int) -> None:
+        last_ordinal = await self.get_size(session, partition) - 1
+        if freed_ordinal < last_ordinal:
+            await session.execute(
+                update(self.model)
+                .where(and_(self.get_partition_filter(partition), self.ordinal_column == last_ordinal))
+                .values({self.ordinal_column.key: freed_ordinal})
+            )
+
+    async def lock_partition(self, session: AsyncSession, partition) -> None:
+        values = partition if isinstance(partition, tuple) else (partition,)
+        await session.execute(
+            select(func.pg_advisory_xact_lock(
+                func.hashtext(f"{self.model.__tablename__}.{self.ordinal_column.key}"),
+                func.hashtext(":".join(str(value) for value in values))
+            ))
+        )
+
+
+word_sampler = OrdinalSampler(Word, Word.language_id)
+word_bucket_sampler = OrdinalSampler(Word, Word.language_id, Word.level, Word.part_of_speech,
+                                     ordinal_column=Word.bucket_ordinal)
+translation_word_sampler = OrdinalSampler(TranslationWord, TranslationWord.to_language_id)
+quiz_item_sampler = OrdinalSampler(QuizItem, QuizItem.language_from_id)
+sentence_sampler = OrdinalSampler(Sentence, Sentence.language_id)
+sentence_bucket_sampler = OrdinalSampler(Sentence, Sentence.language_id, Sentence.level,
+                                         ordinal_column=Sentence.bucket_ordinal)
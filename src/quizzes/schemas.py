@@ -1,7 +1,8 @@
 import uuid
-from typing import List, Optional
+from datetime import date
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from src.words.schemas import SentenceInfo, WordInfo
 
@@ -16,15 +17,77 @@ class RandomWordResponse(BaseModel):
     word_for_translate: WordInfo
     other_words: List[WordInfo]
     in_favorite: Optional[bool]
+    answer_token: Optional[str] = None
 
 
 class RandomSentenceResponse(BaseModel):
     type: str
     sentence_for_translate: SentenceInfo
     words_for_sentence: List[str]
+    answer_token: Optional[str] = None
+
+
+class SentenceAnswerResult(BaseModel):
+    correct: bool
+    distance: int
+    token_distance: int
+    wrong_tokens: List[int]
+    extra_tokens: List[int]
 
 
 class MatchWordsResponse(BaseModel):
     type: str
     words: List[WordInfo]
     translation_words: List[WordInfo]
+
+
+class MatchPair(BaseModel):
+    word_id: uuid.UUID
+    translation_id: uuid.UUID
+
+
+class CheckMatchRequest(BaseModel):
+    pairs: List[MatchPair] = Field(min_length=1, max_length=8)
+    telegram_id: Optional[int] = None
+
+
+class MatchPairResult(MatchPair):
+    correct: bool
+
+
+class QuestionPoolStats(BaseModel):
+    requests: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    refilled: int
+    refill_rate: float
+    depth: Dict[str, int]
+
+
+class AnswerEventStats(BaseModel):
+    queued: int
+    flushed: int
+    dropped: int
+    failed: int
+
+
+class VocabularyCoverage(BaseModel):
+    seen: int
+    total: int
+    coverage: float
+
+
+class DailyChallenge(BaseModel):
+    day: date
+    language_from_id: int
+    language_to_id: int
+    words: List[RandomWordResponse]
+    sentences: List[RandomSentenceResponse]
+    match_words: List[MatchWordsResponse]
+
+
+class DailyChallengeScoreSchema(BaseModel):
+    telegram_id: int
+    day: date
+    score: int = Field(ge=0)
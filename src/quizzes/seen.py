@@ -0,0 +1,43 @@
+from typing import List
+
+import redis.asyncio as redis
+
+from src.database import get_redis
+
+
+class SeenWords:
+    """
+    Per-user bitmaps of the words already shown, one per language with one bit per word seen index, which is
+    assigned once per word and never reused, so checking and marking dealt words is a single BITFIELD and the
+    vocabulary coverage is a BITCOUNT.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    @staticmethod
+    def get_key(telegram_id: int, language_id: int) -> str:
+        return f"seen-words:{telegram_id}:{language_id}"
+
+    async def mark(self, telegram_id: int, language_id: int, seen_indexes: List[int]) -> List[bool]:
+        """Marks the words as seen and tells which of them already were."""
+        if not seen_indexes:
+            return []
+        operation = self.redis.bitfield(self.get_key(telegram_id, language_id))
+        for seen_index in seen_indexes:
+            operation.set("u1", seen_index, 1)
+        return [bool(bit) for bit in await operation.execute()]
+
+    async def are_seen(self, telegram_id: int, language_id: int, seen_indexes: List[int]) -> List[bool]:
+        if not seen_indexes:
+            return []
+        operation = self.redis.bitfield(self.get_key(telegram_id, language_id))
+        for seen_index in seen_indexes:
+            operation.get("u1", seen_index)
+        return [bool(bit) for bit in await operation.execute()]
+
+    async def count(self, telegram_id: int, language_id: int) -> int:
+        return await self.redis.bitcount(self.get_key(telegram_id, language_id))
+
+
+seen_words = SeenWords(get_redis())
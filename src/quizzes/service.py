@@ -1,22 +1,82 @@
+import asyncio
+import json
+import logging
+import random
+import time
 import uuid
-from typing import List
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
-from fastapi import Query
+from fastapi import HTTPException, Query
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.quizzes.query import (get_random_sentence_for_translate,
-                               get_random_user_favorite_word,
-                               get_random_word_for_translate, get_random_words,
-                               get_random_words_for_match,
-                               get_random_words_for_sentence,
-                               get_sentence_translation, get_translation_words,
-                               get_user_favorite_words)
-from src.quizzes.schemas import (MatchWordsResponse, RandomSentenceResponse,
-                                 RandomWordResponse)
-from src.quizzes.utils import (add_word_for_translate_to_other_words,
-                               delete_punctuation, shuffle_random_words)
-from src.words.schemas import SentenceInfo, WordInfo
+from src.cache import cache
+from src.config import (DAILY_CHALLENGE_INTERVAL, DAILY_CHALLENGE_MATCHES, DAILY_CHALLENGE_SENTENCES,
+                        DAILY_CHALLENGE_WORDS, NEIGHBORS_COUNT, NEIGHBORS_REFRESH_INTERVAL,
+                        QUESTION_POOL_REFILL_INTERVAL, SEEN_WORDS_OVERDEAL, VOCABULARY_SNAPSHOT_PATH,
+                        VOCABULARY_SNAPSHOT_REFRESH_INTERVAL, WORD_STATS_ROLLUP_INTERVAL)
+from src.database import async_session_maker
+from src.quizzes.daily import daily_challenge_store
+from src.quizzes.decks import MATCH_DECK, WORD_DECK, deck_store
+from src.quizzes.events import MATCH_MODE, SENTENCE_MODE, WORD_MODE, WORD_MODES, answer_event_buffer
+from src.quizzes.favorites import favorite_index
+from src.quizzes.generator import generate_questions, iter_questions
+from src.quizzes.matching import match_tokens
+from src.quizzes.neighbors import add_neighbors, find_neighbors
+from src.quizzes.pools import distractor_pool, question_candidates, token_vocabulary
+from src.quizzes.question_pool import question_pool
+from src.quizzes.query import (get_confusable_words,
+                               get_neighbor_candidates,
+                               get_random_favorite_word_question,
+                               get_random_sentences_with_translation,
+                               get_random_words_with_translation,
+                               get_sentence_answer,
+                               get_sentences_by_bucket_ordinals,
+                               get_snapshot_quiz_items,
+                               get_translation_ids_by_word_ids,
+                               get_translation_languages,
+                               get_translation_words,
+                               get_user_favorite_word,
+                               get_user_favorite_word_ids,
+                               get_user_language_pairs,
+                               get_user_sentence_bucket,
+                               get_user_word_buckets,
+                               get_word_question,
+                               get_word_questions_by_buckets,
+                               get_words_for_match_by_buckets,
+                               rebuild_quiz_items,
+                               save_daily_challenge_score,
+                               save_translation_word_neighbors,
+                               upsert_word_stats)
+from src.quizzes.reviews import review_scheduler
+from src.quizzes.sampler import word_sampler
+from src.quizzes.schemas import (DailyChallenge, DailyChallengeScoreSchema,
+                                 MatchPair, MatchPairResult,
+                                 MatchWordsResponse, RandomSentenceResponse,
+                                 RandomWordResponse, SentenceAnswerResult,
+                                 VocabularyCoverage)
+from src.quizzes.seen import seen_words
+from src.quizzes.stale_neighbors import NeighborGroup, stale_neighbor_groups
+from src.quizzes.snapshot import (VOCABULARY_VERSION, VocabularySnapshot, VocabularySnapshotReader, lock_snapshot,
+                                  vocabulary_snapshot, write_snapshot)
+from src.quizzes.tokens import answer_tokens
+from src.quizzes.utils import (get_today,
+                               shuffle_random_words, split_into_buckets,
+                               split_into_rounds)
+from src.quizzes.word_stats import word_stats_counter
+from src.models import Sentence
 from src.users.query import get_user_by_telegram_id
+from src.utils import commit_changes_or_rollback
+from src.words.schemas import SentenceInfo, WordInfo
+
+logger = logging.getLogger(__name__)
+
+
+class WordDeal(NamedTuple):
+    language_id: int
+    level: str
+    buckets: Dict[str, List[int]]
 
 
 class WordService:
@@ -25,36 +85,510 @@ class WordService:
 
     async def get_random_word(
             self,
-            telegram_id: int) -> RandomWordResponse:
+            telegram_id: int,
+            level: Optional[str] = None,
+            part_of_speech: Optional[str] = None) -> RandomWordResponse:
         async with self.session as session:
-            user = await get_user_by_telegram_id(session, telegram_id)
-            words = await self.get_random_words(user.learning_language_from_id, user.learning_language_to_id)
-            word_for_translate = words["word_for_translate"]
-            in_favorite = await get_user_favorite_words(session, word_for_translate.id, user.id)
-            response = QuizResponseService.create_random_word_response(word_for_translate, words["other_words"],
-                                                                       in_favorite)
-            return response
-
-    async def get_random_words(self, language_from_id: int, language_to_id: int) -> dict:
+            questions = await self.get_word_questions(session, telegram_id, 1, level, part_of_speech)
+            if not questions:
+                raise HTTPException(status_code=404, detail="Слово не найдено")
+            return await self.create_question_response(session, questions[0].learning_language_to_id, questions[0])
+
+    async def get_random_word_batch(self, telegram_id: int, count: int, level: Optional[str] = None,
+                                    part_of_speech: Optional[str] = None) -> List[RandomWordResponse]:
         async with self.session as session:
-            word_for_translate = await get_random_word_for_translate(session, language_from_id)
-            words = await get_random_words(session, language_to_id, word_for_translate.id)
+            questions = await self.get_word_questions(session, telegram_id, count, level, part_of_speech)
+            shuffle_random_words(questions)
+            return [await self.create_question_response(session, question.learning_language_to_id, question)
+                    for question in questions]
+
+    @staticmethod
+    async def get_word_questions(session: AsyncSession, telegram_id: int, count: int, level: Optional[str],
+                                 part_of_speech: Optional[str]) -> list:
+        """
+        Questions dealt from the user's deck, words the user has not seen first. SEEN_WORDS_OVERDEAL times as many
+        cards are dealt and read in one statement, since the seen indexes are stored with the words, and checked
+        against the seen-words bitmap in one call; only the questions asked are marked as seen.
+        """
+        language_id, questions = await WordService.deal_word_questions(session, telegram_id,
+                                                                       count * SEEN_WORDS_OVERDEAL, level,
+                                                                       part_of_speech)
+        were_seen = await SeenWordsService.are_seen(telegram_id, language_id,
+                                                    [question.seen_index for question in questions])
+        unseen = [question for question, was_seen in zip(questions, were_seen) if not was_seen]
+        seen = [question for question, was_seen in zip(questions, were_seen) if was_seen]
+        questions = unseen[:count] + seen[:count - len(unseen)]
+        await SeenWordsService.mark(telegram_id, language_id, [question.seen_index for question in questions])
+        return questions
+
+    @staticmethod
+    async def deal_word_questions(session: AsyncSession, telegram_id: int, count: int, level: Optional[str],
+                                  part_of_speech: Optional[str]) -> Tuple[int, list]:
+        """
+        Questions dealt from the user's deck, read with the user in one query. If the deck was dealt for another
+        language or level than the user's current ones, or none of its cards is left, a new deck is dealt.
+        """
+        for refresh in (False, True):
+            deal = await WordService.deal_words(session, telegram_id, WORD_DECK, count, level, part_of_speech,
+                                                refresh=refresh)
+            rows = await get_word_questions_by_buckets(session, telegram_id, deal.language_id, deal.level,
+                                                       deal.buckets)
+            if not rows:
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            user = rows[0]
+            questions = [row for row in rows if row.word_id is not None]
+            if (user.learning_language_from_id == deal.language_id and (level or user.rating) == deal.level
+                    and questions):
+                break
+        return deal.language_id, questions
+
+    @staticmethod
+    async def deal_words(session: AsyncSession, telegram_id: int, mode: str, count: int,
+                         level: Optional[str], part_of_speech: Optional[str], refresh: bool = False) -> WordDeal:
+        filters = f"{level or ''}:{part_of_speech or ''}"
+        deal = None if refresh else await DeckService.deal_known(telegram_id, mode, filters, count)
+        if deal is not None:
+            metadata, positions = deal
+            language_id, deck_level, bucket_sizes = json.loads(metadata)
+            return WordDeal(language_id, deck_level, split_into_buckets(positions, bucket_sizes))
+
+        buckets = await get_user_word_buckets(session, telegram_id, level, part_of_speech)
+        if not buckets:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        language_id, deck_level = buckets[0].learning_language_from_id, buckets[0].level
+        bucket_sizes = {bucket.part_of_speech: bucket.size for bucket in buckets if bucket.size}
+        metadata = json.dumps([language_id, deck_level, bucket_sizes])
+        deck_id = f"{language_id}:{deck_level}:{part_of_speech or ''}"
+        positions = await DeckService.deal(telegram_id, mode, deck_id, sum(bucket_sizes.values()), count, filters,
+                                           metadata)
+        return WordDeal(language_id, deck_level, split_into_buckets(positions, bucket_sizes))
+
+    @staticmethod
+    async def create_question_response(session: AsyncSession, language_to_id: int, question) -> RandomWordResponse:
+        neighbors = [WordInfo(id=neighbor_id, name=neighbor_name) for neighbor_id, neighbor_name
+                     in zip(question.neighbor_ids or [], question.neighbor_names or [])]
+        other_words = await WordService.get_distractors(session, language_to_id, question.word_id,
+                                                        question.translation_id, neighbors=neighbors)
+        other_words.append(WordInfo(id=question.translation_id, name=question.translation_name))
+        shuffle_random_words(other_words)
+        word_for_translate = WordInfo(id=question.word_id, name=question.word_name)
+        return QuizResponseService.create_random_word_response(word_for_translate, other_words,
+                                                               question.in_favorite, question.translation_id)
+
+    @staticmethod
+    async def get_distractors(session: AsyncSession, language_to_id: int, word_id: uuid.UUID,
+                              translation_id: uuid.UUID, k: int = 2,
+                              neighbors: Optional[List[WordInfo]] = None) -> List[WordInfo]:
+        """Random ``k`` of the confusable words, read unless given as ``neighbors``, completed from the pool."""
+        if neighbors is None:
+            neighbors = [WordInfo(id=neighbor.id, name=neighbor.name)
+                         for neighbor in await get_confusable_words(session, translation_id)]
+        distractors = random.sample(neighbors, min(k, len(neighbors)))
+        if len(distractors) < k:
+            distractors.extend(await distractor_pool.get_distractors(session, language_to_id, word_id,
+                                                                     k - len(distractors)))
+        return distractors
 
-            add_word_for_translate_to_other_words(words, word_for_translate)
-            shuffle_random_words(words)
-            return {"other_words": words, "word_for_translate": word_for_translate}
+    @staticmethod
+    async def sample_quiz_items(session: AsyncSession, language_from_id: int, count: int) -> list:
+        snapshot = await VocabularySnapshotService.get_current()
+        if snapshot is not None and snapshot.get_size(language_from_id):
+            return snapshot.sample(language_from_id, count)
+        return await get_random_words_with_translation(session, language_from_id, count)
 
-    async def get_match_words(self, telegram_id: int):
+    @staticmethod
+    async def generate_random_words(session: AsyncSession, language_from_id: int, language_to_id: int, count: int,
+                                    token_ttl: Optional[int] = None,
+                                    distinct: bool = False) -> List[RandomWordResponse]:
+        candidates = await question_candidates.get_language(session, (language_from_id, language_to_id))
+        batch = generate_questions(candidates, count, distinct=distinct)
+        return [
+            QuizResponseService.create_random_word_response(
+                WordInfo(id=word_id, name=word_name),
+                [WordInfo(id=option_id, name=option_name) for option_id, option_name in options],
+                translation_id=translation_id, token_ttl=token_ttl
+            )
+            for (word_id, word_name), options, translation_id in iter_questions(candidates, batch)
+        ]
+
+    async def get_vocabulary_coverage(self, telegram_id: int) -> VocabularyCoverage:
         async with self.session as session:
             user = await get_user_by_telegram_id(session, telegram_id)
-            words = await get_random_words_for_match(session, user.learning_language_from_id)
-            words_list = [{"id": w.id, "name": w.name} for w in words]
-            translation_words_list = [{"id": w.translation.id, "name": w.translation.name} for w in words]
-            shuffle_random_words(words_list)
-            shuffle_random_words(translation_words_list)
+            if not user:
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            total = await word_sampler.get_size(session, user.learning_language_from_id)
+            # Bits of deleted words stay set, as their seen indexes are never reused.
+            seen = min(await seen_words.count(telegram_id, user.learning_language_from_id), total)
+            return VocabularyCoverage(seen=seen, total=total, coverage=seen / total if total else 0.0)
+
+    async def get_match_words(self, telegram_id: int, level: Optional[str] = None,
+                              part_of_speech: Optional[str] = None):
+        async with self.session as session:
+            deal = await self.deal_words(session, telegram_id, MATCH_DECK, 8, level, part_of_speech)
+            words = await get_words_for_match_by_buckets(session, deal.language_id, deal.level, deal.buckets)
+            await SeenWordsService.mark(telegram_id, deal.language_id, [word.seen_index for word in words])
+            return self.create_match_words_response(words)
+
+    async def get_match_words_batch(self, telegram_id: int, count: int, level: Optional[str] = None,
+                                    part_of_speech: Optional[str] = None) -> List[MatchWordsResponse]:
+        async with self.session as session:
+            deal = await self.deal_words(session, telegram_id, MATCH_DECK, 8 * count, level, part_of_speech)
+            words = await get_words_for_match_by_buckets(session, deal.language_id, deal.level, deal.buckets)
+            await SeenWordsService.mark(telegram_id, deal.language_id, [word.seen_index for word in words])
+            return [self.create_match_words_response(round_words) for round_words in split_into_rounds(words, 8)]
+
+    @staticmethod
+    def create_match_words_response(words) -> MatchWordsResponse:
+        words_list = [{"id": w.word_id, "name": w.word_name} for w in words]
+        translation_words_list = [{"id": w.translation_id, "name": w.translation_name} for w in words]
+        shuffle_random_words(words_list)
+        shuffle_random_words(translation_words_list)
+
+        response = QuizResponseService.create_match_words_response(words_list, translation_words_list)
+        return response
+
+
+class DeckService:
+
+    @staticmethod
+    async def deal(telegram_id: int, mode: str, deck_id: str, size: int, count: int, filters: str = "",
+                   metadata: str = "") -> List[int]:
+        try:
+            return await deck_store.deal(telegram_id, mode, deck_id, size, count, filters, metadata)
+        except RedisError:
+            return random.sample(range(size), min(count, size))
+
+    @staticmethod
+    async def deal_known(telegram_id: int, mode: str, filters: str, count: int) -> Optional[Tuple[str, List[int]]]:
+        try:
+            return await deck_store.deal_known(telegram_id, mode, filters, count)
+        except RedisError:
+            return None
+
+    @staticmethod
+    async def invalidate(telegram_id: int) -> None:
+        try:
+            await deck_store.invalidate(telegram_id)
+        except RedisError:
+            logger.warning("Could not reset decks of user %s", telegram_id)
+
+
+class SeenWordsService:
+
+    @staticmethod
+    async def are_seen(telegram_id: int, language_id: int, seen_indexes: List[int]) -> List[bool]:
+        try:
+            return await seen_words.are_seen(telegram_id, language_id, seen_indexes)
+        except RedisError:
+            logger.warning("Could not read seen words of user %s", telegram_id)
+            return [False] * len(seen_indexes)
+
+    @staticmethod
+    async def mark(telegram_id: int, language_id: int, seen_indexes: List[int]) -> List[bool]:
+        try:
+            return await seen_words.mark(telegram_id, language_id, seen_indexes)
+        except RedisError:
+            logger.warning("Could not mark seen words of user %s", telegram_id)
+            return [False] * len(seen_indexes)
+
+
+class QuestionPoolService:
+
+    @staticmethod
+    async def pop(language_from_id: int, language_to_id: int) -> Optional[RandomWordResponse]:
+        try:
+            return await question_pool.pop(language_from_id, language_to_id)
+        except RedisError:
+            return None
+
+    @staticmethod
+    async def refill(session: AsyncSession, language_from_id: int, language_to_id: int) -> int:
+        missing_count = await question_pool.get_missing_count(language_from_id, language_to_id)
+        if not missing_count:
+            return 0
+        questions = await WordService.generate_random_words(session, language_from_id, language_to_id, missing_count)
+        await question_pool.push(language_from_id, language_to_id, questions)
+        return missing_count
+
+    @staticmethod
+    async def run_refill_loop():
+        while True:
+            try:
+                if await question_pool.acquire_refill_lock():
+                    for language_from_id, language_to_id in await question_pool.get_pairs():
+                        started_at = time.monotonic()
+                        async with async_session_maker() as session:
+                            refilled = await QuestionPoolService.refill(session, language_from_id, language_to_id)
+                        if refilled:
+                            await question_pool.record_refill(refilled, time.monotonic() - started_at)
+            except Exception:
+                logger.exception("Question pool refill failed")
+            await asyncio.sleep(QUESTION_POOL_REFILL_INTERVAL)
+
+
+class DailyChallengeService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def generate(self, language_from_id: int, language_to_id: int, day: date, regenerate: bool = False) -> bool:
+        if not regenerate and await daily_challenge_store.exists(language_from_id, language_to_id, day):
+            return False
+        token_ttl = daily_challenge_store.ttl
+        async with self.session as session:
+            questions = await WordService.generate_random_words(session, language_from_id, language_to_id,
+                                                                DAILY_CHALLENGE_WORDS, token_ttl, distinct=True)
+            sentences = await get_random_sentences_with_translation(session, language_from_id,
+                                                                    DAILY_CHALLENGE_SENTENCES)
+            sentence_questions = [
+                await SentenceService.create_sentence_response(session, language_to_id, sentence, token_ttl)
+                for sentence in sentences
+            ]
+            match_words = await WordService.sample_quiz_items(session, language_from_id, 8 * DAILY_CHALLENGE_MATCHES)
+        challenge = DailyChallenge(
+            day=day,
+            language_from_id=language_from_id,
+            language_to_id=language_to_id,
+            words=questions,
+            sentences=sentence_questions,
+            match_words=[WordService.create_match_words_response(round_words)
+                         for round_words in split_into_rounds(match_words, 8)],
+        )
+        return await daily_challenge_store.save(language_from_id, language_to_id, day, challenge.model_dump_json(),
+                                                replace=regenerate)
+
+    async def generate_for_all_pairs(self, day: date, regenerate: bool = False) -> int:
+        async with self.session as session:
+            pairs = await get_user_language_pairs(session)
+        generated = 0
+        for language_from_id, language_to_id in pairs:
+            generated += await self.generate(language_from_id, language_to_id, day, regenerate)
+        return generated
+
+    @staticmethod
+    async def get(language_from_id: int, language_to_id: int, day: Optional[date] = None) -> bytes:
+        challenge = await daily_challenge_store.get(language_from_id, language_to_id, day or get_today())
+        if challenge is None:
+            raise HTTPException(status_code=404, detail="Ежедневное задание не найдено")
+        return challenge
+
+    @staticmethod
+    def get_question_count(challenge: bytes) -> int:
+        """Questions of a stored challenge, each match-words round counting as one."""
+        challenge = json.loads(challenge)
+        return len(challenge["words"]) + len(challenge["sentences"]) + len(challenge["match_words"])
+
+    async def save_score(self, score: DailyChallengeScoreSchema) -> int:
+        if score.day > get_today():
+            raise HTTPException(status_code=400, detail="Ежедневное задание ещё не началось")
+        async with self.session as session:
+            user = await get_user_by_telegram_id(session, score.telegram_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            challenge = await daily_challenge_store.get(user.learning_language_from_id, user.learning_language_to_id,
+                                                        score.day)
+            if challenge is None:
+                raise HTTPException(status_code=404, detail="Ежедневное задание не найдено")
+            if score.score > self.get_question_count(challenge):
+                raise HTTPException(status_code=400, detail="Результат больше числа вопросов задания")
+            best_score = await save_daily_challenge_score(session, score.telegram_id, score.day, score.score)
+            await commit_changes_or_rollback(session, "Ошибка при сохранении результата")
+            return best_score
+
+    @staticmethod
+    async def run_generation_loop():
+        while True:
+            today = get_today()
+            for day in (today, today + timedelta(days=1)):
+                try:
+                    async with async_session_maker() as session:
+                        await DailyChallengeService(session).generate_for_all_pairs(day)
+                except Exception:
+                    logger.exception("Daily challenge generation for %s failed", day)
+            await asyncio.sleep(DAILY_CHALLENGE_INTERVAL)
+
+
+class QuizItemService:
+
+    @staticmethod
+    async def rebuild(session: AsyncSession) -> int:
+        rebuilt = await rebuild_quiz_items(session)
+        await commit_changes_or_rollback(session, "Ошибка при пересборке вопросов")
+        return rebuilt
+
+
+class VocabularySnapshotService:
+
+    @staticmethod
+    async def build(session: AsyncSession, path: str = VOCABULARY_SNAPSHOT_PATH) -> int:
+        version = await cache.get_version(VOCABULARY_VERSION)
+        rows = await get_snapshot_quiz_items(session)
+        return await asyncio.to_thread(write_snapshot, path, rows, version)
+
+    @staticmethod
+    async def get_current(reader: VocabularySnapshotReader = vocabulary_snapshot) -> Optional[VocabularySnapshot]:
+        """The snapshot, unless words were written since it was built."""
+        snapshot = reader.get()
+        if snapshot is None or snapshot.version != await cache.get_version(VOCABULARY_VERSION):
+            return None
+        return snapshot
+
+    @staticmethod
+    async def refresh(session: AsyncSession, reader: VocabularySnapshotReader = vocabulary_snapshot) -> Optional[int]:
+        """Rebuilds an outdated snapshot in one worker of the host, which all of its workers then read."""
+        if await VocabularySnapshotService.get_current(reader) is not None:
+            return None
+        with lock_snapshot(reader.path) as locked:
+            if not locked:
+                return None
+            written = await VocabularySnapshotService.build(session, reader.path)
+        reader.reload()
+        return written
+
+    @staticmethod
+    async def run_refresh_loop():
+        while True:
+            try:
+                async with async_session_maker() as session:
+                    await VocabularySnapshotService.refresh(session)
+            except Exception:
+                logger.exception("Vocabulary snapshot refresh failed")
+            await asyncio.sleep(VOCABULARY_SNAPSHOT_REFRESH_INTERVAL)
+
+
+class NeighborService:
 
-            response = QuizResponseService.create_match_words_response(words_list, translation_words_list)
-            return response
+    @staticmethod
+    async def build(session: AsyncSession, language_to_id: int, rebuild: bool = False, level: Optional[str] = None,
+                    part_of_speech: Optional[str] = None) -> int:
+        groups = {}
+        for candidate in await get_neighbor_candidates(session, language_to_id, level, part_of_speech):
+            groups.setdefault((candidate.level, candidate.part_of_speech), []).append(candidate)
+        built = 0
+        for candidates in groups.values():
+            targets = [index for index, candidate in enumerate(candidates) if rebuild or candidate.neighbor_ids is None]
+            if not targets:
+                continue
+            names = [candidate.name for candidate in candidates]
+            neighbors = await asyncio.to_thread(find_neighbors, names, targets, NEIGHBORS_COUNT)
+            await save_translation_word_neighbors(session, {
+                candidates[target].id: [candidates[index].id for index in target_neighbors]
+                for target, target_neighbors in zip(targets, neighbors)
+            })
+            await session.commit()
+            built += len(targets)
+        return built
+
+    @staticmethod
+    async def build_all(session: AsyncSession, rebuild: bool = False) -> int:
+        built = 0
+        for language_to_id in await get_translation_languages(session):
+            built += await NeighborService.build(session, language_to_id, rebuild)
+        return built
+
+    @staticmethod
+    async def mark_stale(groups: Iterable[NeighborGroup]) -> None:
+        try:
+            await stale_neighbor_groups.add(groups)
+        except RedisError:
+            logger.warning("Failed to mark distractor neighbor groups as stale", exc_info=True)
+
+    @staticmethod
+    async def refresh_group(session: AsyncSession, language_to_id: int, level: str, part_of_speech: str) -> int:
+        """
+        Brings the lists of a changed group up to date without recomputing all of it. Added words, which have no
+        list yet, and words whose list holds a deleted or renamed word get theirs computed against the group;
+        the added words enter the other lists only where they beat the worst neighbor.
+        """
+        candidates = await get_neighbor_candidates(session, language_to_id, level, part_of_speech)
+        positions = {candidate.id: index for index, candidate in enumerate(candidates)}
+        added = [index for index, candidate in enumerate(candidates) if candidate.neighbor_ids is None]
+        targets = added + [
+            index for index, candidate in enumerate(candidates)
+            if candidate.neighbor_ids is not None and any(
+                neighbor_id not in positions or candidates[positions[neighbor_id]].neighbor_ids is None
+                for neighbor_id in candidate.neighbor_ids
+            )
+        ]
+        if not targets:
+            return 0
+        names = [candidate.name for candidate in candidates]
+        neighbors = [[positions[neighbor_id] for neighbor_id in candidate.neighbor_ids or []
+                      if neighbor_id in positions] for candidate in candidates]
+        changed = await asyncio.to_thread(add_neighbors, names, neighbors, added, NEIGHBORS_COUNT)
+        changed.update(zip(targets, await asyncio.to_thread(find_neighbors, names, targets, NEIGHBORS_COUNT)))
+        await save_translation_word_neighbors(session, {
+            candidates[index].id: [candidates[neighbor].id for neighbor in index_neighbors]
+            for index, index_neighbors in changed.items()
+        })
+        await session.commit()
+        return len(changed)
+
+    @staticmethod
+    async def refresh_stale(session: AsyncSession) -> int:
+        """Refreshes the groups changed since the last run; the CLI ``neighbors --rebuild`` recomputes them all."""
+        groups = await stale_neighbor_groups.pop_all()
+        refreshed = 0
+        for index, (language_to_id, level, part_of_speech) in enumerate(groups):
+            try:
+                refreshed += await NeighborService.refresh_group(session, language_to_id, level, part_of_speech)
+            except Exception:
+                await stale_neighbor_groups.add(groups[index:])
+                raise
+        return refreshed
+
+    @staticmethod
+    async def run_refresh_loop():
+        """Refreshes the stale groups in one worker at a time; the CLI ``neighbors`` command builds everything."""
+        while True:
+            try:
+                if await stale_neighbor_groups.acquire_refresh_lock():
+                    async with async_session_maker() as session:
+                        await NeighborService.refresh_stale(session)
+            except Exception:
+                logger.exception("Distractor neighbors refresh failed")
+            await asyncio.sleep(NEIGHBORS_REFRESH_INTERVAL)
+
+
+class WordStatsService:
+
+    @staticmethod
+    async def record(word_id: uuid.UUID, correct: bool, latency_ms: Optional[int] = None) -> None:
+        try:
+            await word_stats_counter.record(word_id, correct, latency_ms)
+        except RedisError:
+            logger.warning("Could not record answer statistics of word %s", word_id)
+
+    @staticmethod
+    async def record_many(answers: List[tuple]) -> None:
+        try:
+            await word_stats_counter.record_many(answers)
+        except RedisError:
+            logger.warning("Could not record answer statistics of %s words", len(answers))
+
+    @staticmethod
+    async def rollup(session: AsyncSession) -> int:
+        counters = await word_stats_counter.take()
+        if not counters:
+            return 0
+        try:
+            await upsert_word_stats(session, counters)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            await word_stats_counter.restore(counters)
+            raise
+        return len(counters)
+
+    @staticmethod
+    async def run_rollup_loop():
+        while True:
+            try:
+                async with async_session_maker() as session:
+                    while await WordStatsService.rollup(session) >= word_stats_counter.batch_size:
+                        pass
+            except Exception:
+                logger.exception("Word statistics rollup failed")
+            await asyncio.sleep(WORD_STATS_ROLLUP_INTERVAL)
 
 
 class FavoriteWordService:
@@ -63,75 +597,220 @@ class FavoriteWordService:
 
     async def get_random_favorite_word(self, telegram_id: int):
         async with self.session as session:
-            user = await get_user_by_telegram_id(session, telegram_id)
-            random_user_favorite_word = await get_random_user_favorite_word(session, user.id)
-            other_words = await get_random_words(session, user.learning_language_to_id,
-                                                 random_user_favorite_word.id)
+            while True:
+                try:
+                    word_ids = await favorite_index.sample(telegram_id)
+                    if word_ids is None:
+                        await self.load_favorites(session, telegram_id)
+                        word_ids = await favorite_index.sample(telegram_id)
+                except RedisError:
+                    question = await get_random_favorite_word_question(session, telegram_id)
+                    break
+                if not word_ids:
+                    raise HTTPException(status_code=404, detail="Слово не найдено")
+                question = await get_word_question(session, telegram_id, word_ids[0])
+                if question is not None:
+                    break
+                await favorite_index.remove(telegram_id, word_ids[0])
+            if question is None or question.word_id is None:
+                raise HTTPException(status_code=404, detail="Слово не найдено")
+            return await WordService.create_question_response(session, question.learning_language_to_id, question)
 
-            add_word_for_translate_to_other_words(other_words, random_user_favorite_word)
-            shuffle_random_words(other_words)
+    @staticmethod
+    async def load_favorites(session: AsyncSession, telegram_id: int) -> None:
+        word_ids = await get_user_favorite_word_ids(session, telegram_id)
+        await favorite_index.load(telegram_id, word_ids)
 
-            response = QuizResponseService.create_random_word_response(random_user_favorite_word, other_words,
-                                                                       in_favorite=True)
-            return response
+    @staticmethod
+    async def is_favorite(session: AsyncSession, telegram_id: int, word_id: uuid.UUID) -> bool:
+        try:
+            in_favorite = await favorite_index.contains(telegram_id, word_id)
+            if in_favorite is None:
+                await FavoriteWordService.load_favorites(session, telegram_id)
+                in_favorite = await favorite_index.contains(telegram_id, word_id)
+            return in_favorite
+        except RedisError:
+            return await get_user_favorite_word(session, telegram_id, word_id) is not None
 
+    @staticmethod
+    async def add_to_index(telegram_id: int, word_id: uuid.UUID) -> None:
+        try:
+            await favorite_index.add(telegram_id, word_id)
+        except RedisError:
+            logger.warning("Could not add favorite word %s of user %s", word_id, telegram_id)
 
-class SentenceService:
+    @staticmethod
+    async def remove_from_index(telegram_id: int, word_id: uuid.UUID) -> None:
+        try:
+            await favorite_index.remove(telegram_id, word_id)
+        except RedisError:
+            logger.warning("Could not remove favorite word %s of user %s", word_id, telegram_id)
+
+
+class ReviewService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_random_sentence(self, telegram_id: int):
+    async def get_next_review(self, telegram_id: int) -> RandomWordResponse:
         async with self.session as session:
-            user = await get_user_by_telegram_id(session, telegram_id)
-            language_to_id = user.learning_language_to_id
-            random_sentence_for_translate = await get_random_sentence_for_translate(session,
-                                                                                    user.learning_language_from_id)
+            while True:
+                word_id = await review_scheduler.get_next_due(telegram_id)
+                if word_id is None:
+                    raise HTTPException(status_code=404, detail="Нет слов для повторения")
+                question = await get_word_question(session, telegram_id, word_id)
+                if question is not None:
+                    return await WordService.create_question_response(session, question.learning_language_to_id,
+                                                                      question)
+                await review_scheduler.remove(telegram_id, word_id)
 
-            words_for_sentence = delete_punctuation(random_sentence_for_translate.translation.name).split()
-            random_words_for_sentence = await get_random_words_for_sentence(session, language_to_id, words_for_sentence)
+    @staticmethod
+    async def add(telegram_id: int, word_id: uuid.UUID) -> None:
+        try:
+            await review_scheduler.add(telegram_id, word_id)
+        except RedisError:
+            logger.warning("Could not schedule word %s for user %s", word_id, telegram_id)
 
-            words_for_sentence.extend(random_words_for_sentence)
-            shuffle_random_words(words_for_sentence)
+    @staticmethod
+    async def record_answer(telegram_id: int, word_id: uuid.UUID, correct: bool) -> None:
+        try:
+            await review_scheduler.record_answer(telegram_id, word_id, correct)
+        except RedisError:
+            logger.warning("Could not reschedule word %s for user %s", word_id, telegram_id)
 
-            response = QuizResponseService.create_random_sentence_response(random_sentence_for_translate,
-                                                                           words_for_sentence)
-            return response
+    @staticmethod
+    async def remove(telegram_id: int, word_id: uuid.UUID) -> None:
+        try:
+            await review_scheduler.remove(telegram_id, word_id)
+        except RedisError:
+            logger.warning("Could not unschedule word %s for user %s", word_id, telegram_id)
+
+
+class SentenceService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_random_sentence(self, telegram_id: int, level: Optional[str] = None):
+        sentences = await self.get_random_sentences(telegram_id, 1, level)
+        if not sentences:
+            raise HTTPException(status_code=404, detail="Предложение не найдено")
+        return sentences[0]
+
+    async def get_random_sentences(self, telegram_id: int, count: int,
+                                   level: Optional[str] = None) -> List[RandomSentenceResponse]:
+        async with self.session as session:
+            user = await get_user_sentence_bucket(session, telegram_id, level)
+            if user is None:
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            ordinals = random.sample(range(user.size), min(count, user.size))
+            sentences = await get_sentences_by_bucket_ordinals(session, user.learning_language_from_id, user.level,
+                                                               ordinals)
+            return [await self.create_sentence_response(session, user.learning_language_to_id, sentence)
+                    for sentence in sentences]
+
+    @staticmethod
+    async def create_sentence_response(
+            session: AsyncSession, language_to_id: int, sentence_for_translate: Sentence,
+            token_ttl: Optional[int] = None
+    ) -> RandomSentenceResponse:
+        answer = sentence_for_translate.translation.tokens
+        words_for_sentence = list(answer)
+        random_words_for_sentence = await token_vocabulary.get_tokens(session, language_to_id, words_for_sentence,
+                                                                      random.randint(2, 4))
+        words_for_sentence.extend(random_words_for_sentence)
+        shuffle_random_words(words_for_sentence)
+
+        response = QuizResponseService.create_random_sentence_response(sentence_for_translate, words_for_sentence,
+                                                                       answer, token_ttl)
+        return response
 
 
 class QuizAnswerService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def check_answer(self, word_for_translate_id: uuid.UUID, user_word_id: uuid.UUID):
+    async def check_answer(self, word_for_translate_id: uuid.UUID, user_word_id: uuid.UUID,
+                           answer_token: Optional[str] = None, telegram_id: Optional[int] = None):
+        result = None
+        if answer_token:
+            result = answer_tokens.verify_word_answer(answer_token, word_for_translate_id, user_word_id)
+        if result is None:
+            async with self.session as session:
+                word = await get_translation_words(session, word_for_translate_id)
+                result = user_word_id == word.id
+        if telegram_id is not None:
+            await ReviewService.record_answer(telegram_id, word_for_translate_id, result)
+        await self.record_answer(word_for_translate_id, WORD_MODE, result, telegram_id, answer_token)
+        return result
+
+    async def check_sentence_answer(self, sentence_id: uuid.UUID, user_words: list[str] = Query(...),
+                                    answer_token: Optional[str] = None,
+                                    telegram_id: Optional[int] = None) -> SentenceAnswerResult:
         async with self.session as session:
-            word = await get_translation_words(session, word_for_translate_id)
-            return user_word_id == word.id
+            result = await self.match_sentence_answer(session, sentence_id, user_words, answer_token)
+        await self.record_answer(sentence_id, SENTENCE_MODE, result.correct, telegram_id, answer_token)
+        return result
 
-    async def check_sentence_answer(self, sentence_id: uuid.UUID, user_words: list[str] = Query(...), ):
+    @staticmethod
+    async def match_sentence_answer(session: AsyncSession, sentence_id: uuid.UUID, user_words: List[str],
+                                    answer_token: Optional[str] = None) -> SentenceAnswerResult:
+        if answer_token and answer_tokens.verify_sentence_answer(answer_token, sentence_id, user_words):
+            return SentenceAnswerResult(correct=True, distance=0, token_distance=0, wrong_tokens=[], extra_tokens=[])
+        answer = await get_sentence_answer(session, sentence_id)
+        if answer is None:
+            raise HTTPException(status_code=404, detail="Предложение не найдено")
+        return SentenceAnswerResult(**match_tokens(answer["tokens"], user_words, answer["level"])._asdict())
+
+    async def check_match(self, pairs: List[MatchPair], telegram_id: Optional[int] = None) -> List[MatchPairResult]:
         async with self.session as session:
-            sentence = await get_sentence_translation(session, sentence_id)
-            return delete_punctuation(sentence.name).lower() == " ".join(user_words).lower()
+            translations = await get_translation_ids_by_word_ids(session, [pair.word_id for pair in pairs])
+        results = [MatchPairResult(word_id=pair.word_id, translation_id=pair.translation_id,
+                                   correct=translations.get(pair.word_id) == pair.translation_id)
+                   for pair in pairs]
+        for result in results:
+            answer_event_buffer.record(result.word_id, MATCH_MODE, result.correct, telegram_id)
+        await WordStatsService.record_many([(result.word_id, result.correct, None) for result in results])
+        return results
+
+    @staticmethod
+    async def record_answer(item_id: uuid.UUID, mode: str, correct: bool, telegram_id: Optional[int] = None,
+                            answer_token: Optional[str] = None) -> None:
+        issued_at = answer_tokens.get_issued_at(answer_token) if answer_token else None
+        answer_event_buffer.record(item_id, mode, correct, telegram_id, issued_at)
+        if mode in WORD_MODES:
+            latency_ms = int((time.time() - issued_at) * 1000) if issued_at is not None else None
+            await WordStatsService.record(item_id, correct, latency_ms)
 
 
 class QuizResponseService:
 
     @staticmethod
     def create_random_word_response(word_for_translate: WordInfo, words: List[WordInfo],
-                                    in_favorite: bool = None) -> RandomWordResponse:
+                                    in_favorite: bool = None, translation_id: uuid.UUID = None,
+                                    token_ttl: Optional[int] = None) -> RandomWordResponse:
+        answer_token = None
+        if translation_id:
+            answer_token = answer_tokens.sign_word_answer(word_for_translate.id, translation_id, token_ttl)
         response = RandomWordResponse(
             type="random_word",
             word_for_translate=WordInfo(**word_for_translate.__dict__),
             other_words=[WordInfo(**word.__dict__) for word in words],
-            in_favorite=True if in_favorite else False
+            in_favorite=True if in_favorite else False,
+            answer_token=answer_token
         )
         return response
 
     @staticmethod
-    def create_random_sentence_response(random_sentence_for_translate: SentenceInfo, words_for_sentence: List[str]) -> RandomSentenceResponse:
+    def create_random_sentence_response(random_sentence_for_translate: SentenceInfo, words_for_sentence: List[str],
+                                        answer: List[str] = None, token_ttl: Optional[int] = None
+                                        ) -> RandomSentenceResponse:
+        answer_token = None
+        if answer:
+            answer_token = answer_tokens.sign_sentence_answer(random_sentence_for_translate.id, answer, token_ttl)
         response = RandomSentenceResponse(
             type="random_sentence",
             sentence_for_translate=SentenceInfo(**random_sentence_for_translate.__dict__),
-            words_for_sentence=words_for_sentence
+            words_for_sentence=words_for_sentence,
+            answer_token=answer_token
         )
         return response
 
@@ -0,0 +1,213 @@
+import bisect
+import fcntl
+import logging
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from itertools import groupby
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from src.config import VOCABULARY_SNAPSHOT_CHECK_INTERVAL, VOCABULARY_SNAPSHOT_PATH
+
+MAGIC = b"VOCSNAP1"
+HEADER = struct.Struct("<8sQI")
+GROUP = struct.Struct("<I4sIQ")
+UUID_SIZE = 16
+OFFSET_SIZE = 4
+# Cache namespace moved to a new version by every write to the words, which snapshots carry as their version.
+VOCABULARY_VERSION = "vocabulary"
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotItem(NamedTuple):
+    word_id: uuid.UUID
+    word_name: str
+    translation_id: uuid.UUID
+    translation_name: str
+    language_to_id: int
+
+
+class SnapshotGroup(NamedTuple):
+    level: str
+    count: int
+    offset: int
+
+
+def pack_group(rows: list) -> bytes:
+    """
+    Word ids, translation ids, target languages, then ``2 * count + 1`` offsets into a blob of UTF-8 names,
+    where the word name of item ``i`` is ``blob[offsets[2i]:offsets[2i + 1]]`` and its translation follows.
+    """
+    blob = bytearray()
+    offsets = [0]
+    for row in rows:
+        blob += row.word_name.encode()
+        offsets.append(len(blob))
+        blob += row.translation_name.encode()
+        offsets.append(len(blob))
+    return b"".join([
+        b"".join(row.word_id.bytes for row in rows),
+        b"".join(row.translation_id.bytes for row in rows),
+        struct.pack(f"<{len(rows)}I", *[row.language_to_id for row in rows]),
+        struct.pack(f"<{len(offsets)}I", *offsets),
+        bytes(blob),
+    ])
+
+
+def write_snapshot(path: str, rows: Iterable, version: Optional[int] = None) -> int:
+    """
+    Writes quiz item rows, sorted by ``language_from_id`` and ``level``, to a temporary file next to ``path``
+    and renames it over ``path``, so readers see either the old or the new snapshot in full.
+    """
+    groups = [(language_id, level, list(group_rows))
+              for (language_id, level), group_rows in groupby(rows, key=attrgetter("language_from_id", "level"))]
+    offset = HEADER.size + GROUP.size * len(groups)
+    directory, data = [], []
+    for language_id, level, items in groups:
+        directory.append(GROUP.pack(language_id, level.encode(), len(items), offset))
+        data.append(pack_group(items))
+        offset += len(data[-1])
+    header = HEADER.pack(MAGIC, time.time_ns() if version is None else version, len(groups))
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(header)
+            file.writelines(directory)
+            file.writelines(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    return sum(len(items) for _, _, items in groups)
+
+
+@contextmanager
+def lock_snapshot(path: str) -> Iterator[bool]:
+    """Tries to take an exclusive lock of the snapshot at ``path``, which one process of the host holds at a time."""
+    with open(f"{path}.lock", "a") as file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+        else:
+            yield True
+
+
+class VocabularySnapshot:
+    """
+    Read-only view of a snapshot file. The file is memory-mapped, so every worker shares the same pages
+    through the page cache and only decodes the items it samples.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            self.file_id = (stat.st_ino, stat.st_mtime_ns)
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, group_count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a vocabulary snapshot")
+        self.languages: Dict[int, List[SnapshotGroup]] = {}
+        for index in range(group_count):
+            language_id, level, count, offset = GROUP.unpack_from(self.buffer, HEADER.size + GROUP.size * index)
+            self.languages.setdefault(language_id, []).append(
+                SnapshotGroup(level.rstrip(b"\0").decode(), count, offset)
+            )
+        self.bounds = {language_id: self.get_bounds(groups) for language_id, groups in self.languages.items()}
+
+    @staticmethod
+    def get_bounds(groups: List[SnapshotGroup]) -> List[int]:
+        bounds, total = [], 0
+        for group in groups:
+            total += group.count
+            bounds.append(total)
+        return bounds
+
+    def get_groups(self, language_id: int, level: Optional[str] = None) -> List[SnapshotGroup]:
+        groups = self.languages.get(language_id, [])
+        return groups if level is None else [group for group in groups if group.level == level]
+
+    def get_size(self, language_id: int, level: Optional[str] = None) -> int:
+        return sum(group.count for group in self.get_groups(language_id, level))
+
+    def get_item(self, group: SnapshotGroup, index: int) -> SnapshotItem:
+        count, offset = group.count, group.offset
+        word_id = self.buffer[offset + UUID_SIZE * index:offset + UUID_SIZE * (index + 1)]
+        offset += UUID_SIZE * count
+        translation_id = self.buffer[offset + UUID_SIZE * index:offset + UUID_SIZE * (index + 1)]
+        offset += UUID_SIZE * count
+        (language_to_id,) = struct.unpack_from("<I", self.buffer, offset + OFFSET_SIZE * index)
+        offset += OFFSET_SIZE * count
+        start, middle, end = struct.unpack_from("<3I", self.buffer, offset + 2 * OFFSET_SIZE * index)
+        blob = offset + OFFSET_SIZE * (2 * count + 1)
+        return SnapshotItem(uuid.UUID(bytes=word_id), self.buffer[blob + start:blob + middle].decode(),
+                            uuid.UUID(bytes=translation_id), self.buffer[blob + middle:blob + end].decode(),
+                            language_to_id)
+
+    def sample(self, language_id: int, k: int, level: Optional[str] = None) -> List[SnapshotItem]:
+        if level is not None:
+            groups = self.get_groups(language_id, level)
+            bounds = self.get_bounds(groups)
+        else:
+            groups, bounds = self.languages.get(language_id, []), self.bounds.get(language_id, [])
+        size = bounds[-1] if bounds else 0
+        items = []
+        for position in random.sample(range(size), min(k, size)):
+            group_index = bisect.bisect_right(bounds, position)
+            group_start = bounds[group_index - 1] if group_index else 0
+            items.append(self.get_item(groups[group_index], position - group_start))
+        return items
+
+    def close(self) -> None:
+        self.buffer.close()
+
+
+class VocabularySnapshotReader:
+    """
+    Opens the snapshot on first use and checks at most every ``check_interval`` seconds whether the file
+    was replaced, swapping to the new version without a restart. Without a snapshot it returns ``None``.
+    """
+
+    def __init__(self, path: str = VOCABULARY_SNAPSHOT_PATH,
+                 check_interval: float = VOCABULARY_SNAPSHOT_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.snapshot: Optional[VocabularySnapshot] = None
+        self.checked_at: Optional[float] = None
+
+    def get(self) -> Optional[VocabularySnapshot]:
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.check_interval:
+            self.checked_at = now
+            self.reload()
+        return self.snapshot
+
+    def reload(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if self.snapshot is not None and self.snapshot.file_id == (stat.st_ino, stat.st_mtime_ns):
+            return
+        try:
+            snapshot = VocabularySnapshot(self.path)
+        except (OSError, ValueError, struct.error):
+            logger.exception("Could not open vocabulary snapshot %s", self.path)
+            return
+        previous, self.snapshot = self.snapshot, snapshot
+        if previous is not None:
+            previous.close()
+
+
+vocabulary_snapshot = VocabularySnapshotReader()
@@ -0,0 +1,44 @@
+from typing import Iterable, List, Tuple
+
+import redis.asyncio as redis
+
+from src.config import NEIGHBORS_REFRESH_INTERVAL
+from src.database import get_redis
+
+NeighborGroup = Tuple[int, str, str]
+
+
+class StaleNeighborGroups:
+    """
+    The (target language, level, part of speech) groups whose confusable neighbors changed since they were
+    computed, because words were added to or deleted from them, and the lock that lets a single worker
+    recompute them.
+    """
+
+    groups_key = "neighbors:stale_groups"
+    refresh_lock_key = "neighbors:refresh_lock"
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    async def add(self, groups: Iterable[NeighborGroup]) -> None:
+        members = {f"{language_to_id}:{level}:{part_of_speech}" for language_to_id, level, part_of_speech in groups}
+        if members:
+            await self.redis.sadd(self.groups_key, *members)
+
+    async def pop_all(self) -> List[NeighborGroup]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.smembers(self.groups_key)
+            pipe.delete(self.groups_key)
+            members, _ = await pipe.execute()
+        groups = []
+        for member in sorted(members):
+            language_to_id, level, part_of_speech = member.decode().split(":", 2)
+            groups.append((int(language_to_id), level, part_of_speech))
+        return groups
+
+    async def acquire_refresh_lock(self) -> bool:
+        return bool(await self.redis.set(self.refresh_lock_key, 1, nx=True, ex=NEIGHBORS_REFRESH_INTERVAL))
+
+
+stale_neighbor_groups = StaleNeighborGroups(get_redis())
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+import uuid
+from typing import List, Optional
+
+from src.config import ANSWER_TOKEN_SECRET, ANSWER_TOKEN_TTL
+
+WORD_ANSWER = 1
+SENTENCE_ANSWER = 2
+
+
+class AnswerTokenService:
+    """
+    Signs the expected answer of a question into a compact token, so answers can be checked without a query.
+    Token layout: version, kind, issue time, expiry, question id, answer, followed by a truncated HMAC-SHA256
+    of all of it.
+    The answer is a keyed hash of the question id and the translation id or sentence, so the client holding
+    the token cannot read the answer from it. The secret must be shared by all workers.
+    """
+
+    version = 3
+    payload_format = ">BBII16s16s"
+    payload_size = struct.calcsize(payload_format)
+    signature_size = 16
+
+    def __init__(self, secret: bytes, ttl: int = ANSWER_TOKEN_TTL):
+        if not secret:
+            raise RuntimeError("ANSWER_TOKEN_SECRET is not set")
+        self.secret = secret
+        self.ttl = ttl
+
+    def sign_word_answer(self, word_id: uuid.UUID, translation_id: uuid.UUID, ttl: Optional[int] = None) -> str:
+        return self.sign(WORD_ANSWER, word_id, self.hash_answer(word_id, translation_id.bytes), ttl)
+
+    def verify_word_answer(self, token: str, word_id: uuid.UUID, user_word_id: uuid.UUID) -> Optional[bool]:
+        answer = self.verify(token, WORD_ANSWER, word_id)
+        if answer is None:
+            return None
+        return hmac.compare_digest(answer, self.hash_answer(word_id, user_word_id.bytes))
+
+    def sign_sentence_answer(self, sentence_id: uuid.UUID, tokens: List[str], ttl: Optional[int] = None) -> str:
+        return self.sign(SENTENCE_ANSWER, sentence_id, self.hash_answer(sentence_id, self.join_sentence(tokens)), ttl)
+
+    def verify_sentence_answer(self, token: str, sentence_id: uuid.UUID, user_words: List[str]) -> Optional[bool]:
+        answer = self.verify(token, SENTENCE_ANSWER, sentence_id)
+        if answer is None:
+            return None
+        return hmac.compare_digest(answer, self.hash_answer(sentence_id, self.join_sentence(user_words)))
+
+    def sign(self, kind: int, question_id: uuid.UUID, answer: bytes, ttl: Optional[int] = None) -> str:
+        issued_at = int(time.time())
+        expires_at = issued_at + (self.ttl if ttl is None else ttl)
+        payload = struct.pack(self.payload_format, self.version, kind, issued_at, expires_at, question_id.bytes,
+                              answer)
+        token = payload + self.get_signature(payload)
+        return base64.urlsafe_b64encode(token).rstrip(b"=").decode()
+
+    def verify(self, token: str, kind: int, question_id: uuid.UUID) -> Optional[bytes]:
+        payload = self.decode(token)
+        if payload is None:
+            return None
+        _, token_kind, _, expires_at, token_question_id, answer = payload
+        if token_kind != kind or token_question_id != question_id.bytes:
+            return None
+        if expires_at < time.time():
+            return None
+        return answer
+
+    def get_issued_at(self, token: str) -> Optional[int]:
+        """Issue time of the token, none for tokens living longer than the default ttl, which are shared by users."""
+        payload = self.decode(token)
+        if payload is None or payload[3] - payload[2] > self.ttl:
+            return None
+        return payload[2]
+
+    def decode(self, token: str) -> Optional[tuple]:
+        try:
+            data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except (binascii.Error, ValueError):
+            return None
+        if len(data) != self.payload_size + self.signature_size:
+            return None
+        payload, signature = data[:self.payload_size], data[self.payload_size:]
+        if not hmac.compare_digest(signature, self.get_signature(payload)):
+            return None
+        payload = struct.unpack(self.payload_format, payload)
+        return payload if payload[0] == self.version else None
+
+    def get_signature(self, payload: bytes) -> bytes:
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:self.signature_size]
+
+    def hash_answer(self, question_id: uuid.UUID, answer: bytes) -> bytes:
+        return hmac.new(self.secret, b"answer" + question_id.bytes + answer, hashlib.sha256).digest()[:16]
+
+    @staticmethod
+    def join_sentence(tokens: List[str]) -> bytes:
+        return " ".join(tokens).lower().encode()
+
+
+answer_tokens = AnswerTokenService((ANSWER_TOKEN_SECRET or "").encode())
@@ -1,12 +1,6 @@
 import random
 import string
-
-from src.models import Word
-
-
-def add_word_for_translate_to_other_words(other_words: list, word_for_translate: Word) -> list:
-    other_words.append(word_for_translate.translation)
-    return other_words
+from datetime import date, datetime, timezone
 
 
 def shuffle_random_words(other_words: list) -> list:
@@ -14,6 +8,45 @@ def shuffle_random_words(other_words: list) -> list:
     return other_words
 
 
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+
 def delete_punctuation(text: str) -> str:
-    new_text = text.translate(str.maketrans('', '', string.punctuation))
+    new_text = text.translate(PUNCTUATION_TABLE)
     return new_text
+
+
+def tokenize_sentence(text: str) -> list:
+    return delete_punctuation(text).split()
+
+
+def split_into_buckets(positions: list, bucket_sizes: dict) -> dict:
+    buckets = {}
+    for position in positions:
+        for bucket, size in sorted(bucket_sizes.items()):
+            if position < size:
+                buckets.setdefault(bucket, []).append(position)
+                break
+            position -= size
+    return buckets
+
+
+def split_into_rounds(items: list, size: int) -> list:
+    """
+    Rounds of exactly ``size`` distinct items: the last round is completed with random items of the others,
+    and no round is made when there are fewer than ``size`` items.
+    """
+    if len(items) < size:
+        return []
+    rounds = [items[index:index + size] for index in range(0, len(items), size)]
+    if len(rounds[-1]) < size:
+        rounds[-1] += random.sample(items[:-len(rounds[-1])], size - len(rounds[-1]))
+    return rounds
+
+
+def get_value(option):
+    return option.value if option is not None else None
+
+
+def get_today() -> date:
+    return datetime.now(timezone.utc).date()
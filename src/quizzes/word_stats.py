@@ -0,0 +1,71 @@
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis.asyncio as redis
+
+from src.config import WORD_STATS_ROLLUP_BATCH_SIZE
+from src.database import get_redis
+
+FIELDS = ("attempts", "correct", "latency_ms_total", "latency_count")
+
+
+class WordStatsCounter:
+    """
+    Per-word answer counters in Redis hashes, incremented in O(1) per answer. Words touched since the last
+    rollup are kept in a set; ``take`` drains a batch of them together with their counters.
+    """
+
+    dirty_key = "word_stats:dirty"
+
+    def __init__(self, redis_client: redis.Redis, batch_size: int = WORD_STATS_ROLLUP_BATCH_SIZE):
+        self.redis = redis_client
+        self.batch_size = batch_size
+
+    @staticmethod
+    def get_key(word_id: uuid.UUID) -> str:
+        return f"word_stats:{word_id}"
+
+    async def record(self, word_id: uuid.UUID, correct: bool, latency_ms: Optional[int] = None) -> None:
+        await self.record_many([(word_id, correct, latency_ms)])
+
+    async def record_many(self, answers: Iterable[Tuple[uuid.UUID, bool, Optional[int]]]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for word_id, correct, latency_ms in answers:
+                key = self.get_key(word_id)
+                pipe.hincrby(key, "attempts", 1)
+                if correct:
+                    pipe.hincrby(key, "correct", 1)
+                if latency_ms is not None:
+                    pipe.hincrby(key, "latency_ms_total", latency_ms)
+                    pipe.hincrby(key, "latency_count", 1)
+                pipe.sadd(self.dirty_key, str(word_id))
+            await pipe.execute()
+
+    async def take(self) -> Dict[uuid.UUID, Dict[str, int]]:
+        word_ids = await self.redis.spop(self.dirty_key, self.batch_size)
+        if not word_ids:
+            return {}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for word_id in word_ids:
+                key = self.get_key(word_id.decode())
+                pipe.hgetall(key)
+                pipe.delete(key)
+            results = await pipe.execute()
+        counters = {}
+        for word_id, values in zip(word_ids, results[::2]):
+            if values:
+                counters[uuid.UUID(word_id.decode())] = {field: int(values.get(field.encode(), 0)) for field in FIELDS}
+        return counters
+
+    async def restore(self, counters: Dict[uuid.UUID, Dict[str, int]]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for word_id, values in counters.items():
+                key = self.get_key(word_id)
+                for field, value in values.items():
+                    if value:
+                        pipe.hincrby(key, field, value)
+                pipe.sadd(self.dirty_key, str(word_id))
+            await pipe.execute()
+
+
+word_stats_counter = WordStatsCounter(get_redis())
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.competitions.service import WebSocketManager
 from src.constants import levels
 from src.models import User
+from src.quizzes.service import DeckService
 from src.users.query import get_user_by_telegram_id, get_user_data, get_users_list, get_online_users, \
     get_user_by_username, get_users_count, get_online_users_count
 from src.users.schemas import UserCreate, UserInfo, UserUpdate, UsersSchema
@@ -37,6 +38,7 @@ class UserService:
             user.learning_language_to_id = user_data.learning_language_to_id.value
             user.learning_language_from_id = user_data.learning_language_from_id.value
             await commit_changes_or_rollback(session, message="Ошибка при обновлении данных")
+            await DeckService.invalidate(user.telegram_id)
             return {"message": "Данные успешно обновлены"}
 
     async def get_users(self, page: int, size: int):
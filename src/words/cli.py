@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import os
+
+from src.database import async_session_maker
+from src.words.importer import FILE_EXTENSIONS, IMPORT_FORMATS, iter_lines, read_file
+from src.words.schemas import ImportReport, SentenceImportReport, WordImportReport
+from src.words.service import SentenceImportManager, WordImportManager
+
+
+def print_progress(report: ImportReport) -> None:
+    counts = report.model_dump(exclude={"errors", "processed"})
+    print(f"Processed {report.processed}: " + ", ".join(f"{name.replace('_', ' ')} {value}"
+                                                        for name, value in counts.items()), flush=True)
+
+
+async def import_words(path: str, import_format: str, merge: bool = False) -> WordImportReport:
+    async with async_session_maker() as session:
+        return await WordImportManager(session).import_words(
+            iter_lines(read_file(path)), import_format, merge, on_progress=print_progress
+        )
+
+
+async def import_sentences(path: str, import_format: str, checkpoint: str = None,
+                           defaults: dict = None) -> SentenceImportReport:
+    async with async_session_maker() as session:
+        return await SentenceImportManager(session).import_sentences(
+            iter_lines(read_file(path)), import_format, checkpoint, defaults, on_progress=print_progress
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vocabulary import commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    words = commands.add_parser("words", help="Import words with their translations from a CSV or NDJSON file")
+    words.add_argument("path", help="File with a header row of WordSchema fields, or one JSON object per line")
+    words.add_argument("--merge", action="store_true", help="Replace translations of words that already exist")
+    sentences = commands.add_parser("sentences", help="Import sentence pairs from a TSV or NDJSON parallel corpus")
+    sentences.add_argument("path", help="File with a header row of SentenceSchema fields, or one JSON object per line")
+    sentences.add_argument("--checkpoint", help="Name under which progress is saved, to resume an interrupted import")
+    sentences.add_argument("--from-language", type=int, help="Source language id of records without one")
+    sentences.add_argument("--to-language", type=int, help="Target language id of records without one")
+    sentences.add_argument("--level", help="Level of records without one")
+    for command in (words, sentences):
+        command.add_argument("--format", choices=sorted(set(IMPORT_FORMATS.values())),
+                             help="Format of the file, guessed from its extension by default")
+    args = parser.parse_args()
+
+    import_format = args.format or FILE_EXTENSIONS.get(os.path.splitext(args.path)[1].lower())
+    if import_format is None:
+        parser.error("cannot guess the format of the file, pass --format")
+    if args.command == "words":
+        report = asyncio.run(import_words(args.path, import_format, args.merge))
+    else:
+        defaults = {"translation_from_language": args.from_language, "translation_to_language": args.to_language,
+                    "level": args.level}
+        report = asyncio.run(import_sentences(args.path, import_format, args.checkpoint,
+                                              {field: value for field, value in defaults.items() if value}))
+    for error in report.errors:
+        print(f"Line {error.line}: {error.detail}")
+    print_progress(report)
+
+
+if __name__ == "__main__":
+    main()
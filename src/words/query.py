@@ -1,16 +1,185 @@
-from sqlalchemy import select, distinct
+from typing import List
+
+from sqlalchemy import and_, select, distinct, func, text
+from sqlalchemy.dialects.postgresql import insert as upsert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import Language, Word
+from src.cache import cached
+from src.models import ImportCheckpoint, Language, Word, WordStat
+
+LANGUAGES_CACHE = "languages"
+PARTS_OF_SPEECH_CACHE = "parts_of_speech"
 
 
+@cached(LANGUAGES_CACHE)
 async def get_available_languages(session: AsyncSession):
     query = await session.execute(select(Language))
     languages = query.scalars().all()
-    return languages
+    return [{"language": language.language, "id": language.id} for language in languages]
 
 
+@cached(PARTS_OF_SPEECH_CACHE)
 async def get_available_part_of_speech(session: AsyncSession):
     query = await session.execute(select(distinct(Word.part_of_speech)))
     available_part_of_speech = query.scalars().all()
     return [w for w in available_part_of_speech]
+
+
+async def get_hardest_words(session: AsyncSession, language_id: int, limit: int, min_attempts: int):
+    accuracy = (WordStat.correct + 1.0) / (WordStat.attempts + 2.0)
+    average_latency_ms = WordStat.latency_ms_total / func.nullif(WordStat.latency_count, 0)
+    query = (select(Word.id, Word.name, Word.level, WordStat.attempts, WordStat.correct,
+                    accuracy.label("accuracy"), average_latency_ms.label("average_latency_ms"))
+             .join(WordStat, WordStat.word_id == Word.id)
+             .where(and_(Word.language_id == language_id, WordStat.attempts >= min_attempts))
+             .order_by(accuracy, WordStat.attempts.desc())
+             .limit(limit))
+    result = await session.execute(query)
+    return result.all()
+
+
+WORD_IMPORT_COLUMNS = ["position", "language_from_id", "language_to_id", "level", "part_of_speech", "word_name",
+                       "translation_name"]
+WORD_IMPORT_MATCH = ("words.language_id = word_imports.language_from_id AND words.name = word_imports.word_name "
+                     "AND words.part_of_speech = word_imports.part_of_speech")
+
+
+async def create_word_imports_table(session: AsyncSession) -> None:
+    await session.execute(text(
+        "CREATE TEMPORARY TABLE IF NOT EXISTS word_imports (position integer PRIMARY KEY, "
+        "language_from_id integer NOT NULL, language_to_id integer NOT NULL, level varchar NOT NULL, "
+        "part_of_speech varchar NOT NULL, word_name varchar NOT NULL, translation_name varchar NOT NULL, "
+        "word_id uuid NOT NULL DEFAULT gen_random_uuid(), existing_word_id uuid, ordinal integer, "
+        "bucket_ordinal integer, translation_ordinal integer) ON COMMIT DELETE ROWS"
+    ))
+
+
+async def analyze_word_imports(session: AsyncSession) -> None:
+    """Gives the planner statistics of the staged chunk, which temporary tables never get from autovacuum."""
+    await session.execute(text("ANALYZE word_imports"))
+
+
+async def delete_word_imports_with_unknown_languages(session: AsyncSession) -> List[int]:
+    result = await session.execute(text(
+        "DELETE FROM word_imports WHERE NOT EXISTS (SELECT FROM languages WHERE id = language_from_id) "
+        "OR NOT EXISTS (SELECT FROM languages WHERE id = language_to_id) RETURNING position"
+    ))
+    return sorted(result.scalars().all())
+
+
+async def delete_duplicate_word_imports(session: AsyncSession) -> None:
+    """Keeps the first row of every word repeated inside the staged chunk."""
+    await session.execute(text(
+        "DELETE FROM word_imports USING word_imports AS first_imports "
+        "WHERE word_imports.language_from_id = first_imports.language_from_id "
+        "AND word_imports.word_name = first_imports.word_name "
+        "AND word_imports.part_of_speech = first_imports.part_of_speech "
+        "AND word_imports.position > first_imports.position"
+    ))
+
+
+async def get_word_import_partitions(session: AsyncSession):
+    result = await session.execute(text(
+        "SELECT DISTINCT language_from_id, language_to_id, level, part_of_speech FROM word_imports"
+    ))
+    return result.all()
+
+
+async def find_existing_word_imports(session: AsyncSession) -> None:
+    """
+    Looks up the staged words that already exist with one index probe per row. A join would hash the
+    whole ``words`` table for every chunk.
+    """
+    await session.execute(text(
+        f"UPDATE word_imports SET existing_word_id = (SELECT id FROM words WHERE {WORD_IMPORT_MATCH} LIMIT 1)"
+    ))
+
+
+async def merge_word_imports(session: AsyncSession) -> int:
+    """Replaces the translations of staged words that already exist, returning the number of changed ones."""
+    result = await session.execute(text(
+        "UPDATE translation_words SET name = word_imports.translation_name FROM word_imports "
+        "WHERE translation_words.word_id = word_imports.existing_word_id "
+        "AND translation_words.to_language_id = word_imports.language_to_id "
+        "AND translation_words.name <> word_imports.translation_name"
+    ))
+    return result.rowcount
+
+
+async def delete_merged_word_import_neighbors(session: AsyncSession) -> None:
+    """Drops the neighbor lists of the translations about to be merged, so the refresh recomputes them by name."""
+    await session.execute(text(
+        "DELETE FROM translation_word_neighbors USING translation_words, word_imports "
+        "WHERE translation_word_neighbors.translation_word_id = translation_words.id "
+        "AND translation_words.word_id = word_imports.existing_word_id "
+        "AND translation_words.to_language_id = word_imports.language_to_id "
+        "AND translation_words.name <> word_imports.translation_name"
+    ))
+
+
+async def delete_existing_word_imports(session: AsyncSession) -> None:
+    await session.execute(text("DELETE FROM word_imports WHERE existing_word_id IS NOT NULL"))
+
+
+async def number_word_imports(session: AsyncSession) -> None:
+    """
+    Gives the staged rows the next dense ordinals of their partitions, which must be locked beforehand.
+    The next ordinal is looked up once per partition, and before the insert, so the backward index scans
+    behind ``max`` do not walk over rows the insert itself added.
+    """
+    await session.execute(text(
+        "UPDATE word_imports SET ordinal = numbered.ordinal, bucket_ordinal = numbered.bucket_ordinal, "
+        "translation_ordinal = numbered.translation_ordinal FROM ("
+        "  SELECT position,"
+        "    word_starts.start + row_number() OVER (PARTITION BY language_from_id ORDER BY position) - 1"
+        "      AS ordinal,"
+        "    bucket_starts.start + row_number() OVER (PARTITION BY language_from_id, level, part_of_speech"
+        "      ORDER BY position) - 1 AS bucket_ordinal,"
+        "    translation_starts.start + row_number() OVER (PARTITION BY language_to_id ORDER BY position) - 1"
+        "      AS translation_ordinal"
+        "  FROM word_imports"
+        "  JOIN (SELECT language_from_id, (SELECT coalesce(max(ordinal) + 1, 0) FROM words"
+        "    WHERE language_id = language_from_id) AS start"
+        "    FROM word_imports GROUP BY language_from_id) AS word_starts USING (language_from_id)"
+        "  JOIN (SELECT language_from_id, level, part_of_speech, (SELECT coalesce(max(bucket_ordinal) + 1, 0)"
+        "    FROM words WHERE language_id = language_from_id AND words.level = word_imports.level"
+        "    AND words.part_of_speech = word_imports.part_of_speech) AS start"
+        "    FROM word_imports GROUP BY language_from_id, level, part_of_speech) AS bucket_starts"
+        "    USING (language_from_id, level, part_of_speech)"
+        "  JOIN (SELECT language_to_id, (SELECT coalesce(max(ordinal) + 1, 0) FROM translation_words"
+        "    WHERE to_language_id = language_to_id) AS start"
+        "    FROM word_imports GROUP BY language_to_id) AS translation_starts USING (language_to_id)"
+        ") AS numbered WHERE word_imports.position = numbered.position"
+    ))
+
+
+async def insert_word_imports(session: AsyncSession) -> int:
+    """Inserts the staged words and their translations, both keyed by the word ids generated in staging."""
+    result = await session.execute(text(
+        "INSERT INTO words (id, name, language_id, part_of_speech, level, ordinal, bucket_ordinal) "
+        "SELECT word_id, word_name, language_from_id, part_of_speech, level, ordinal, bucket_ordinal "
+        "FROM word_imports"
+    ))
+    await session.execute(text(
+        "INSERT INTO translation_words (word_id, from_language_id, to_language_id, name, ordinal) "
+        "SELECT word_id, language_from_id, language_to_id, translation_name, translation_ordinal FROM word_imports"
+    ))
+    return result.rowcount
+
+
+SENTENCE_COLUMNS = ["id", "name", "level", "language_id", "ordinal", "bucket_ordinal"]
+TRANSLATION_SENTENCE_COLUMNS = ["id", "name", "sentence_id", "from_language_id", "to_language_id", "tokens"]
+
+
+async def get_import_checkpoint(session: AsyncSession, name: str) -> int:
+    line = await session.scalar(select(ImportCheckpoint.line).where(ImportCheckpoint.name == name))
+    return line or 0
+
+
+async def save_import_checkpoint(session: AsyncSession, name: str, line: int) -> None:
+    query = upsert(ImportCheckpoint).values(name=name, line=line)
+    query = query.on_conflict_do_update(
+        index_elements=[ImportCheckpoint.name],
+        set_={"line": query.excluded.line, "updated_at": func.now()}
+    )
+    await session.execute(query)
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.dependencies import get_redis_connect
+from src.cache import CacheStats, cache
 from src.database import get_async_session
 from src.dependencies import check_hash
 from src.quizzes.schemas import UserFavoriteWord
-from src.words.schemas import WordSchema, SentenceSchema
+from src.words.importer import IMPORT_FORMATS, iter_lines
+from src.words.schemas import HardWordInfo, SentenceImportReport, WordImportReport, WordSchema, SentenceSchema
 from src.words.service import (FavoriteWordManager,
+                               SentenceImportManager,
                                SentenceManager,
-                               WordManager, CacheRedisService)
+                               WordImportManager,
+                               WordManager)
 
 router = APIRouter(
     prefix="/words",
@@ -26,6 +32,46 @@ async def add_word(
     return await word_service.add_word(word_data)
 
 
+def get_import_format(request: Request) -> str:
+    import_format = IMPORT_FORMATS.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if import_format is None:
+        raise HTTPException(status_code=415, detail="Неподдерживаемый формат файла")
+    return import_format
+
+
+@router.post("/import", response_model=WordImportReport)
+async def import_words(
+        request: Request,
+        merge: bool = False,
+        init_data: str = Depends(check_hash),
+        session: AsyncSession = Depends(get_async_session)
+):
+    word_import_service = WordImportManager(session)
+    return await word_import_service.import_words(iter_lines(request.stream()), get_import_format(request), merge)
+
+
+@router.delete("/word")
+async def delete_word(
+        word_id: uuid.UUID,
+        init_data: str = Depends(check_hash),
+        session: AsyncSession = Depends(get_async_session)
+):
+    word_service = WordManager(session)
+    return await word_service.delete_word(word_id)
+
+
+@router.get("/hardest-words", response_model=List[HardWordInfo])
+async def get_hardest_words(
+        language_id: int,
+        limit: int = Query(default=50, ge=1, le=500),
+        min_attempts: int = Query(default=10, ge=1),
+        init_data: str = Depends(check_hash),
+        session: AsyncSession = Depends(get_async_session)
+):
+    word_service = WordManager(session)
+    return await word_service.get_hardest_words(language_id, limit, min_attempts)
+
+
 @router.post("/add-sentence")
 async def add_sentence(sentence_data: SentenceSchema, session: AsyncSession = Depends(get_async_session)
 ):
@@ -33,6 +79,25 @@ async def add_sentence(sentence_data: SentenceSchema, session: AsyncSession = De
     return await sentence_service.add_sentence(sentence_data)
 
 
+@router.post("/import-sentences", response_model=SentenceImportReport)
+async def import_sentences(
+        request: Request,
+        checkpoint: Optional[str] = None,
+        translation_from_language: Optional[int] = None,
+        translation_to_language: Optional[int] = None,
+        level: Optional[str] = None,
+        init_data: str = Depends(check_hash),
+        session: AsyncSession = Depends(get_async_session)
+):
+    defaults = {"translation_from_language": translation_from_language,
+                "translation_to_language": translation_to_language, "level": level}
+    sentence_import_service = SentenceImportManager(session)
+    return await sentence_import_service.import_sentences(
+        iter_lines(request.stream()), get_import_format(request), checkpoint,
+        {field: value for field, value in defaults.items() if value is not None}
+    )
+
+
 @router.post("/favorite-word")
 async def add_favorite_word(data: UserFavoriteWord, session: AsyncSession = Depends(get_async_session)):
     favorite_word_service = FavoriteWordManager(session)
@@ -47,18 +112,21 @@ async def delete_favorite_word(data: UserFavoriteWord, session: AsyncSession = D
 
 @router.get("/check-available-language")
 async def check_available_language(
-        session: AsyncSession = Depends(get_async_session),
-        cache_service: CacheRedisService = Depends(get_redis_connect)
+        session: AsyncSession = Depends(get_async_session)
 ):
     word_manager = WordManager(session)
-    available_languages = await word_manager.get_languages(cache_service)
+    available_languages = await word_manager.get_languages()
     return available_languages
 
 
 @router.get("/check-available-part-of-speech")
 async def check_available_part_of_speech(
-        session: AsyncSession = Depends(get_async_session),
-        cache_service: CacheRedisService = Depends(get_redis_connect)
+        session: AsyncSession = Depends(get_async_session)
 ):
     word_manager = WordManager(session)
-    return await word_manager.get_parts_of_speech(cache_service)
+    return await word_manager.get_parts_of_speech()
+
+
+@router.get("/cache/stats", response_model=Dict[str, CacheStats])
+async def get_cache_stats():
+    return cache.get_stats()
@@ -1,4 +1,5 @@
 import uuid
+from typing import List, Optional
 
 from pydantic import BaseModel, model_validator, UUID4, ConfigDict
 from src.constants import AvailableLanguages
@@ -49,3 +50,36 @@ class WordInfo(BaseModel):
 class SentenceInfo(BaseModel):
     id: UUID4
     name: str
+
+
+class HardWordInfo(BaseModel):
+    id: UUID4
+    name: str
+    level: str
+    attempts: int
+    correct: int
+    accuracy: float
+    average_latency_ms: Optional[int]
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportReport(BaseModel):
+    processed: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    errors: List[ImportRowError] = []
+
+
+class WordImportReport(ImportReport):
+    merged: int = 0
+    skipped: int = 0
+
+
+class SentenceImportReport(ImportReport):
+    resumed_from: int = 0
+    last_line: int = 0
@@ -1,33 +1,38 @@
-import json
+import logging
+import uuid
+from typing import AsyncIterable, Callable, List, Optional
 
-import redis
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import cache
+from src.config import IMPORT_MAX_ERRORS, SENTENCE_IMPORT_CHUNK_SIZE, WORD_IMPORT_CHUNK_SIZE
 from src.models import (FavoriteWord, Sentence, TranslationSentence,
                         TranslationWord, Word)
-from src.quizzes.query import get_user_favorite_word, get_user_favorite_words
+from src.quizzes.pools import distractor_pool, question_candidates, token_vocabulary
+from src.quizzes.query import (SENTENCE_ANSWERS_CACHE, add_user_favorite_word, get_favorite_word_telegram_ids,
+                               get_translation_words, get_user_favorite_word)
+from src.quizzes.sampler import (sentence_bucket_sampler, sentence_sampler, translation_word_sampler,
+                                  word_bucket_sampler, word_sampler)
 from src.quizzes.schemas import UserFavoriteWord
-from src.users.query import get_user_by_telegram_id
+from src.quizzes.service import FavoriteWordService, NeighborService, ReviewService
+from src.quizzes.snapshot import VOCABULARY_VERSION
+from src.quizzes.utils import tokenize_sentence
 from src.utils import commit_changes_or_rollback
-from src.words.query import get_available_part_of_speech, get_available_languages
-from src.words.schemas import WordSchema, SentenceSchema
+from src.words.importer import ImportRecord, copy_records, generate_ids, iter_chunks, iter_records
+from src.words.query import (PARTS_OF_SPEECH_CACHE, SENTENCE_COLUMNS, TRANSLATION_SENTENCE_COLUMNS, WORD_IMPORT_COLUMNS,
+                             analyze_word_imports, create_word_imports_table, delete_duplicate_word_imports,
+                             delete_existing_word_imports, delete_merged_word_import_neighbors,
+                             delete_word_imports_with_unknown_languages, find_existing_word_imports,
+                             get_available_part_of_speech, get_available_languages,
+                             get_hardest_words, get_import_checkpoint, get_word_import_partitions,
+                             insert_word_imports, merge_word_imports, number_word_imports, save_import_checkpoint)
+from src.words.schemas import (HardWordInfo, ImportReport, ImportRowError, SentenceImportReport, WordImportReport,
+                               WordSchema, SentenceSchema)
 
-
-class CacheRedisService:
-
-    def __init__(self, redis_client: redis.Redis):
-        self.redis = redis_client
-
-    async def get_cached_value(self, key: str):
-        value = await self.redis.get(key)
-        if value:
-            await self.redis.delete(key)
-            return json.loads(value)
-        return None
-
-    async def set_cached_value(self, key: str, data, expire: int = 3600):
-        await self.redis.set(key, json.dumps(data), ex=expire)
+logger = logging.getLogger(__name__)
 
 
 class BaseManager:
@@ -45,6 +50,8 @@ class WordManager(BaseManager):
                 part_of_speech=word_data.part_of_speech.name,
                 level=word_data.level.upper()
             )
+            await word_sampler.assign(session, new_word)
+            await word_bucket_sampler.assign(session, new_word)
 
             session.add(new_word)
             await session.flush()
@@ -55,52 +62,280 @@ class WordManager(BaseManager):
                 from_language_id=word_data.translation_from_language.value,
                 word_id=new_word.id
             )
+            await translation_word_sampler.assign(session, new_translation_word)
             session.add(new_translation_word)
             await commit_changes_or_rollback(session, "Ошибка при добавлении слова")
+            await cache.invalidate(PARTS_OF_SPEECH_CACHE, VOCABULARY_VERSION)
+            await NeighborService.mark_stale([(new_translation_word.to_language_id, new_word.level,
+                                               new_word.part_of_speech)])
+            await distractor_pool.add(new_translation_word)
+            await token_vocabulary.add(new_translation_word.to_language_id, [new_translation_word.name])
+            await question_candidates.invalidate((new_translation_word.from_language_id,
+                                                  new_translation_word.to_language_id))
             return {"message": "Слово успешно добавлено"}
 
-    async def get_parts_of_speech(self, cache_service: CacheRedisService):
-        parts_of_speech = await cache_service.get_cached_value("parts_of_speech")
-        if parts_of_speech:
-            return parts_of_speech
+    async def delete_word(self, word_id: uuid.UUID):
         async with self.session as session:
-            parts_of_speech = await get_available_part_of_speech(session)
-            await cache_service.set_cached_value(
-                "parts_of_speech", [part for part in parts_of_speech], 3600
-            )
-            return parts_of_speech
+            word = await session.get(Word, word_id)
+            if word is None:
+                raise HTTPException(status_code=404, detail="Слово не найдено")
+
+            translation_word = await get_translation_words(session, word.id)
+            # Same lock order as add_word and the importer, then reread the ordinals a concurrent delete may move.
+            await word_sampler.lock_partition(session, word_sampler.get_partition(word))
+            await word_bucket_sampler.lock_partition(session, word_bucket_sampler.get_partition(word))
+            if translation_word:
+                await translation_word_sampler.lock_partition(
+                    session, translation_word_sampler.get_partition(translation_word)
+                )
+                await session.refresh(translation_word)
+            await session.refresh(word)
+            favorite_telegram_ids = await get_favorite_word_telegram_ids(session, word.id)
+            await session.execute(delete(FavoriteWord).where(FavoriteWord.word_id == word.id))
+            if translation_word:
+                await translation_word_sampler.delete(session, translation_word)
+            await word_sampler.delete(session, word, word_bucket_sampler)
+            await commit_changes_or_rollback(session, "Ошибка при удалении слова")
+            await cache.invalidate(PARTS_OF_SPEECH_CACHE, VOCABULARY_VERSION)
+            if translation_word:
+                await NeighborService.mark_stale([(translation_word.to_language_id, word.level, word.part_of_speech)])
+                await distractor_pool.invalidate(translation_word.to_language_id)
+                await question_candidates.invalidate((translation_word.from_language_id,
+                                                      translation_word.to_language_id))
+            for telegram_id in favorite_telegram_ids:
+                await FavoriteWordService.remove_from_index(telegram_id, word.id)
+                await ReviewService.remove(telegram_id, word.id)
+            return {"message": "Слово было удалено"}
+
+    async def get_hardest_words(self, language_id: int, limit: int, min_attempts: int) -> List[HardWordInfo]:
+        async with self.session as session:
+            words = await get_hardest_words(session, language_id, limit, min_attempts)
+            return [HardWordInfo.model_validate(word) for word in words]
 
-    async def get_languages(self, cache_service: CacheRedisService):
-        languages = await cache_service.get_cached_value("languages")
-        if languages:
-            return languages
+    async def get_parts_of_speech(self):
         async with self.session as session:
-            languages = await get_available_languages(session)
-            languages_data = [{"language": language.language, "id": language.id} for language in languages]
-            await cache_service.set_cached_value("languages", languages_data, 3600)
-            return languages
+            return await get_available_part_of_speech(session)
 
+    async def get_languages(self):
+        async with self.session as session:
+            return await get_available_languages(session)
 
-class FavoriteWordManager(BaseManager):
 
-    async def add_favorite_word(self, data: UserFavoriteWord):
+class ImportManager(BaseManager):
+    """Validation and error reporting shared by the bulk importers, which process their input in chunks."""
+
+    LANGUAGE_FIELDS = ("translation_from_language", "translation_to_language")
+
+    def __init__(self, session: AsyncSession, chunk_size: int, max_errors: int = IMPORT_MAX_ERRORS):
+        super().__init__(session)
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def add_error(self, report: ImportReport, line: int, detail: str) -> None:
+        report.invalid += 1
+        if len(report.errors) < self.max_errors:
+            report.errors.append(ImportRowError(line=line, detail=detail))
+
+    def validate(self, schema, record: ImportRecord, report: ImportReport, defaults: Optional[dict] = None):
+        if record.error is not None:
+            self.add_error(report, record.line, record.error)
+            return None
+        fields = {**defaults, **record.fields} if defaults else dict(record.fields)
+        for field in self.LANGUAGE_FIELDS:
+            if isinstance(fields.get(field), str) and fields[field].strip().isdigit():
+                fields[field] = int(fields[field])
+        try:
+            return schema.model_validate(fields)
+        except ValidationError as error:
+            self.add_error(report, record.line, error.errors()[0]["msg"])
+        except KeyError as error:
+            self.add_error(report, record.line, f"Отсутствует поле {error.args[0]}")
+        return None
+
+
+class WordImportManager(ImportManager):
+    """
+    Loads words with their translations from a stream of CSV or NDJSON records in chunks: every chunk is
+    validated against ``WordSchema``, copied into a temporary staging table and inserted with set-based
+    statements in its own transaction, so memory stays flat whatever the size of the file.
+    Words that already exist are skipped, or with ``merge`` get the imported translation.
+    """
+
+    def __init__(self, session: AsyncSession, chunk_size: int = WORD_IMPORT_CHUNK_SIZE,
+                 max_errors: int = IMPORT_MAX_ERRORS):
+        super().__init__(session, chunk_size, max_errors)
+
+    def get_row(self, record: ImportRecord, report: WordImportReport) -> Optional[tuple]:
+        word = self.validate(WordSchema, record, report)
+        if word is None:
+            return None
+        return (record.line, word.translation_from_language.value, word.translation_to_language.value,
+                word.level.value, word.part_of_speech.name, word.word_to_translate, word.translation_word)
+
+    async def import_chunk(self, session: AsyncSession, rows: List[tuple], merge: bool,
+                           report: WordImportReport) -> set:
+        await create_word_imports_table(session)
+        await copy_records(session, "word_imports", WORD_IMPORT_COLUMNS, rows)
+        await analyze_word_imports(session)
+        for line in await delete_word_imports_with_unknown_languages(session):
+            self.add_error(report, line, "Язык не найден")
+        partitions = await get_word_import_partitions(session)
+        for language_id in sorted({partition.language_from_id for partition in partitions}):
+            await word_sampler.lock_partition(session, language_id)
+        for language_id, level, part_of_speech in sorted({(partition.language_from_id, partition.level,
+                                                          partition.part_of_speech) for partition in partitions}):
+            await word_bucket_sampler.lock_partition(session, (language_id, level, part_of_speech))
+        for language_id in sorted({partition.language_to_id for partition in partitions}):
+            await translation_word_sampler.lock_partition(session, language_id)
+        await delete_duplicate_word_imports(session)
+        await find_existing_word_imports(session)
+        merged = 0
+        if merge:
+            await delete_merged_word_import_neighbors(session)
+            merged = await merge_word_imports(session)
+        await delete_existing_word_imports(session)
+        await number_word_imports(session)
+        inserted = await insert_word_imports(session)
+        await commit_changes_or_rollback(session, "Ошибка при импорте слов")
+        report.inserted += inserted
+        report.merged += merged
+        return {tuple(partition) for partition in partitions}
+
+    async def import_words(self, lines: AsyncIterable[str], import_format: str, merge: bool = False,
+                           on_progress: Optional[Callable[[WordImportReport], None]] = None) -> WordImportReport:
+        report = WordImportReport()
+        partitions = set()
         async with self.session as session:
-            user = await get_user_by_telegram_id(session, data.telegram_id)
-            word = await session.get(Word, data.word_id)
-            if word is None:
-                raise HTTPException(status_code=404, detail="Слово не найдено")
+            async for records in iter_chunks(iter_records(lines, import_format), self.chunk_size):
+                rows = [row for row in (self.get_row(record, report) for record in records) if row is not None]
+                if rows:
+                    partitions |= await self.import_chunk(session, rows, merge, report)
+                report.processed += len(records)
+                report.skipped = report.processed - report.inserted - report.merged - report.invalid
+                logger.info("Imported %s of %s processed word(s)", report.inserted, report.processed)
+                if on_progress is not None:
+                    on_progress(report)
+        language_pairs = {(language_from_id, language_to_id) for language_from_id, language_to_id, _, _ in partitions}
+        if language_pairs:
+            await cache.invalidate(PARTS_OF_SPEECH_CACHE, VOCABULARY_VERSION)
+            await NeighborService.mark_stale({(language_to_id, level, part_of_speech)
+                                              for _, language_to_id, level, part_of_speech in partitions})
+        for language_from_id, language_to_id in language_pairs:
+            await distractor_pool.invalidate(language_to_id)
+            await token_vocabulary.invalidate(language_to_id)
+            await question_candidates.invalidate((language_from_id, language_to_id))
+        return report
+
+
+class SentenceImportManager(ImportManager):
+    """
+    Loads sentence pairs of a parallel corpus from a stream of TSV or NDJSON records. Every chunk gets its ids
+    and ordinals in the application, its translation tokens precomputed, and is written to both tables with
+    ``COPY`` in one transaction. Under a ``checkpoint`` name the last committed line is saved in the same
+    transaction, and an interrupted import started again with that name continues after it.
+    Fields missing from the records, such as the languages of a two-column corpus, are taken from ``defaults``.
+    """
+
+    def __init__(self, session: AsyncSession, chunk_size: int = SENTENCE_IMPORT_CHUNK_SIZE,
+                 max_errors: int = IMPORT_MAX_ERRORS):
+        super().__init__(session, chunk_size, max_errors)
+
+    @staticmethod
+    async def get_next_ordinals(session: AsyncSession, sampler, partitions: set) -> dict:
+        next_ordinals = {}
+        for partition in sorted(partitions):
+            await sampler.lock_partition(session, partition)
+            next_ordinals[partition] = await sampler.get_size(session, partition)
+        return next_ordinals
+
+    def prepare_chunk(self, records: List[ImportRecord], report: SentenceImportReport, defaults: Optional[dict],
+                      language_ids: set) -> List[tuple]:
+        """Valid sentences of a chunk with the tokens of their translations."""
+        sentences = []
+        for record in records:
+            sentence = self.validate(SentenceSchema, record, report, defaults)
+            if sentence is None:
+                continue
+            if not {sentence.translation_from_language.value, sentence.translation_to_language.value} <= language_ids:
+                self.add_error(report, record.line, "Язык не найден")
+                continue
+            sentences.append((sentence, tokenize_sentence(sentence.translation_sentence)))
+        return sentences
 
-            new_favorite_word_is_exists = await get_user_favorite_words(session, word.id, user.id)
+    async def import_chunk(self, session: AsyncSession, sentences: List[tuple]) -> None:
+        next_ordinals = await self.get_next_ordinals(
+            session, sentence_sampler, {sentence.translation_from_language.value for sentence, _ in sentences}
+        )
+        next_bucket_ordinals = await self.get_next_ordinals(
+            session, sentence_bucket_sampler,
+            {(sentence.translation_from_language.value, sentence.level.value) for sentence, _ in sentences}
+        )
+        ids = generate_ids(2 * len(sentences))
+        sentence_rows, translation_rows = [], []
+        for (sentence, tokens), sentence_id, translation_id in zip(sentences, ids[::2], ids[1::2]):
+            language_from_id = sentence.translation_from_language.value
+            bucket = (language_from_id, sentence.level.value)
+            sentence_rows.append((sentence_id, sentence.sentence_to_translate, sentence.level.value,
+                                  language_from_id, next_ordinals[language_from_id], next_bucket_ordinals[bucket]))
+            translation_rows.append((translation_id, sentence.translation_sentence, sentence_id, language_from_id,
+                                     sentence.translation_to_language.value, tokens))
+            next_ordinals[language_from_id] += 1
+            next_bucket_ordinals[bucket] += 1
+        await copy_records(session, "sentences", SENTENCE_COLUMNS, sentence_rows)
+        await copy_records(session, "translation_sentences", TRANSLATION_SENTENCE_COLUMNS, translation_rows)
 
-            if new_favorite_word_is_exists:
+    async def write_chunk(self, session: AsyncSession, sentences: List[tuple], last_line: int,
+                          checkpoint: Optional[str]) -> None:
+        if sentences:
+            await self.import_chunk(session, sentences)
+        if checkpoint is not None:
+            await save_import_checkpoint(session, checkpoint, last_line)
+        await commit_changes_or_rollback(session, "Ошибка при импорте предложений")
+
+    async def import_sentences(self, lines: AsyncIterable[str], import_format: str, checkpoint: Optional[str] = None,
+                               defaults: Optional[dict] = None,
+                               on_progress: Optional[Callable[[SentenceImportReport], None]] = None
+                               ) -> SentenceImportReport:
+        report = SentenceImportReport()
+        language_to_ids = set()
+        async with self.session as session:
+            language_ids = {language["id"] for language in await get_available_languages(session)}
+            if checkpoint is not None:
+                report.resumed_from = report.last_line = await get_import_checkpoint(session, checkpoint)
+            async for records in iter_chunks(iter_records(lines, import_format), self.chunk_size):
+                records = [record for record in records if record.line > report.resumed_from]
+                if not records:
+                    continue
+                sentences = self.prepare_chunk(records, report, defaults, language_ids)
+                await self.write_chunk(session, sentences, records[-1].line, checkpoint)
+                language_to_ids |= {sentence.translation_to_language.value for sentence, _ in sentences}
+                report.processed += len(records)
+                report.inserted += len(sentences)
+                report.last_line = records[-1].line
+                logger.info("Imported %s of %s processed sentence(s)", report.inserted, report.processed)
+                if on_progress is not None:
+                    on_progress(report)
+        if language_to_ids:
+            await cache.invalidate(SENTENCE_ANSWERS_CACHE)
+        for language_to_id in language_to_ids:
+            await token_vocabulary.invalidate(language_to_id)
+        return report
+
+
+class FavoriteWordManager(BaseManager):
+
+    async def add_favorite_word(self, data: UserFavoriteWord):
+        async with self.session as session:
+            if await FavoriteWordService.is_favorite(session, data.telegram_id, data.word_id):
                 raise HTTPException(status_code=201, detail="Данное слово уже добавлено пользователем")
 
-            new_favorite_word = FavoriteWord(
-                user_id=user.id,
-                word_id=word.id
-            )
-            session.add(new_favorite_word)
+            new_favorite_word_id = await add_user_favorite_word(session, data.telegram_id, data.word_id)
+            if new_favorite_word_id is None:
+                raise HTTPException(status_code=404, detail="Слово не найдено")
+
             await commit_changes_or_rollback(session, "Ошибка при добавлении слова в избранное")
+            await FavoriteWordService.add_to_index(data.telegram_id, data.word_id)
+            await ReviewService.add(data.telegram_id, data.word_id)
             return {"message": "Слово успешно добавлено в избранное"}
 
     async def delete_favorite_word(self, data: UserFavoriteWord):
@@ -112,6 +347,8 @@ class FavoriteWordManager(BaseManager):
 
             await session.delete(user_favorite_word)
             await commit_changes_or_rollback(session, "Ошибка при удалении слова из избранного")
+            await FavoriteWordService.remove_from_index(data.telegram_id, data.word_id)
+            await ReviewService.remove(data.telegram_id, data.word_id)
             return {"message": "Слово было удалено"}
 
 
@@ -125,6 +362,8 @@ class SentenceManager(BaseManager):
                 language_id=sentence_data.translation_from_language.value,
                 level=sentence_data.level.value
             )
+            await sentence_sampler.assign(session, new_sentence)
+            await sentence_bucket_sampler.assign(session, new_sentence)
 
             session.add(new_sentence)
             await session.flush()
@@ -134,7 +373,10 @@ class SentenceManager(BaseManager):
                 sentence_id=new_sentence.id,
                 from_language_id=sentence_data.translation_from_language.value,
                 to_language_id=sentence_data.translation_to_language.value,
+                tokens=tokenize_sentence(sentence_data.translation_sentence)
             )
             session.add(new_translation_sentence)
             await commit_changes_or_rollback(session, "Ошибка при добавлении предложения")
+            await cache.invalidate(SENTENCE_ANSWERS_CACHE)
+            await token_vocabulary.add(new_translation_sentence.to_language_id, new_translation_sentence.tokens)
             return {"message": "Предложение успешно добавлено"}
@@ -59,28 +59,37 @@ async def populate_bd(connection_test):
         session.add(language_en)
         language_ru = Language(language="Russian")
         session.add(language_ru)
+        language_fr = Language(language="French")
+        session.add(language_fr)
         await session.flush()
 
         # add words
         for i in range(10):
             # word
-            word = Word(name=f"string{i}", language_id=1, part_of_speech="noun", level="A1")
+            word = Word(name=f"string{i}", language_id=1, part_of_speech="noun", level="A1", ordinal=i,
+                        bucket_ordinal=i)
             session.add(word)
             await session.flush()
-            translation_word = TranslationWord(word_id=word.id, from_language_id=2, to_language_id=1, name=f"строка{i}")
+            translation_word = TranslationWord(
+                word_id=word.id, from_language_id=1, to_language_id=2, name=f"строка{i}", ordinal=i
+            )
             session.add(translation_word)
-            word = Word(name=f"string{i}", language_id=2, part_of_speech="noun", level="A1")
+            word = Word(name=f"string{i}", language_id=2, part_of_speech="noun", level="A1", ordinal=i,
+                        bucket_ordinal=i)
             session.add(word)
             await session.flush()
-            translation_word = TranslationWord(word_id=word.id, from_language_id=1, to_language_id=2, name=f"строка{i}")
+            translation_word = TranslationWord(
+                word_id=word.id, from_language_id=2, to_language_id=1, name=f"строка{i}", ordinal=i
+            )
             session.add(translation_word)
 
         # add sentence
-        sentence = Sentence(name=f"Hello, word", language_id=1, level="A1")
+        sentence = Sentence(name=f"Hello, word", language_id=1, level="A1", ordinal=0, bucket_ordinal=0)
         session.add(sentence)
         await session.flush()
         translation_sentence = TranslationSentence(
-            name="Привет, мир", sentence_id=sentence.id, from_language_id=1, to_language_id=2
+            name="Привет, мир", sentence_id=sentence.id, from_language_id=1, to_language_id=2,
+            tokens=["Привет", "мир"]
         )
         session.add(translation_sentence)
 
@@ -1,8 +1,36 @@
+import asyncio
+import base64
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
 import pytest
-from sqlalchemy import select
+from sqlalchemy import delete, event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import TranslationWord
+from src.cache import ReadThroughCache, cache
+from src.models import (AnswerEvent, Language, QuizItem, Sentence, TranslationWord, TranslationWordNeighbors, Word,
+                        WordStat)
+from src.quizzes.decks import WORD_DECK, deck_store
+from src.quizzes.events import WORD_MODE, AnswerEventBuffer, create_answer_event_partitions
+from src.quizzes.favorites import favorite_index
+from src.quizzes.generator import QuestionCandidates, generate_questions
+from src.quizzes.pools import DistractorPool, distractor_pool, question_candidates, token_vocabulary
+from src.quizzes.question_pool import question_pool
+from src.quizzes.reviews import DAY, ReviewState, review_scheduler
+from src.quizzes.sampler import sentence_bucket_sampler, sentence_sampler
+from src.quizzes.seen import seen_words
+from src.quizzes.matching import edit_distance, match_tokens
+from src.quizzes.neighbors import add_neighbors, find_neighbors
+from src.quizzes.service import (DailyChallengeService, NeighborService, QuestionPoolService, QuizItemService,
+                                 VocabularySnapshotService, WordService, WordStatsService)
+from src.quizzes.stale_neighbors import stale_neighbor_groups
+from src.quizzes.snapshot import SnapshotItem, VocabularySnapshotReader, lock_snapshot, write_snapshot
+from src.quizzes.tokens import answer_tokens
+from src.quizzes.utils import get_today
+from src.quizzes.word_stats import word_stats_counter
 
 
 @pytest.mark.asyncio
@@ -13,6 +41,20 @@ async def test_quiz_random_word(client, db_session: AsyncSession):
     assert len(response["other_words"]) == 3
 
 
+@pytest.mark.asyncio
+async def test_quiz_favorite_word(client, db_session: AsyncSession):
+    word = await db_session.scalar(select(Word).where(Word.language_id == 1))
+    response = await client.post("/words/favorite-word", json={"telegram_id": 11, "word_id": str(word.id)})
+    assert response.status_code == 200
+
+    response = await client.get("/quiz/favorite-word", params={"telegram_id": 11})
+    assert response.status_code == 200
+    response = response.json()
+    assert response["word_for_translate"]["id"] == str(word.id)
+    assert response["in_favorite"] is True
+    assert len(response["other_words"]) == 3
+
+
 @pytest.mark.asyncio
 async def test_quiz_check_answer_for_random_word(client, db_session: AsyncSession):
     result = await db_session.execute(select(TranslationWord))
@@ -24,3 +66,761 @@ async def test_quiz_check_answer_for_random_word(client, db_session: AsyncSessio
     assert response.status_code == 200
     response = response.json()
     assert response is True
+
+
+@pytest.mark.asyncio
+async def test_quiz_match_words(client):
+    response = await client.get("/quiz/match-words", params={"telegram_id": 11})
+    assert response.status_code == 200
+    response = response.json()
+    assert len(response["words"]) == 8
+    assert len({word["id"] for word in response["words"]}) == 8
+    assert len(response["translation_words"]) == 8
+
+
+@pytest.mark.asyncio
+async def test_distractor_pool_excludes_correct_answer(db_session: AsyncSession):
+    translation_word = await db_session.scalar(select(TranslationWord).where(TranslationWord.to_language_id == 2))
+    pool = DistractorPool()
+    for _ in range(50):
+        distractors = await pool.get_distractors(db_session, 2, translation_word.word_id)
+        assert len(distractors) == 2
+        assert translation_word.id not in {distractor.id for distractor in distractors}
+
+
+@pytest.mark.asyncio
+async def test_pool_changes_are_applied_in_every_worker(db_session: AsyncSession):
+    other_worker = ReadThroughCache(cache.redis)
+    listener = asyncio.create_task(cache.run_invalidation_listener())
+    try:
+        while not cache.listening:
+            await asyncio.sleep(0.01)
+        distractors = await distractor_pool.get_language(db_session, 2)
+        tokens = await token_vocabulary.get_language(db_session, 2)
+        await question_candidates.get_language(db_session, (1, 2))
+
+        translation_id, word_id = uuid.uuid4(), uuid.uuid4()
+        await other_worker.publish("distractors:add", {"language_id": 2, "ordinal": len(distractors),
+                                                       "id": str(translation_id), "word_id": str(word_id),
+                                                       "name": "новое"})
+        await other_worker.publish("tokens:add", {"language_id": 2, "tokens": ["новое"]})
+        await other_worker.publish("question_candidates:invalidate", [1, 2])
+        for _ in range(100):
+            if (1, 2) not in question_candidates.languages:
+                break
+            await asyncio.sleep(0.01)
+        assert (1, 2) not in question_candidates.languages
+        assert distractors.names[-1] == "новое"
+        assert "новое" in tokens.known
+
+        await token_vocabulary.invalidate(2)
+        assert 2 not in token_vocabulary.languages
+    finally:
+        listener.cancel()
+        distractor_pool.drop(2)
+
+
+@pytest.mark.asyncio
+async def test_question_pool_serves_refilled_questions(client, db_session: AsyncSession):
+    key = question_pool.get_key(1, 2)
+    await question_pool.redis.delete(key)
+
+    refilled = await QuestionPoolService.refill(db_session, 1, 2)
+    assert refilled == question_pool.size
+    assert await QuestionPoolService.refill(db_session, 1, 2) == 0
+
+    question = await QuestionPoolService.pop(1, 2)
+    assert len(question.other_words) == 3
+    assert await question_pool.redis.llen(key) == question_pool.size - 1
+
+    response = await client.get("/quiz/question-pool/stats")
+    assert response.status_code == 200
+    assert response.json()["depth"]["1:2"] == question_pool.size - 1
+
+    await question_pool.redis.zadd(question_pool.pairs_key, {"1:2": time.time() - question_pool.pair_ttl - 1})
+    assert (1, 2) not in await question_pool.get_pairs()
+    assert not await question_pool.redis.exists(key)
+
+
+@pytest.mark.asyncio
+async def test_quiz_random_words_batch(client):
+    response = await client.get("/quiz/random-words", params={"telegram_id": 11, "count": 5})
+    assert response.status_code == 200
+    response = response.json()
+    assert len(response) == 5
+    assert len({question["word_for_translate"]["id"] for question in response}) == 5
+    assert all(len(question["other_words"]) == 3 for question in response)
+
+
+@pytest.mark.asyncio
+async def test_quiz_random_sentences_batch(client):
+    response = await client.get("/quiz/get-random-sentences", params={"telegram_id": 11, "count": 3})
+    assert response.status_code == 200
+    response = response.json()
+    assert len(response) == 1
+    assert {"Привет", "мир"} <= set(response[0]["words_for_sentence"])
+
+
+@pytest.mark.asyncio
+async def test_quiz_random_sentences_skip_sentences_without_translation(client, db_session: AsyncSession):
+    sentence = Sentence(name="Untranslated", language_id=1, level="A1")
+    await sentence_sampler.assign(db_session, sentence)
+    await sentence_bucket_sampler.assign(db_session, sentence)
+    db_session.add(sentence)
+    await db_session.commit()
+
+    response = await client.get("/quiz/get-random-sentences", params={"telegram_id": 11, "count": 3})
+    assert response.status_code == 200
+    assert [question["sentence_for_translate"]["name"] for question in response.json()] == ["Hello, word"]
+
+    await db_session.delete(sentence)
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_quiz_match_words_batch(client):
+    response = await client.get("/quiz/match-words-batch", params={"telegram_id": 11, "count": 2})
+    assert response.status_code == 200
+    response = response.json()
+    assert len(response) == 2
+    for match in response:
+        assert len({word["id"] for word in match["words"]}) == 8
+        assert len(match["translation_words"]) == 8
+    assert len({word["id"] for match in response for word in match["words"]}) == 10
+
+
+@pytest.mark.asyncio
+async def test_quiz_check_sentence_answer(client, db_session: AsyncSession):
+    sentence = await db_session.scalar(select(Sentence).where(Sentence.name == "Hello, word"))
+    params = {"sentence_id": str(sentence.id), "user_words": ["привет", "мир"]}
+    response = await client.get("/quiz/check-sentence-answer", params=params)
+    assert response.status_code == 200
+    assert response.json() is True
+
+
+@pytest.mark.asyncio
+async def test_quiz_check_answer_with_answer_token(client):
+    response = await client.get("/quiz/random-word", params={"telegram_id": 11})
+    question = response.json()
+    assert question["answer_token"]
+    for word in question["other_words"]:
+        params = {
+            "word_for_translate_id": question["word_for_translate"]["id"],
+            "user_word_id": word["id"],
+            "answer_token": question["answer_token"],
+        }
+        response = await client.get("/quiz/check-answer", params=params)
+        assert response.status_code == 200
+        if response.json():
+            break
+    else:
+        pytest.fail("no option accepted as the answer")
+
+
+def test_answer_token_rejects_tampering():
+    word_id, translation_id, other_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    token = answer_tokens.sign_word_answer(word_id, translation_id)
+    assert answer_tokens.verify_word_answer(token, word_id, translation_id) is True
+    assert answer_tokens.verify_word_answer(token, word_id, other_id) is False
+    assert answer_tokens.verify_word_answer(token, other_id, translation_id) is None
+    tampered = token[:10] + ("B" if token[10] == "A" else "A") + token[11:]
+    assert answer_tokens.verify_word_answer(tampered, word_id, translation_id) is None
+    assert answer_tokens.verify_sentence_answer(token, word_id, ["Привет"]) is None
+
+    sentence_token = answer_tokens.sign_sentence_answer(word_id, ["Привет", "мир"])
+    assert answer_tokens.verify_sentence_answer(sentence_token, word_id, ["привет", "мир"]) is True
+    assert answer_tokens.verify_sentence_answer(sentence_token, word_id, ["мир", "привет"]) is False
+
+
+def test_answer_token_carries_issue_time():
+    word_id, translation_id = uuid.uuid4(), uuid.uuid4()
+    issued_at = int(time.time())
+    assert answer_tokens.get_issued_at(answer_tokens.sign_word_answer(word_id, translation_id, ttl=60)) >= issued_at
+    assert answer_tokens.get_issued_at(answer_tokens.sign_word_answer(word_id, translation_id,
+                                                                      ttl=answer_tokens.ttl + 1)) is None
+
+
+def test_answer_token_does_not_reveal_answer():
+    word_id, translation_id = uuid.uuid4(), uuid.uuid4()
+    token = answer_tokens.sign_word_answer(word_id, translation_id)
+    data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    assert translation_id.bytes not in data
+    assert answer_tokens.verify(token, 1, word_id) != translation_id.bytes
+
+
+@pytest.mark.asyncio
+async def test_deck_deals_every_word_before_repeating():
+    await deck_store.invalidate(-1)
+    cards = []
+    for _ in range(5):
+        cards.extend(await deck_store.deal(-1, WORD_DECK, "1:A1:", 20, 4))
+    assert sorted(cards) == list(range(20))
+
+    next_cards = await deck_store.deal(-1, WORD_DECK, "1:A1:", 20, 4)
+    assert len(set(next_cards)) == 4
+    await deck_store.invalidate(-1)
+    assert not await deck_store.redis.exists(deck_store.get_key(-1, WORD_DECK))
+
+
+@pytest.mark.asyncio
+async def test_quiz_random_word_from_dealt_deck_takes_one_query(client, db_session: AsyncSession):
+    await seen_words.redis.delete(seen_words.get_key(11, 1))
+    await deck_store.invalidate(11)
+    response = await client.get("/quiz/random-word", params={"telegram_id": 11})
+    assert response.status_code == 200
+
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", record_statement)
+    try:
+        response = await client.get("/quiz/random-word", params={"telegram_id": 11})
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", record_statement)
+    assert response.status_code == 200
+    assert len(response.json()["other_words"]) == 3
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_quiz_random_word_filtered_by_level_and_part_of_speech(client):
+    data = {
+        "translation_from_language": 1,
+        "translation_to_language": 2,
+        "level": "B1",
+        "word_to_translate": "run",
+        "translation_word": "бежать",
+        "part_of_speech": "verb"
+    }
+    response = await client.post("/words/add-word", json=data)
+    assert response.status_code == 200
+
+    params = {"telegram_id": 11, "level": "B1", "part_of_speech": "verb"}
+    response = await client.get("/quiz/random-word", params=params)
+    assert response.status_code == 200
+    assert response.json()["word_for_translate"]["name"] == "run"
+
+    response = await client.get("/quiz/random-word", params={"telegram_id": 11})
+    assert response.status_code == 200
+    assert response.json()["word_for_translate"]["name"] != "run"
+
+    response = await client.get("/quiz/random-word", params={"telegram_id": 11, "level": "C2"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_quiz_review_schedules_answered_words(client, db_session: AsyncSession):
+    await review_scheduler.redis.delete(review_scheduler.get_due_key(11), review_scheduler.get_state_key(11))
+    response = await client.get("/quiz/review", params={"telegram_id": 11})
+    assert response.status_code == 404
+
+    translation_word = await db_session.scalar(select(TranslationWord).where(TranslationWord.to_language_id == 2))
+    await review_scheduler.add(11, translation_word.word_id)
+    response = await client.get("/quiz/review", params={"telegram_id": 11})
+    assert response.status_code == 200
+    assert response.json()["word_for_translate"]["id"] == str(translation_word.word_id)
+
+    params = {"word_for_translate_id": str(translation_word.word_id), "user_word_id": str(translation_word.id),
+              "telegram_id": 11}
+    response = await client.get("/quiz/check-answer", params=params)
+    assert response.json() is True
+    response = await client.get("/quiz/review", params={"telegram_id": 11})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_review_answers_recorded_concurrently_are_all_kept():
+    word_id = uuid.uuid4()
+    await review_scheduler.redis.delete(review_scheduler.get_due_key(-1), review_scheduler.get_state_key(-1))
+    assert await review_scheduler.record_answer(-1, word_id, True) is None
+
+    await review_scheduler.add(-1, word_id)
+    await asyncio.gather(*[review_scheduler.record_answer(-1, word_id, True) for _ in range(5)])
+    state = ReviewState.unpack(await review_scheduler.redis.hget(review_scheduler.get_state_key(-1), word_id.bytes))
+    assert state.repetitions == 5
+    await review_scheduler.remove(-1, word_id)
+
+
+def test_review_state_intervals():
+    state = ReviewState()
+    intervals = []
+    for _ in range(4):
+        state.answer(True)
+        intervals.append(state.interval)
+    assert intervals[:2] == [DAY, 6 * DAY]
+    assert intervals[3] > intervals[2] > intervals[1]
+    state.answer(False)
+    assert state.repetitions == 0
+    assert ReviewState.unpack(state.pack()).__dict__ == state.__dict__
+
+
+@pytest.mark.asyncio
+async def test_favorite_index_rebuilds_and_stays_in_sync(client, db_session: AsyncSession):
+    await favorite_index.redis.delete(favorite_index.get_key(11))
+    response = await client.get("/quiz/favorite-word", params={"telegram_id": 11})
+    assert response.status_code == 200
+    word_id = response.json()["word_for_translate"]["id"]
+    assert await favorite_index.contains(11, uuid.UUID(word_id)) is True
+
+    response = await client.post("/words/favorite-word", json={"telegram_id": 11, "word_id": word_id})
+    assert response.status_code == 201
+
+    await review_scheduler.add(11, uuid.UUID(word_id))
+    response = await client.request("DELETE", "/words/favorite-word", json={"telegram_id": 11, "word_id": word_id})
+    assert response.status_code == 200
+    assert await review_scheduler.redis.zscore(review_scheduler.get_due_key(11), uuid.UUID(word_id).bytes) is None
+    response = await client.get("/quiz/favorite-word", params={"telegram_id": 11})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_answer_event_buffer_flushes_in_batches(connection_test, db_session: AsyncSession):
+    buffer = AnswerEventBuffer(max_size=3, batch_size=2, session_maker=connection_test)
+    item_id = uuid.uuid4()
+    for correct in (True, False, True, True):
+        buffer.record(item_id, WORD_MODE, correct, telegram_id=11, issued_at=time.time() - 1.5)
+    assert buffer.dropped == 1
+    assert buffer.flush_requested.is_set()
+
+    assert await buffer.flush() == 3
+    stats = buffer.get_stats()
+    assert (stats.queued, stats.flushed, stats.dropped, stats.failed) == (0, 3, 1, 0)
+    result = await db_session.execute(select(AnswerEvent.correct, AnswerEvent.latency_ms)
+                                      .where(AnswerEvent.item_id == item_id))
+    events = result.all()
+    assert sorted(correct for correct, _ in events) == [False, True, True]
+    assert all(latency_ms >= 1500 for _, latency_ms in events)
+
+
+@pytest.mark.asyncio
+async def test_answer_event_buffer_retries_failed_batches(connection_test, db_session: AsyncSession):
+    sessions = []
+
+    def session_maker():
+        sessions.append(None)
+        if len(sessions) == 1:
+            raise ConnectionError("database is unavailable")
+        return connection_test()
+
+    buffer = AnswerEventBuffer(batch_size=2, session_maker=session_maker)
+    item_id = uuid.uuid4()
+    buffer.record(item_id, WORD_MODE, True)
+    buffer.record(item_id, WORD_MODE, False)
+    assert await buffer.flush() == 0
+    assert (buffer.get_stats().queued, buffer.get_stats().failed) == (2, 0)
+
+    assert await buffer.flush() == 2
+    stats = buffer.get_stats()
+    assert (stats.queued, stats.flushed, stats.failed) == (0, 2, 0)
+    result = await db_session.execute(select(func.count()).where(AnswerEvent.item_id == item_id))
+    assert result.scalar() == 2
+
+
+@pytest.mark.asyncio
+async def test_answer_event_partitions_are_created_by_concurrent_workers(connection_test):
+    async def create_partitions():
+        async with connection_test() as session:
+            await create_answer_event_partitions(session, datetime(2090, 1, 15), months=3)
+
+    await asyncio.gather(*[create_partitions() for _ in range(4)])
+
+
+@pytest.mark.asyncio
+async def test_word_stats_rollup_and_hardest_words(client, db_session: AsyncSession):
+    language = Language(language="German")
+    db_session.add(language)
+    await db_session.flush()
+    easy_word, hard_word = words = [
+        Word(name=f"stat{i}", language_id=language.id, part_of_speech="noun", level="A1", ordinal=i, bucket_ordinal=i)
+        for i in range(2)
+    ]
+    db_session.add_all(words)
+    await db_session.commit()
+    for correct in (True, True, True, False):
+        await word_stats_counter.record(easy_word.id, correct, 1000)
+    for correct in (False, False, True, False):
+        await word_stats_counter.record(hard_word.id, correct)
+
+    assert await WordStatsService.rollup(db_session) >= 2
+    assert not await word_stats_counter.take()
+    stat = await db_session.get(WordStat, easy_word.id, populate_existing=True)
+    assert (stat.attempts, stat.correct, stat.latency_ms_total, stat.latency_count) == (4, 3, 4000, 4)
+
+    await word_stats_counter.record(easy_word.id, False)
+    await WordStatsService.rollup(db_session)
+    stat = await db_session.get(WordStat, easy_word.id, populate_existing=True)
+    assert (stat.attempts, stat.correct) == (5, 3)
+
+    response = await client.get("/words/hardest-words", params={"language_id": language.id, "min_attempts": 4})
+    assert response.status_code == 200
+    hardest = response.json()
+    assert hardest[0]["id"] == str(hard_word.id)
+    assert hardest[0]["average_latency_ms"] is None
+    assert hardest[1]["id"] == str(easy_word.id)
+    assert hardest[1]["average_latency_ms"] == 1000
+
+
+@pytest.mark.asyncio
+async def test_seen_words_are_counted(client, db_session: AsyncSession):
+    await seen_words.redis.delete(seen_words.get_key(11, 1))
+    await deck_store.invalidate(11)
+    response = await client.get("/quiz/random-words", params={"telegram_id": 11, "count": 3})
+    assert response.status_code == 200
+    word_ids = [uuid.UUID(question["word_for_translate"]["id"]) for question in response.json()]
+
+    response = await client.get("/quiz/coverage", params={"telegram_id": 11})
+    assert response.status_code == 200
+    coverage = response.json()
+    assert coverage["seen"] == 3
+    assert coverage["total"] >= 10
+    assert coverage["coverage"] == 3 / coverage["total"]
+
+    seen_indexes = list(await db_session.scalars(select(Word.seen_index).where(Word.id.in_(word_ids))))
+    assert await seen_words.are_seen(11, 1, seen_indexes) == [True, True, True]
+
+
+@pytest.mark.asyncio
+async def test_seen_words_are_skipped(client, db_session: AsyncSession):
+    for name in ("quickly", "slowly"):
+        data = {"translation_from_language": 1, "translation_to_language": 2, "level": "C1",
+                "word_to_translate": name, "translation_word": name[::-1], "part_of_speech": "adverb"}
+        assert (await client.post("/words/add-word", json=data)).status_code == 200
+    words = {word.name: word for word in await db_session.scalars(
+        select(Word).where(Word.language_id == 1, Word.name.in_(["quickly", "slowly"]))
+    )}
+    params = {"telegram_id": 11, "level": "C1", "part_of_speech": "adverb"}
+
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    for _ in range(4):
+        await seen_words.redis.delete(seen_words.get_key(11, 1))
+        await deck_store.invalidate(11)
+        await seen_words.mark(11, 1, [words["quickly"].seen_index])
+        statements.clear()
+        event.listen(db_session.bind.sync_engine, "before_cursor_execute", record_statement)
+        try:
+            response = await client.get("/quiz/random-word", params=params)
+        finally:
+            event.remove(db_session.bind.sync_engine, "before_cursor_execute", record_statement)
+        assert response.json()["word_for_translate"]["name"] == "slowly"
+        assert len(statements) == 2
+
+    response = await client.get("/quiz/random-word", params=params)
+    assert response.json()["word_for_translate"]["name"] in words
+    await seen_words.redis.delete(seen_words.get_key(11, 1))
+    await seen_words.mark(11, 1, [words["slowly"].seen_index])
+    response = await client.get("/quiz/random-words", params={**params, "count": 2})
+    assert sorted(question["word_for_translate"]["name"] for question in response.json()) == ["quickly", "slowly"]
+
+    for word in words.values():
+        assert (await client.delete("/words/word", params={"word_id": str(word.id)})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_daily_challenge_is_generated_once_and_served(client, db_session: AsyncSession):
+    today = get_today()
+    daily_challenge_service = DailyChallengeService(db_session)
+    assert await daily_challenge_service.generate(1, 2, today, regenerate=True)
+    assert not await daily_challenge_service.generate(1, 2, today)
+
+    response = await client.get("/quiz/daily", params={"language_from_id": 1, "language_to_id": 2})
+    assert response.status_code == 200
+    challenge = response.json()
+    assert challenge["day"] == today.isoformat()
+    assert len(challenge["words"]) == 10
+    assert len({question["word_for_translate"]["id"] for question in challenge["words"]}) == 10
+    assert len(challenge["sentences"]) >= 1
+    assert len(challenge["match_words"]) >= 1
+    question = challenge["words"][0]
+    word_id = uuid.UUID(question["word_for_translate"]["id"])
+    assert any(answer_tokens.verify_word_answer(question["answer_token"], word_id, uuid.UUID(word["id"]))
+               for word in question["other_words"])
+
+    response = await client.get("/quiz/daily", params={"language_from_id": 2, "language_to_id": 3})
+    assert response.status_code == 404
+
+    for score, best_score in ((7, 7), (3, 7), (9, 9)):
+        response = await client.post("/quiz/daily/score",
+                                     json={"telegram_id": 11, "day": today.isoformat(), "score": score})
+        assert response.status_code == 200
+        assert response.json() == best_score
+
+    question_count = len(challenge["words"]) + len(challenge["sentences"]) + len(challenge["match_words"])
+    response = await client.post("/quiz/daily/score",
+                                 json={"telegram_id": 11, "day": today.isoformat(), "score": question_count + 1})
+    assert response.status_code == 400
+    for day, status_code in ((today + timedelta(days=1), 400), (date(2000, 1, 1), 404)):
+        response = await client.post("/quiz/daily/score", json={"telegram_id": 11, "day": day.isoformat(), "score": 1})
+        assert response.status_code == status_code
+
+
+def test_find_neighbors_prefers_similar_names():
+    names = ["house", "horse", "mouse", "elephant", "House", "hose"]
+    assert set(find_neighbors(names, [0], 3)[0]) == {1, 2, 5}
+
+
+def test_add_neighbors_changes_only_lists_the_added_names_beat():
+    names = ["house", "horse", "mouse", "elephant", "hose", "elephants"]
+    neighbors = find_neighbors(names[:4], range(4), 2)
+    changed = add_neighbors(names, neighbors + [[], []], [4, 5], 2)
+    assert set(changed) == {1, 3}
+    for index, index_neighbors in changed.items():
+        assert set(index_neighbors) == set(find_neighbors(names, [index], 2)[0])
+
+
+@pytest.mark.asyncio
+async def test_distractors_come_from_precomputed_neighbors(db_session: AsyncSession):
+    assert await NeighborService.build(db_session, 2) > 0
+    assert await NeighborService.build(db_session, 2) == 0
+
+    translation_word = await db_session.scalar(
+        select(TranslationWord).where(TranslationWord.name == "строка1", TranslationWord.to_language_id == 2)
+    )
+    neighbors = await db_session.get(TranslationWordNeighbors, translation_word.id)
+    assert neighbors.neighbor_ids
+    assert translation_word.id not in neighbors.neighbor_ids
+
+    distractors = await WordService.get_distractors(db_session, 2, translation_word.word_id, translation_word.id)
+    assert len(distractors) == 2
+    assert all(distractor.id in neighbors.neighbor_ids for distractor in distractors)
+
+
+@pytest.mark.asyncio
+async def test_neighbors_of_changed_groups_are_refreshed(client, db_session: AsyncSession):
+    await stale_neighbor_groups.pop_all()
+    translation_ids = {}
+    for name, translation in (("brightly", "ярко"), ("lightly", "ярко-ярко"), ("rightly", "ярком")):
+        data = {"translation_from_language": 1, "translation_to_language": 2, "level": "C2",
+                "word_to_translate": name, "translation_word": translation, "part_of_speech": "adverb"}
+        assert (await client.post("/words/add-word", json=data)).status_code == 200
+        assert await stale_neighbor_groups.pop_all() == [(2, "C2", "adverb")]
+        await stale_neighbor_groups.add([(2, "C2", "adverb")])
+        assert await NeighborService.refresh_stale(db_session) == len(translation_ids) + 1
+        translation_ids[name] = await db_session.scalar(
+            select(TranslationWord.id).where(TranslationWord.name == translation)
+        )
+
+    neighbors = await db_session.get(TranslationWordNeighbors, translation_ids["brightly"], populate_existing=True)
+    assert set(neighbors.neighbor_ids) == {translation_ids["lightly"], translation_ids["rightly"]}
+    assert await NeighborService.refresh_stale(db_session) == 0
+
+    word_id = await db_session.scalar(select(Word.id).where(Word.name == "lightly"))
+    assert (await client.delete("/words/word", params={"word_id": str(word_id)})).status_code == 200
+    assert await NeighborService.refresh_stale(db_session) == 2
+    neighbors = await db_session.get(TranslationWordNeighbors, translation_ids["brightly"], populate_existing=True)
+    assert neighbors.neighbor_ids == [translation_ids["rightly"]]
+
+    word_ids = await db_session.scalars(select(Word.id).where(Word.name.in_(["brightly", "rightly"])))
+    for word_id in word_ids.all():
+        assert (await client.delete("/words/word", params={"word_id": str(word_id)})).status_code == 200
+    assert await stale_neighbor_groups.pop_all() == [(2, "C2", "adverb")]
+
+
+@pytest.mark.asyncio
+async def test_quiz_check_match(client, db_session: AsyncSession):
+    response = await client.get("/quiz/match-words", params={"telegram_id": 11})
+    assert response.status_code == 200
+    word_ids = [uuid.UUID(word["id"]) for word in response.json()["words"]]
+    result = await db_session.execute(select(TranslationWord.word_id, TranslationWord.id)
+                                      .where(TranslationWord.word_id.in_(word_ids)))
+    translations = dict(result.all())
+    pairs = [{"word_id": str(word_id), "translation_id": str(translations[word_id])} for word_id in word_ids]
+    pairs[0]["translation_id"], pairs[1]["translation_id"] = pairs[1]["translation_id"], pairs[0]["translation_id"]
+
+    response = await client.post("/quiz/check-match", json={"pairs": pairs, "telegram_id": 11})
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["word_id"] for result in results] == [pair["word_id"] for pair in pairs]
+    assert [result["correct"] for result in results] == [False, False] + [True] * (len(pairs) - 2)
+
+    response = await client.post("/quiz/check-match", json={"pairs": []})
+    assert response.status_code == 422
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("книга", "кинга") == 1
+    assert edit_distance("", "abc") == 3
+    assert edit_distance("abcdef", "uvwxyz", max_distance=2) == 3
+    assert edit_distance(["я", "люблю", "кошек"], ["я", "кошек"]) == 1
+
+
+def test_match_tokens_tolerates_typos():
+    assert match_tokens(["Я", "люблю", "книги"], ["я", "люблю", "кинги"], "A1").correct
+    assert match_tokens(["Я", "люблю", "книги"], ["я", "люблю", "кинги"], "C2").distance == 1
+    assert not match_tokens(["Я", "люблю", "книги"], ["я", "лбюлю", "кинги"], "C2").correct
+    result = match_tokens(["Я", "люблю", "кошек"], ["я", "люблю", "собак"], "A1")
+    assert not result.correct and result.wrong_tokens == [2]
+    result = match_tokens(["Я", "люблю", "кошек"], ["я", "очень", "люблю", "кошек"], "A1")
+    assert not result.correct and result.extra_tokens == [1]
+    assert not match_tokens(["Это", "кот"], ["это", "кит"], "A1").correct
+
+
+@pytest.mark.asyncio
+async def test_quiz_check_sentence_answer_with_typo(client, db_session: AsyncSession):
+    sentence = await db_session.scalar(select(Sentence).where(Sentence.name == "Hello, word"))
+    params = {"sentence_id": str(sentence.id), "user_words": ["пирвет", "мир"]}
+    response = await client.get("/quiz/check-sentence-answer", params=params)
+    assert response.status_code == 200
+    assert response.json() is True
+
+    params["user_words"] = ["пока", "мир"]
+    response = await client.get("/quiz/check-sentence-answer-details", params=params)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["correct"] is False
+    assert result["wrong_tokens"] == [0]
+
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", record_statement)
+    try:
+        response = await client.get("/quiz/check-sentence-answer-details", params=params)
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", record_statement)
+    assert response.json() == result
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_rebuild_quiz_items_restores_missing_rows(db_session: AsyncSession):
+    quiz_items = await db_session.execute(select(QuizItem.translation_id, QuizItem.word_name, QuizItem.bucket_ordinal))
+    expected = sorted(quiz_items.all())
+    await db_session.execute(delete(QuizItem))
+
+    assert await QuizItemService.rebuild(db_session) == len(expected)
+    quiz_items = await db_session.execute(select(QuizItem.translation_id, QuizItem.word_name, QuizItem.bucket_ordinal))
+    assert sorted(quiz_items.all()) == expected
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_snapshot_holds_quiz_items(db_session: AsyncSession, tmp_path):
+    path = str(tmp_path / "vocabulary.snapshot")
+    quiz_items = await db_session.execute(
+        select(QuizItem.word_id, QuizItem.word_name, QuizItem.translation_id, QuizItem.translation_name,
+               QuizItem.language_to_id)
+        .where(QuizItem.language_from_id == 1)
+    )
+    expected = sorted(quiz_items.all())
+
+    assert await VocabularySnapshotService.build(db_session, path) >= len(expected)
+    snapshot = VocabularySnapshotReader(path, check_interval=0).get()
+    assert snapshot.get_size(1) == len(expected)
+    assert sorted(snapshot.sample(1, len(expected) + 5)) == [SnapshotItem(*item) for item in expected]
+    assert {item.word_name for item in snapshot.sample(1, 3, level="A1")} <= {item.word_name for item in expected}
+    assert snapshot.sample(1, 3, level="C2") == []
+    assert snapshot.sample(100, 3) == []
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_snapshot_is_rebuilt_after_word_writes(client, db_session: AsyncSession, tmp_path):
+    reader = VocabularySnapshotReader(str(tmp_path / "vocabulary.snapshot"), check_interval=0)
+    assert await VocabularySnapshotService.get_current(reader) is None
+    assert await VocabularySnapshotService.refresh(db_session, reader)
+    assert await VocabularySnapshotService.get_current(reader) is not None
+    assert await VocabularySnapshotService.refresh(db_session, reader) is None
+
+    data = {"translation_from_language": 1, "translation_to_language": 2, "level": "A1",
+            "word_to_translate": "snapshot", "translation_word": "снимок", "part_of_speech": "noun"}
+    assert (await client.post("/words/add-word", json=data)).status_code == 200
+    assert await VocabularySnapshotService.get_current(reader) is None
+    with lock_snapshot(reader.path):
+        assert await VocabularySnapshotService.refresh(db_session, reader) is None
+    assert await VocabularySnapshotService.refresh(db_session, reader)
+    snapshot = await VocabularySnapshotService.get_current(reader)
+    word_names = {item.word_name for item in snapshot.sample(1, snapshot.get_size(1))}
+    assert "snapshot" in word_names
+
+    word_id = next(item.word_id for item in snapshot.sample(1, snapshot.get_size(1)) if item.word_name == "snapshot")
+    assert (await client.delete("/words/word", params={"word_id": str(word_id)})).status_code == 200
+    assert await VocabularySnapshotService.get_current(reader) is None
+
+
+def test_vocabulary_snapshot_reader_swaps_replaced_file(tmp_path):
+    path = str(tmp_path / "vocabulary.snapshot")
+    reader = VocabularySnapshotReader(path, check_interval=0)
+    assert reader.get() is None
+
+    class Row(NamedTuple):
+        language_from_id: int
+        level: str
+        word_id: uuid.UUID
+        word_name: str
+        translation_id: uuid.UUID
+        translation_name: str
+        language_to_id: int
+
+    first = Row(1, "A1", uuid.uuid4(), "cat", uuid.uuid4(), "кошка", 2)
+    write_snapshot(path, [first], version=1)
+    assert reader.get().version == 1
+    assert reader.get().sample(1, 5) == [SnapshotItem(*first[2:])]
+
+    second = Row(1, "B2", uuid.uuid4(), "hedgehog", uuid.uuid4(), "ёжик", 2)
+    write_snapshot(path, [first, second], version=2)
+    snapshot = reader.get()
+    assert snapshot.version == 2
+    assert snapshot.sample(1, 5, level="B2") == [SnapshotItem(*second[2:])]
+    assert snapshot.get_size(1) == 2
+
+
+class CandidateRow(NamedTuple):
+    word_id: bytes
+    word_name: str
+    translation_id: bytes
+    translation_name: str
+    neighbor_ids: Optional[bytes] = None
+
+
+def test_generated_questions_keep_the_answer_among_distinct_options():
+    rows = [CandidateRow(uuid.uuid4().bytes, f"word{i}", uuid.uuid4().bytes, f"слово{i % 40}") for i in range(50)]
+    rows[0] = rows[0]._replace(neighbor_ids=rows[1].translation_id + uuid.uuid4().bytes + rows[2].translation_id)
+    candidates = QuestionCandidates(rows)
+    assert candidates.neighbors[0].tolist() == [1, -1, 2, -1, -1, -1, -1, -1]
+    batch = generate_questions(candidates, 2000, k=3, rng=np.random.default_rng(1))
+
+    assert batch.options.shape == (2000, 4)
+    assert (batch.options[np.arange(2000), batch.answer_positions] == batch.targets).all()
+    for target, options in zip(batch.targets, batch.options):
+        names = [rows[option].translation_name for option in options]
+        assert len(set(names)) == 4
+        if target == 0:
+            assert {1, 2} <= set(options)
+    assert np.bincount(batch.answer_positions, minlength=4).min() > 400
+
+    batch = generate_questions(candidates, 60, distinct=True)
+    assert sorted(batch.targets.tolist()) == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_question_candidates_are_kept_per_language_pair(client, db_session: AsyncSession):
+    data = {"translation_from_language": 1, "translation_to_language": 3, "level": "A1",
+            "word_to_translate": "cheese", "translation_word": "fromage", "part_of_speech": "noun"}
+    assert (await client.post("/words/add-word", json=data)).status_code == 200
+
+    candidates = await question_candidates.get_language(db_session, (1, 2))
+    assert "fromage" not in candidates.translation_names
+    candidates = await question_candidates.get_language(db_session, (1, 3))
+    assert candidates.translation_names == ["fromage"]
+
+    word_id = await db_session.scalar(select(Word.id).where(Word.name == "cheese"))
+    assert (await client.delete("/words/word", params={"word_id": str(word_id)})).status_code == 200
+    assert (1, 3) not in question_candidates.languages
+
+
+@pytest.mark.asyncio
+async def test_generate_random_words_signs_every_question(db_session: AsyncSession):
+    questions = await WordService.generate_random_words(db_session, 1, 2, 30)
+    assert len(questions) == 30
+    for question in questions:
+        assert len(question.other_words) == 3
+        correct = [word.id for word in question.other_words
+                   if answer_tokens.verify_word_answer(question.answer_token, question.word_for_translate.id, word.id)]
+        assert len(correct) == 1
@@ -1,9 +1,16 @@
+import asyncio
+import json
+
 import pytest
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from src.models import Word, Sentence, User
+from src.cache import INVALIDATION_CHANNEL, ReadThroughCache, cache
+from src.models import QuizItem, Word, Sentence, User, TranslationSentence, TranslationWord
+from src.quizzes.query import SENTENCE_ANSWERS_CACHE
+from src.words.importer import NDJSON_FORMAT, iter_lines
+from src.words.service import SentenceImportManager, WordImportManager
 
 
 @pytest.mark.asyncio
@@ -61,3 +68,303 @@ async def test_add_words_with_same_words(client):
     assert response.status_code == 422
     response = response.json()
     assert response["detail"][0]["msg"] == "Value error, Слова должны отличаться друг от друга"
+
+
+@pytest.mark.asyncio
+async def test_added_word_gets_next_ordinal(db_session: AsyncSession):
+    word = await db_session.scalar(select(Word).options(joinedload(Word.translation)).where(Word.name == "test"))
+    assert word.ordinal == 10
+    assert word.bucket_ordinal == 10
+    assert word.translation.ordinal == 10
+
+
+@pytest.mark.asyncio
+async def test_delete_word_keeps_ordinals_dense(client, db_session: AsyncSession):
+    word = await db_session.scalar(select(Word).where(Word.language_id == 2, Word.ordinal == 0))
+    response = await client.delete("/words/word", params={"word_id": str(word.id)})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    result = await db_session.execute(select(Word.ordinal, Word.bucket_ordinal).where(Word.language_id == 2))
+    ordinals, bucket_ordinals = zip(*result.all())
+    assert sorted(ordinals) == list(range(10))
+    assert sorted(bucket_ordinals) == list(range(10))
+
+
+async def assert_quiz_items_match_words(db_session: AsyncSession) -> None:
+    db_session.expire_all()
+    words = await db_session.execute(
+        select(Word.id, Word.name, TranslationWord.id, TranslationWord.name, Word.ordinal, Word.bucket_ordinal)
+        .join(TranslationWord, TranslationWord.word_id == Word.id)
+        .where(Word.language_id == 2)
+    )
+    quiz_items = await db_session.execute(
+        select(QuizItem.word_id, QuizItem.word_name, QuizItem.translation_id, QuizItem.translation_name,
+               QuizItem.ordinal, QuizItem.bucket_ordinal)
+        .where(QuizItem.language_from_id == 2)
+    )
+    assert sorted(quiz_items.all()) == sorted(words.all())
+
+
+@pytest.mark.asyncio
+async def test_quiz_items_follow_added_and_deleted_words(client, db_session: AsyncSession):
+    await assert_quiz_items_match_words(db_session)
+    for name, translation in (("apple", "яблоко"), ("pear", "груша")):
+        data = {"translation_from_language": 2, "translation_to_language": 1, "level": "A1",
+                "word_to_translate": name, "translation_word": translation, "part_of_speech": "noun"}
+        assert (await client.post("/words/add-word", json=data)).status_code == 200
+    await assert_quiz_items_match_words(db_session)
+    added_items = await db_session.scalars(select(QuizItem).where(QuizItem.word_name.in_(["apple", "pear"])))
+    assert sorted(item.translation_name for item in added_items) == ["груша", "яблоко"]
+
+    for name in ("apple", "pear"):
+        word = await db_session.scalar(select(Word).where(Word.name == name))
+        assert (await client.delete("/words/word", params={"word_id": str(word.id)})).status_code == 200
+        await assert_quiz_items_match_words(db_session)
+        assert await db_session.scalar(select(QuizItem).where(QuizItem.word_name == name)) is None
+
+
+@pytest.mark.asyncio
+async def test_add_sentence_stores_tokens(client, db_session: AsyncSession):
+    data = {
+        "translation_from_language": 2,
+        "translation_to_language": 1,
+        "level": "A1",
+        "sentence_to_translate": "Good morning!",
+        "translation_sentence": "Доброе утро!"
+    }
+    version = await cache.get_version(SENTENCE_ANSWERS_CACHE)
+    response = await client.post("/words/add-sentence", json=data)
+    assert response.status_code == 200
+    assert await cache.get_version(SENTENCE_ANSWERS_CACHE) == version + 1
+
+    sentence = await db_session.scalar(
+        select(Sentence).options(joinedload(Sentence.translation)).where(Sentence.name == "Good morning!")
+    )
+    assert sentence.ordinal == 0
+    assert sentence.translation.tokens == ["Доброе", "утро"]
+
+
+async def get_ordinal_partitions(db_session: AsyncSession, partition_columns, ordinal_column) -> list:
+    result = await db_session.execute(select(*partition_columns, ordinal_column))
+    partitions = {}
+    for *partition, ordinal in result.all():
+        partitions.setdefault(tuple(partition), []).append(ordinal)
+    return [sorted(ordinals) for ordinals in partitions.values()]
+
+
+@pytest.mark.asyncio
+async def test_import_words_from_csv(client, db_session: AsyncSession):
+    content = "\n".join([
+        "translation_from_language,translation_to_language,level,part_of_speech,word_to_translate,translation_word",
+        '2,1,A2,noun,"apple, red",яблоко',
+        '2,1,A2,noun,"apple, red",яблочко',
+        "2,1,A2,verb,run,бежать",
+        "2,2,A1,noun,same,same",
+        "2,1,A1,animal,house,дом",
+        "2,1,A1,noun,test,проверка",
+        "2,1,Z9,noun,cat,кот",
+    ])
+    response = await client.post("/words/import", content=content.encode(), headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["processed"], report["inserted"], report["merged"], report["skipped"], report["invalid"]) == (
+        7, 2, 0, 2, 3
+    )
+    assert sorted(error["line"] for error in report["errors"]) == [5, 6, 8]
+
+    db_session.expire_all()
+    apple = await db_session.scalar(
+        select(Word).options(joinedload(Word.translation)).where(Word.name == "apple, red")
+    )
+    assert apple.translation.name == "яблоко"
+    quiz_item = await db_session.scalar(select(QuizItem).where(QuizItem.word_id == apple.id))
+    assert quiz_item.translation_name == "яблоко"
+    for partition_columns, ordinal_column in [
+        ((Word.language_id,), Word.ordinal),
+        ((Word.language_id, Word.level, Word.part_of_speech), Word.bucket_ordinal),
+        ((TranslationWord.to_language_id,), TranslationWord.ordinal),
+    ]:
+        for ordinals in await get_ordinal_partitions(db_session, partition_columns, ordinal_column):
+            assert ordinals == list(range(len(ordinals)))
+
+
+@pytest.mark.asyncio
+async def test_import_words_from_ndjson_merges_existing_words(db_session: AsyncSession):
+    records = [
+        {"translation_from_language": 2, "translation_to_language": 1, "level": "A1", "part_of_speech": "noun",
+         "word_to_translate": "test", "translation_word": "проверка"},
+        {"translation_from_language": 2, "translation_to_language": 1, "level": "B1", "part_of_speech": "adverb",
+         "word_to_translate": "quickly", "translation_word": "быстро"},
+    ]
+    content = "\n".join([json.dumps(records[0]), "{not json", json.dumps(records[1])]).encode()
+
+    async def chunks():
+        yield content[:50]
+        yield content[50:]
+
+    word_import_service = WordImportManager(db_session, chunk_size=1)
+    report = await word_import_service.import_words(iter_lines(chunks()), NDJSON_FORMAT, merge=True)
+    assert (report.processed, report.inserted, report.merged, report.skipped, report.invalid) == (3, 1, 1, 0, 1)
+    assert report.errors[0].line == 2
+
+    db_session.expire_all()
+    quiz_item = await db_session.scalar(select(QuizItem).where(QuizItem.word_name == "test"))
+    assert quiz_item.translation_name == "проверка"
+    quickly = await db_session.scalar(select(Word).where(Word.name == "quickly"))
+    assert quickly.bucket_ordinal == 0
+
+
+@pytest.mark.asyncio
+async def test_import_words_rejects_unknown_format(client):
+    response = await client.post("/words/import", content=b"{}", headers={"content-type": "application/xml"})
+    assert response.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_import_sentences_from_tsv(client, db_session: AsyncSession):
+    content = "\n".join([
+        "sentence_to_translate\ttranslation_sentence\tlevel",
+        'He said "hi\tОн сказал «привет»!\tA2',
+        "Same\tSame\tA2",
+        "Too\tmany\tfields\there",
+        "I see you.\tЯ тебя вижу.\tB1",
+    ])
+    version = await cache.get_version(SENTENCE_ANSWERS_CACHE)
+    response = await client.post(
+        "/words/import-sentences", content=content.encode(), headers={"content-type": "text/tab-separated-values"},
+        params={"translation_from_language": 2, "translation_to_language": 1}
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["processed"], report["inserted"], report["invalid"], report["last_line"]) == (4, 2, 2, 5)
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+    assert await cache.get_version(SENTENCE_ANSWERS_CACHE) == version + 1
+
+    sentence = await db_session.scalar(
+        select(Sentence).options(joinedload(Sentence.translation)).where(Sentence.name == 'He said "hi')
+    )
+    assert sentence.level == "A2"
+    assert sentence.translation.to_language_id == 1
+    assert sentence.translation.tokens == ["Он", "сказал", "«привет»"]
+    for ordinals in await get_ordinal_partitions(db_session, (Sentence.language_id,), Sentence.ordinal):
+        assert ordinals == list(range(len(ordinals)))
+
+
+@pytest.mark.asyncio
+async def test_import_sentences_resumes_from_checkpoint(db_session: AsyncSession):
+    lines = [json.dumps({"translation_from_language": 2, "translation_to_language": 1, "level": "C1",
+                         "sentence_to_translate": f"Resumed {number}",
+                         "translation_sentence": f"Продолжено {number}"}) for number in range(5)]
+
+    async def interrupted_chunks():
+        yield "\n".join(lines[:3]).encode()
+        raise ConnectionError
+
+    async def chunks():
+        yield "\n".join(lines).encode()
+
+    sentence_import_service = SentenceImportManager(db_session, chunk_size=2)
+    with pytest.raises(ConnectionError):
+        await sentence_import_service.import_sentences(iter_lines(interrupted_chunks()), NDJSON_FORMAT, "resumed")
+    report = await sentence_import_service.import_sentences(iter_lines(chunks()), NDJSON_FORMAT, "resumed")
+    assert (report.resumed_from, report.processed, report.inserted, report.last_line) == (2, 3, 3, 5)
+
+    result = await db_session.execute(
+        select(Sentence.name, Sentence.bucket_ordinal).where(Sentence.name.like("Resumed %")).order_by(Sentence.name)
+    )
+    assert result.all() == [(f"Resumed {number}", number) for number in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_available_languages_are_cached(client):
+    await cache.invalidate("languages")
+    misses = cache.get_stats()["languages"].misses if "languages" in cache.get_stats() else 0
+    for _ in range(2):
+        response = await client.get("/words/check-available-language")
+        assert response.status_code == 200
+        assert {"language": "English", "id": 1} in response.json()
+    stats = (await client.get("/words/cache/stats")).json()["languages"]
+    assert stats["misses"] == misses + 1
+    assert stats["l1_hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_cache_reads_through_both_tiers_once():
+    loads = []
+
+    @cache.cached("test_words", negative_ttl=5, key=lambda session, level: level)
+    async def get_word_names(session, level):
+        loads.append(level)
+        await asyncio.sleep(0.05)
+        return [] if level == "C2" else [f"{level} word"]
+
+    await cache.invalidate("test_words")
+    assert await asyncio.gather(*[get_word_names(None, "A1") for _ in range(5)]) == [["A1 word"]] * 5
+    cache.local.entries.clear()
+    assert await get_word_names(None, "A1") == ["A1 word"]
+    assert await get_word_names(None, "C2") == []
+    assert loads == ["A1", "C2"]
+    cache_key = cache.get_key("test_words", await cache.get_version("test_words"), "C2")
+    assert 0 < await cache.redis.ttl(cache_key) <= 5
+
+    stats = cache.get_stats()["test_words"]
+    assert (stats.requests, stats.coalesced, stats.l2_hits, stats.misses) == (7, 4, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_readers_survive_cancelled_load():
+    loads = []
+
+    @cache.cached("test_words", key=lambda level: level)
+    async def get_word_names(level):
+        loads.append(level)
+        await asyncio.sleep(0.05)
+        return [f"{level} word"]
+
+    await cache.invalidate("test_words")
+    owner = asyncio.create_task(get_word_names("B2"))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(get_word_names("B2")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    owner.cancel()
+    assert await asyncio.gather(*waiters) == [["B2 word"]] * 3
+    assert owner.cancelled()
+    assert loads == ["B2", "B2"]
+
+
+@pytest.mark.asyncio
+async def test_added_word_invalidates_parts_of_speech(client):
+    assert "conjunction" not in (await client.get("/words/check-available-part-of-speech")).json()
+    version = await cache.get_version("parts_of_speech")
+    data = {"translation_from_language": 2, "translation_to_language": 1, "level": "A1",
+            "word_to_translate": "and", "translation_word": "и", "part_of_speech": "conjunction"}
+    assert (await client.post("/words/add-word", json=data)).status_code == 200
+    assert await cache.get_version("parts_of_speech") == version + 1
+    assert "conjunction" in (await client.get("/words/check-available-part-of-speech")).json()
+
+
+@pytest.mark.asyncio
+async def test_invalidation_is_published_to_other_workers():
+    @cache.cached("test_words", key=lambda level: level)
+    async def get_word_names(level):
+        return [f"{level} word"]
+
+    listener = asyncio.create_task(cache.run_invalidation_listener())
+    try:
+        while not (await cache.redis.pubsub_numsub(INVALIDATION_CHANNEL))[0][1]:
+            await asyncio.sleep(0.01)
+        await get_word_names("B1")
+        version = await cache.get_version("test_words")
+        cache_key = cache.get_key("test_words", version, "B1")
+        assert cache.local.get(cache_key) == ["B1 word"]
+
+        await ReadThroughCache(cache.redis).invalidate("test_words")
+        for _ in range(100):
+            if cache.versions.get("test_words") == version + 1:
+                break
+            await asyncio.sleep(0.01)
+        assert cache.versions["test_words"] == version + 1
+        assert cache_key not in cache.local.entries
+    finally:
+        listener.cancel()